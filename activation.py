@@ -0,0 +1,303 @@
+"""
+Agent Activation Scheduling for AI Commune
+Chooses which agents act each tick, so per-tick cost follows the number of active agents rather than the roster size.
+"""
+
+import heapq
+import math
+import random
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from loguru import logger
+
+
+POLICIES = ("all", "round_robin", "priority", "poisson")
+
+_NAME = re.compile(r"[\w-]+")
+
+
+class AgentSlot:
+    """Roster entry for one agent.
+
+    The agent itself is only built by the factory when it is first activated.
+    While the agent is dormant its memory is compacted.
+    """
+
+    __slots__ = ("name", "role", "memory", "agent", "inbox", "last_active", "activations", "dormant")
+
+    def __init__(self, name: str, role: str, memory):
+        self.name = name
+        self.role = role
+        self.memory = memory
+        self.agent = None
+        self.inbox = 0
+        self.last_active = 0
+        self.activations = 0
+        self.dormant = True
+
+
+class ActivationScheduler:
+    """Samples the agents that act in each tick.
+
+    Policies:
+
+    - all: every agent, every tick (the original behaviour)
+    - round_robin: the next `active_per_tick` agents in roster order
+    - priority: agents with the most unread messages first, the remaining
+      slots filled round-robin so nobody starves
+    - poisson: every agent activates independently at `rate` activations per
+      tick; agents are drawn by geometric skipping, so a tick costs
+      O(active agents) rather than one coin flip per agent
+
+    Agents that have not been active for `dormant_after` ticks go dormant:
+    their memory is compacted until they are activated again.
+    """
+
+    def __init__(self, factory: Callable[[AgentSlot], Any], policy: str = "all", active_per_tick: int = 10,
+                 rate: Optional[float] = None, dormant_after: int = 5, seed: Optional[int] = None):
+        """Initialize the activation scheduler.
+
+        Args:
+            factory: Builds the agent for a slot on first activation
+            policy: One of POLICIES (default: "all")
+            active_per_tick: Agents activated per tick by round_robin and priority (default: 10)
+            rate: Poisson activations per agent per tick (default: active_per_tick / roster size)
+            dormant_after: Idle ticks before an agent goes dormant (default: 5)
+            seed: Seed for the private random generator used by poisson
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown activation policy '{policy}', expected one of {', '.join(POLICIES)}")
+
+        self.factory = factory
+        self.policy = policy
+        self.active_per_tick = active_per_tick
+        self.rate = rate
+        self.dormant_after = dormant_after
+
+        self.slots: Dict[str, AgentSlot] = {}
+        self._order: List[AgentSlot] = []
+        self._cursor = 0
+        # Max-heap of (-inbox, sequence, name); entries go stale when the inbox changes
+        self._heap: List[tuple] = []
+        self._sequence = 0
+        # Awake slots, least recently active first
+        self._awake: "OrderedDict[str, AgentSlot]" = OrderedDict()
+        # Private RNG so sampling never disturbs the simulation's `random` state
+        self._rng = random.Random(seed)
+
+        self.activations = 0
+        self.wakeups = 0
+        self.sleeps = 0
+
+    def add(self, name: str, role: str, memory) -> AgentSlot:
+        """Add an agent to the roster.
+
+        Args:
+            name: Name of the agent
+            role: Role of the agent
+            memory: SimpleMemory of the agent
+
+        Returns:
+            The agent's slot
+        """
+        slot = AgentSlot(name, role, memory)
+        self.slots[name] = slot
+        self._order.append(slot)
+        return slot
+
+    def retain(self, names: Iterable[str]) -> None:
+        """Drop every agent not in `names` from the roster, e.g. for a what-if branch.
+
+        Args:
+            names: Names of the agents to keep
+        """
+        keep = set(names)
+        self._order = [slot for slot in self._order if slot.name in keep]
+        self.slots = {slot.name: slot for slot in self._order}
+        for name in [name for name in self._awake if name not in keep]:
+            del self._awake[name]
+        self._heap = [entry for entry in self._heap if entry[2] in keep]
+        heapq.heapify(self._heap)
+        self._cursor = 0
+
+    def notify(self, name: str, count: int = 1) -> None:
+        """Record messages waiting for an agent.
+
+        Args:
+            name: Name of the agent
+            count: Number of new messages
+        """
+        slot = self.slots.get(name)
+        if slot is None:
+            return
+        slot.inbox += count
+        if self.policy == "priority":
+            self._sequence += 1
+            heapq.heappush(self._heap, (-slot.inbox, self._sequence, name))
+
+    def observe_messages(self, messages: Iterable[Dict[str, Any]]) -> None:
+        """Count new messages towards the inbox of every agent they mention.
+
+        Args:
+            messages: Message dicts with 'message' and 'sender' keys
+        """
+        for message in messages:
+            sender = message.get('sender')
+            for name in set(_NAME.findall(str(message.get('message', '')))):
+                if name != sender and name in self.slots:
+                    self.notify(name)
+
+    def _round_robin(self, count: int, chosen: Dict[str, AgentSlot]) -> None:
+        size = len(self._order)
+        for _ in range(size):
+            if len(chosen) >= count:
+                break
+            slot = self._order[self._cursor]
+            self._cursor = (self._cursor + 1) % size
+            chosen.setdefault(slot.name, slot)
+
+    def _priority(self, count: int, chosen: Dict[str, AgentSlot]) -> None:
+        while self._heap and len(chosen) < count:
+            inbox, _, name = heapq.heappop(self._heap)
+            slot = self.slots[name]
+            if -inbox == slot.inbox and slot.inbox > 0:
+                chosen.setdefault(name, slot)
+        self._round_robin(count, chosen)
+
+    def _poisson(self, chosen: Dict[str, AgentSlot]) -> None:
+        size = len(self._order)
+        rate = self.rate
+        if rate is None:
+            rate = -math.log(1.0 - min(self.active_per_tick / size, 0.999))
+        probability = 1.0 - math.exp(-rate)
+        if probability >= 1.0:
+            chosen.update((slot.name, slot) for slot in self._order)
+            return
+
+        # Gaps between activated agents are geometric with this probability
+        log_miss = math.log(1.0 - probability)
+        index = -1
+        while True:
+            index += 1 + int(math.log(1.0 - self._rng.random()) / log_miss)
+            if index >= size:
+                break
+            slot = self._order[index]
+            chosen[slot.name] = slot
+
+    def _wake(self, slot: AgentSlot) -> None:
+        if slot.agent is None:
+            slot.agent = self.factory(slot)
+        if slot.dormant:
+            slot.dormant = False
+            self.wakeups += 1
+
+    def _sleep(self, slot: AgentSlot) -> None:
+        slot.dormant = True
+        slot.memory.compact()
+        self.sleeps += 1
+
+    def select(self, tick: int) -> List[Any]:
+        """Choose and wake the agents that act in this tick.
+
+        Args:
+            tick: Current tick
+
+        Returns:
+            The agents to activate
+        """
+        if not self._order:
+            return []
+
+        chosen: Dict[str, AgentSlot] = {}
+        if self.policy == "all":
+            chosen.update((slot.name, slot) for slot in self._order)
+        elif self.policy == "round_robin":
+            self._round_robin(self.active_per_tick, chosen)
+        elif self.policy == "priority":
+            self._priority(self.active_per_tick, chosen)
+        else:
+            self._poisson(chosen)
+
+        for slot in chosen.values():
+            self._wake(slot)
+            slot.inbox = 0
+            slot.last_active = tick
+            slot.activations += 1
+            self._awake[slot.name] = slot
+            self._awake.move_to_end(slot.name)
+        self.activations += len(chosen)
+        logger.debug(f"⏰ Tick {tick}: activating {len(chosen)}/{len(self._order)} agents ({self.policy})")
+
+        # Only the least recently active agents can have been idle long enough
+        while self._awake:
+            slot = next(iter(self._awake.values()))
+            if tick - slot.last_active < self.dormant_after:
+                break
+            del self._awake[slot.name]
+            self._sleep(slot)
+
+        return [slot.agent for slot in chosen.values()]
+
+    def wake_all(self) -> List[Any]:
+        """Wake every agent that has been built, e.g. for end-of-run summaries.
+
+        Returns:
+            All built agents
+        """
+        agents = []
+        for slot in self._order:
+            if slot.agent is not None:
+                self._wake(slot)
+                self._awake[slot.name] = slot
+                agents.append(slot.agent)
+        return agents
+
+    @property
+    def awake(self) -> List[Any]:
+        """Agents that are currently awake."""
+        return [slot.agent for slot in self._awake.values()]
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Per-agent activation state, the selection cursors and the private RNG, for checkpoints."""
+        return {
+            'slots': {slot.name: (slot.agent is not None, slot.inbox, slot.last_active, slot.activations, slot.dormant)
+                      for slot in self._order},
+            'cursor': self._cursor,
+            'heap': list(self._heap),
+            'sequence': self._sequence,
+            'awake': list(self._awake),
+            'rng': self._rng.getstate(),
+            'counters': (self.activations, self.wakeups, self.sleeps),
+        }
+
+    def restore_checkpoint_state(self, state: Dict[str, Any]) -> None:
+        """Restore a checkpointed state, building the agents that had been built."""
+        for name, (built, inbox, last_active, activations, dormant) in state['slots'].items():
+            slot = self.slots.get(name)
+            if slot is None:
+                continue
+            if built and slot.agent is None:
+                slot.agent = self.factory(slot)
+            slot.inbox, slot.last_active, slot.activations, slot.dormant = inbox, last_active, activations, dormant
+            if dormant:
+                slot.memory.compact()
+        self._cursor = state['cursor']
+        self._heap = [entry for entry in state['heap'] if entry[2] in self.slots]
+        heapq.heapify(self._heap)
+        self._sequence = state['sequence']
+        self._awake = OrderedDict((name, self.slots[name]) for name in state['awake'] if name in self.slots)
+        self._rng.setstate(state['rng'])
+        self.activations, self.wakeups, self.sleeps = state['counters']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get activation statistics."""
+        return {
+            'policy': self.policy,
+            'roster': len(self._order),
+            'built': sum(1 for slot in self._order if slot.agent is not None),
+            'awake': len(self._awake),
+            'activations': self.activations,
+            'wakeups': self.wakeups,
+            'sleeps': self.sleeps,
+        }
@@ -0,0 +1,282 @@
+"""
+Async LLM Clients for AI Commune
+Async client protocol (agenerate/astream), a keep-alive HTTP client for Ollama-compatible servers and bounded-concurrency helpers.
+"""
+
+import asyncio
+import functools
+import json
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, List, Optional, Protocol, Tuple, runtime_checkable
+from urllib.parse import urlparse
+from loguru import logger
+
+from agents.generation_budget import truncate_text
+from agents.llm_resilience import ErrorResponse
+
+
+@runtime_checkable
+class AsyncLLMClient(Protocol):
+    """Clients that can be awaited from an event loop."""
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> str:
+        """Generate a response without blocking the event loop."""
+
+    def astream(self, prompt: str, system_prompt: Optional[str] = None,
+                temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> AsyncIterator[str]:
+        """Yield the response in pieces as it is generated."""
+
+
+async def agenerate(client, **kwargs) -> str:
+    """Await a generate() call on any client.
+
+    Clients whose class implements `agenerate` are awaited directly. Anything
+    else, including wrappers such as ResilientClient or RecordingClient, runs
+    its blocking generate() in the loop's default executor, so wrappers are
+    never bypassed by attribute forwarding.
+
+    Args:
+        client: LLM client
+        **kwargs: generate() arguments
+
+    Returns:
+        Generated text (or an ErrorResponse from the client)
+    """
+    if getattr(type(client), 'agenerate', None) is not None:
+        return await client.agenerate(**kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(client.generate, **kwargs))
+
+
+async def gather_bounded(aws: Iterable[Awaitable[Any]], limit: int = 8) -> List[Any]:
+    """Run awaitables concurrently, at most `limit` at a time.
+
+    Args:
+        aws: Coroutines to run, e.g. one per active agent in a tick
+        limit: Maximum number running at once (default: 8)
+
+    Returns:
+        Results in the order of `aws`
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(aw: Awaitable[Any]) -> Any:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
+class _Connection:
+    """One keep-alive HTTP/1.1 connection."""
+
+    __slots__ = ("reader", "writer")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class AsyncOllamaClient:
+    """Async client for Ollama-compatible local servers.
+
+    Requests go over a small pool of keep-alive HTTP/1.1 connections built on
+    asyncio streams; at most `max_connections` requests are in flight, the
+    rest wait for a free connection. The pool belongs to the event loop it was
+    first used on.
+    """
+
+    # agenerate() accepts stop / max_paragraphs / max_sentences
+    supports_stopping_criteria = True
+
+    def __init__(self, model: str = "llama3.2:3b", base_url: str = "http://localhost:11434",
+                 max_connections: int = 8, timeout: float = 120.0):
+        """Initialize the client.
+
+        Args:
+            model: Model to request (default: llama3.2:3b)
+            base_url: Server address (default: http://localhost:11434)
+            max_connections: Connections kept open and requests in flight (default: 8)
+            timeout: Seconds allowed per request (default: 120)
+        """
+        url = urlparse(base_url)
+        self.model = model
+        self.base_url = base_url
+        self.host = url.hostname or "localhost"
+        self.port = url.port or 80
+        self.max_connections = max_connections
+        self.timeout = timeout
+
+        self._idle: List[_Connection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+        self.connections_opened = 0
+
+    async def _connect(self) -> _Connection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    async def _send(self, connection: _Connection, method: str, path: str, body: Optional[bytes]) -> None:
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Connection: keep-alive\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body or b'')}\r\n\r\n")
+        connection.writer.write(head.encode('latin-1') + (body or b""))
+        await connection.writer.drain()
+
+    async def _read_head(self, connection: _Connection) -> Tuple[int, Dict[str, str]]:
+        status_line = await connection.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Server closed the connection")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await connection.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _read_body(self, connection: _Connection, headers: Dict[str, str]) -> AsyncIterator[bytes]:
+        reader = connection.reader
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    # Trailers end with an empty line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                yield await reader.readexactly(size)
+                await reader.readexactly(2)
+        elif 'content-length' in headers:
+            length = int(headers['content-length'])
+            if length:
+                yield await reader.readexactly(length)
+        else:
+            yield await reader.read()
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> AsyncIterator[bytes]:
+        """Send a request on a pooled connection and yield the response body in pieces.
+
+        Raises:
+            RuntimeError: If the server answers with an error status
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_connections)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+
+        async with self._slots:
+            self.requests += 1
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    await self._send(connection, method, path, body)
+                    status, headers = await self._read_head(connection)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # The server may have dropped an idle keep-alive connection; retry once on a new one
+                    connection.close()
+                    connection = await self._connect()
+                    await self._send(connection, method, path, body)
+                    status, headers = await self._read_head(connection)
+
+                if status >= 400:
+                    error = b"".join([piece async for piece in self._read_body(connection, headers)])
+                    raise RuntimeError(f"HTTP {status}: {error[:200].decode('utf-8', 'replace')}")
+
+                async for piece in self._read_body(connection, headers):
+                    yield piece
+            except BaseException:
+                connection.close()
+                raise
+
+            if headers.get('connection', '').lower() == 'close':
+                connection.close()
+            else:
+                self._idle.append(connection)
+
+    def _payload(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int,
+                 stop: Optional[List[str]], stream: bool) -> Dict[str, Any]:
+        options = {'temperature': temperature, 'num_predict': max_tokens}
+        if stop:
+            options['stop'] = list(stop)
+        payload = {'model': self.model, 'prompt': prompt, 'stream': stream, 'options': options}
+        if system_prompt:
+            payload['system'] = system_prompt
+        return payload
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                        max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None) -> str:
+        """Generate a response.
+
+        Args:
+            prompt: The prompt to send to the model
+            system_prompt: Optional system prompt
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            stop: Optional stop sequences
+            max_paragraphs: Optional paragraph limit applied to the response
+            max_sentences: Optional sentence limit applied to the response
+
+        Returns:
+            Generated response text, or an ErrorResponse if the request failed
+        """
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens, stop, stream=False)
+
+        async def request() -> bytes:
+            return b"".join([piece async for piece in self._request("POST", "/api/generate", payload)])
+
+        try:
+            data = json.loads(await asyncio.wait_for(request(), self.timeout))
+            return truncate_text(data.get('response', ''), stop, max_paragraphs, max_sentences)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"❌ Async generation failed: {error}")
+            return ErrorResponse(f"[LLM unavailable: {error}]", error=error)
+
+    async def astream(self, prompt: str, system_prompt: Optional[str] = None,
+                      temperature: float = 0.7, max_tokens: int = 150,
+                      stop: Optional[List[str]] = None) -> AsyncIterator[str]:
+        """Yield the response in pieces as the server streams it.
+
+        Raises:
+            RuntimeError: If the server answers with an error status
+        """
+        payload = self._payload(prompt, system_prompt, temperature, max_tokens, stop, stream=True)
+        buffer = b""
+        async for piece in self._request("POST", "/api/generate", payload):
+            buffer += piece
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    text = json.loads(line).get('response', '')
+                    if text:
+                        yield text
+        if buffer.strip():
+            text = json.loads(buffer).get('response', '')
+            if text:
+                yield text
+
+    async def alist_models(self) -> List[str]:
+        """List models available on the server."""
+        data = b"".join([piece async for piece in self._request("GET", "/api/tags")])
+        return [model['name'] for model in json.loads(data).get('models', [])]
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        while self._idle:
+            connection = self._idle.pop()
+            connection.close()
+            try:
+                await connection.writer.wait_closed()
+            except Exception:
+                pass
+
+    def __str__(self) -> str:
+        """String representation of the client."""
+        return f"AsyncOllamaClient(model='{self.model}', url='{self.base_url}')"
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Import Time Benchmark for AI Commune
+Measures module import times with `python -X importtime` and CLI startup, failing when a budget is exceeded or a heavy dependency is imported eagerly.
+Usage: python bench_imports.py [--repeats 5]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+# Module -> (cumulative import budget in ms, modules it must not import)
+IMPORT_BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "agents.commune_cli": (150, ("numpy", "torch", "transformers")),
+    "agents.huggingface_client": (150, ("torch", "transformers")),
+    "agents.constitution": (120, ("numpy",)),
+    "agents.board_index": (120, ("numpy",)),
+    "agents.memory_index": (120, ("numpy", "concurrent.futures.process")),
+}
+
+# CLI commands that only read files, and the wall-clock budget for each (ms)
+CLI_COMMANDS = ("help", "constitution", "stats", "list-agents", "memories")
+CLI_BUDGET_MS = 200
+
+
+def _env() -> Dict[str, str]:
+    # The modules import each other as agents.*, so the directory above this one goes on the path
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([str(Path(__file__).parent.parent), env.get('PYTHONPATH', '')])
+    return env
+
+
+def import_profile(module: str) -> Tuple[float, Set[str]]:
+    """Import a module in a fresh interpreter.
+
+    Returns:
+        Cumulative import time of the module (ms) and every module imported on the way
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=_env())
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    cumulative = 0.0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        name = name.strip()
+        if not total.strip().isdigit():
+            continue
+        imported.add(name)
+        if name == module:
+            cumulative = int(total) / 1000
+    return cumulative, imported
+
+
+def _timed(command: List[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def best_of(repeats: int, measure) -> float:
+    """Fastest of several measurements, the least disturbed by other load."""
+    return min(measure() for _ in range(repeats))
+
+
+def cli_startup(command: str) -> float:
+    """Wall-clock time of one CLI command in a fresh interpreter (ms)."""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, str(Path(__file__).parent / "commune_cli.py"), command],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=_env())
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Check import times and CLI startup against their budgets.")
+    parser.add_argument("--repeats", type=int, default=5, help="Measurements per item, the fastest counts (default: 5)")
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    interpreter = best_of(args.repeats, lambda: _timed([sys.executable, "-c", "pass"]))
+
+    print(f"\n⏱️  Import times (best of {args.repeats})\n")
+    for module, (budget, forbidden) in IMPORT_BUDGETS.items():
+        profiles = [import_profile(module) for _ in range(args.repeats)]
+        cumulative = min(ms for ms, _ in profiles)
+        eager = sorted(name for name in forbidden if name in profiles[0][1])
+        ok = cumulative <= budget and not eager
+        print(f"  {'✅' if ok else '❌'} {module:28} {cumulative:7.1f} ms  (budget {budget:.0f} ms)"
+              + (f"  imports {', '.join(eager)}" if eager else ""))
+        if not ok:
+            failures.append(module)
+
+    print(f"\n🚀 CLI startup (interpreter alone: {interpreter:.0f} ms)\n")
+    for command in CLI_COMMANDS:
+        ms = best_of(args.repeats, lambda: cli_startup(command))
+        ok = ms <= CLI_BUDGET_MS
+        print(f"  {'✅' if ok else '❌'} commune_cli.py {command:14} {ms:7.1f} ms  (budget {CLI_BUDGET_MS} ms)")
+        if not ok:
+            failures.append(f"commune_cli.py {command}")
+
+    if failures:
+        print(f"\n❌ Over budget: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ All within budget")
+
+
+if __name__ == "__main__":
+    main()
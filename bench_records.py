@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Record Type Benchmark for AI Commune
+Compares the slotted memory/post records against the plain dicts they replaced: memory per record and insert throughput.
+Usage: python bench_records.py --records 100000
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from loguru import logger
+
+from agents.memory import SimpleMemory
+from agents.records import MemoryRecord, PostRecord
+
+
+TYPES = ["reflection", "interaction", "observation", "analysis"]
+ROLES = ["Philosopher", "Scientist", "Artist", "Mediator"]
+
+
+def legacy_memory(i: int) -> Dict:
+    """A memory entry as SimpleMemory used to build it."""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'type': TYPES[i % 4],
+        'content': f"memory {i}",
+        'metadata': {}
+    }
+
+
+def record_memory(i: int) -> MemoryRecord:
+    return MemoryRecord(TYPES[i % 4], f"memory {i}")
+
+
+def legacy_post(i: int) -> Dict:
+    """A board post as DailyMessageBoard used to build it."""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'date': datetime.now().date().isoformat(),
+        'agent_name': f"Agent{i % 10}",
+        'role': ROLES[i % 4],
+        'content': f"post {i}",
+        'post_id': i
+    }
+
+
+def record_post(i: int) -> PostRecord:
+    return PostRecord(datetime.now().date().isoformat(), f"Agent{i % 10}", ROLES[i % 4], f"post {i}", i)
+
+
+def bytes_per_record(build: Callable[[int], object], count: int) -> float:
+    """Average bytes allocated per record, content strings included."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records: List[object] = [build(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return (after - before) / count
+
+
+def inserts_per_sec(build: Callable[[int], object], count: int) -> float:
+    records = []
+    start = time.perf_counter()
+    for i in range(count):
+        records.append(build(i))
+    return count / (time.perf_counter() - start)
+
+
+def memory_inserts_per_sec(count: int) -> float:
+    """Throughput of SimpleMemory.add_memory, including trimming to max_entries."""
+    memory = SimpleMemory("Bench", max_entries=100)
+    start = time.perf_counter()
+    for i in range(count):
+        memory.add_memory(TYPES[i % 4], f"memory {i}")
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description="Benchmark slotted records against plain dicts.")
+    parser.add_argument("--records", type=int, default=100000, help="Records per measurement (default: 100000)")
+    args = parser.parse_args()
+    logger.remove()
+
+    print(f"\n📦 Record benchmark ({args.records} records)\n")
+    print(f"{'kind':16} {'bytes/record':>13} {'inserts/sec':>13}")
+    for name, build in (("memory dict", legacy_memory), ("MemoryRecord", record_memory),
+                        ("post dict", legacy_post), ("PostRecord", record_post)):
+        size = bytes_per_record(build, args.records)
+        rate = inserts_per_sec(build, args.records)
+        print(f"{name:16} {size:13.1f} {rate:13.0f}")
+
+    print(f"\nSimpleMemory.add_memory: {memory_inserts_per_sec(args.records):.0f} inserts/sec")
+
+
+if __name__ == "__main__":
+    main()
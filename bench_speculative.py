@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Speculative Decoding Benchmark for AI Commune
+Compares plain sampling against assisted generation (draft model proposes, main model verifies) on CPU.
+Usage: python bench_speculative.py --model gpt2 --draft distilgpt2
+"""
+
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents.huggingface_client import HuggingFaceClient
+
+
+PROMPTS = [
+    "As Sophia the Philosopher, reflect on what it means for ten minds to share one commune.",
+    "As Nova the Scientist, describe an experiment the commune could run on cooperation.",
+    "As Arden the Artist, describe the colours of a conversation between friends.",
+    "As Kai the Technologist, explain how the commune could share its tools fairly.",
+    "As Mira the Psychologist, describe how agents cope with disagreement.",
+    "As Atlas the Mediator, propose a rule for settling disputes in the commune.",
+]
+
+
+def run(client: HuggingFaceClient, use_draft: bool, prompts: List[str], max_tokens: int, repeats: int) -> Dict:
+    """Generate every prompt `repeats` times and collect speed and token statistics."""
+    client.use_draft = use_draft
+    tokens, lengths, elapsed = Counter(), [], 0.0
+
+    for _ in range(repeats):
+        for prompt in prompts:
+            start = time.perf_counter()
+            text = client.generate(prompt, temperature=0.7, max_tokens=max_tokens)
+            elapsed += time.perf_counter() - start
+
+            ids = client.tokenizer.encode(text)
+            tokens.update(ids)
+            lengths.append(len(ids))
+
+    total = sum(lengths)
+    return {
+        'tokens': tokens,
+        'tokens_per_sec': total / elapsed if elapsed else 0.0,
+        'mean_length': total / len(lengths) if lengths else 0.0,
+        'distinct_1': len(tokens) / total if total else 0.0,
+    }
+
+
+def js_divergence(p: Counter, q: Counter) -> float:
+    """Jensen-Shannon divergence (bits) between two token frequency distributions."""
+    p_total, q_total = sum(p.values()), sum(q.values())
+    if not p_total or not q_total:
+        return float('nan')
+
+    divergence = 0.0
+    for token in set(p) | set(q):
+        pp, qq = p[token] / p_total, q[token] / q_total
+        m = (pp + qq) / 2
+        if pp:
+            divergence += 0.5 * pp * math.log2(pp / m)
+        if qq:
+            divergence += 0.5 * qq * math.log2(qq / m)
+    return divergence
+
+
+def main():
+    """Run the benchmark and print a comparison table."""
+    parser = argparse.ArgumentParser(description="Benchmark assisted generation against plain sampling.")
+    parser.add_argument("--model", default="gpt2", help="Main model (default: gpt2)")
+    parser.add_argument("--draft", default="distilgpt2", help="Draft model (default: distilgpt2)")
+    parser.add_argument("--max-tokens", type=int, default=64, help="Tokens per generation (default: 64)")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the prompt set (default: 3)")
+    parser.add_argument("--assistant-tokens", type=int, default=5, help="Draft tokens per step (default: 5)")
+    args = parser.parse_args()
+
+    client = HuggingFaceClient(model_name=args.model, draft_model_name=args.draft,
+                               num_assistant_tokens=args.assistant_tokens)
+    if client.draft_model is None:
+        print(f"❌ Draft model {args.draft} could not be used with {client.model_name}")
+        return
+
+    # Warm up both paths so one-off initialisation is not timed
+    for use_draft in (False, True):
+        client.use_draft = use_draft
+        client.generate(PROMPTS[0], max_tokens=8)
+
+    plain = run(client, False, PROMPTS, args.max_tokens, args.repeats)
+    plain_again = run(client, False, PROMPTS, args.max_tokens, args.repeats)
+    assisted = run(client, True, PROMPTS, args.max_tokens, args.repeats)
+
+    print(f"\n⚡ Speculative decoding: {client.model_name} verified, {args.draft} drafting "
+          f"({args.assistant_tokens} tokens/step, {client.device})\n")
+    print(f"{'mode':12} {'tokens/sec':>11} {'mean len':>9} {'distinct-1':>11}")
+    for name, result in (("plain", plain), ("assisted", assisted)):
+        print(f"{name:12} {result['tokens_per_sec']:11.1f} {result['mean_length']:9.1f} {result['distinct_1']:11.3f}")
+
+    speedup = assisted['tokens_per_sec'] / plain['tokens_per_sec'] if plain['tokens_per_sec'] else float('nan')
+    print(f"\nSpeedup: {speedup:.2f}x")
+    print(f"Token distribution JS divergence, plain vs assisted: {js_divergence(plain['tokens'], assisted['tokens']):.4f} bits")
+    print(f"Token distribution JS divergence, plain vs plain:    {js_divergence(plain['tokens'], plain_again['tokens']):.4f} bits "
+          "(sampling noise baseline)")
+
+
+if __name__ == "__main__":
+    main()
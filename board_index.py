@@ -0,0 +1,365 @@
+"""
+Daily Board Search Index for AI Commune
+Incrementally maintained inverted index over daily board posts of every day, with boolean and BM25-ranked queries.
+"""
+
+import json
+import math
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from loguru import logger
+
+
+_TOKEN = re.compile(r"[a-z0-9]{2,}")
+STOPWORDS = frozenset("""
+the and for that this with are was were from have has had not but our you your their they them its
+his her she him who what when where which while will would can could should into onto than then there
+these those also been being about over under more most some such very just each other all any out
+""".split())
+
+SNIPPET_LENGTH = 160
+
+# Reindexing appends a post's line again; the postings file is rewritten once
+# it holds this many times more lines than there are posts
+COMPACT_RATIO = 2.0
+COMPACT_MIN_LINES = 1000
+
+# (date, post_id)
+PostKey = Tuple[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of a text, without stopwords."""
+    return [term for term in _TOKEN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class _Doc:
+    """What the index keeps about a post, enough to show a hit without opening its day file."""
+
+    __slots__ = ("agent_name", "role", "length", "snippet", "terms")
+
+    def __init__(self, agent_name: str, role: str, length: int, snippet: str, terms: Tuple[str, ...]):
+        self.agent_name = agent_name
+        self.role = role
+        self.length = length
+        self.snippet = snippet
+        self.terms = terms
+
+
+class BoardIndex:
+    """Inverted index from terms to the (date, post_id) of the board posts containing them.
+
+    The index lives in `<data_dir>/.index/`: an append-only `postings.jsonl`
+    with one line of term counts per post, and a manifest recording which
+    size and mtime of each `daily_board_*.json` file has been indexed. New
+    posts are appended as they are made (`add`); day files changed behind the
+    index's back are reindexed on `refresh`, or on the next `add` to that day.
+    Reindexing appends duplicate lines, so the postings file is compacted once
+    they dominate it. Queries run against the in-memory index built from the
+    postings file and never open a day file.
+    """
+
+    def __init__(self, data_dir: str = "data/daily_board", k1: float = 1.5, b: float = 0.75):
+        """Initialize the index.
+
+        Args:
+            data_dir: Directory holding the daily_board_*.json files
+            k1: BM25 term frequency saturation (default: 1.5)
+            b: BM25 length normalization (default: 0.75)
+        """
+        self.data_dir = Path(data_dir)
+        self.index_dir = self.data_dir / ".index"
+        self.postings_path = self.index_dir / "postings.jsonl"
+        self.manifest_path = self.index_dir / "manifest.json"
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, Dict[PostKey, int]] = {}
+        self.docs: Dict[PostKey, _Doc] = {}
+        self._total_length = 0
+        self._manifest: Dict[str, Dict[str, int]] = {}
+        # Lines in the postings file, live or superseded
+        self._lines = 0
+        self._loaded = False
+
+    def _index(self, key: PostKey, agent_name: str, role: str, terms: Mapping[str, int], length: int,
+               snippet: str) -> None:
+        if key in self.docs:
+            self._unindex(key)
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[key] = count
+        self.docs[key] = _Doc(agent_name, role, length, snippet, tuple(terms))
+        self._total_length += length
+
+    def _unindex(self, key: PostKey) -> None:
+        doc = self.docs.pop(key)
+        self._total_length -= doc.length
+        for term in doc.terms:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+
+    def load(self) -> None:
+        """Build the in-memory index from the postings file (once)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.manifest_path.exists():
+            try:
+                self._manifest = json.loads(self.manifest_path.read_text())
+            except (json.JSONDecodeError, IOError) as e:
+                logger.warning(f"Discarding unreadable board index manifest: {e}")
+                self._manifest = {}
+        if not self.postings_path.exists():
+            return
+        with open(self.postings_path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                self._lines += 1
+                try:
+                    line = json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+                self._index((line['date'], line['post_id']), line['agent_name'], line['role'],
+                            line['terms'], line['length'], line['snippet'])
+
+    def _append(self, lines: Iterable[Dict[str, Any]]) -> None:
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.postings_path, 'a') as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+                self._lines += 1
+
+    def compact(self) -> None:
+        """Rewrite the postings file with one line per indexed post."""
+        self.load()
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.postings_path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, 'w') as f:
+                for key, doc in sorted(self.docs.items()):
+                    f.write(json.dumps({
+                        'date': key[0],
+                        'post_id': key[1],
+                        'agent_name': doc.agent_name,
+                        'role': doc.role,
+                        'length': doc.length,
+                        'terms': {term: self.postings[term][key] for term in doc.terms},
+                        'snippet': doc.snippet,
+                    }) + "\n")
+            os.replace(tmp_path, self.postings_path)
+        except IOError as e:
+            logger.warning(f"Failed to compact board index: {e}")
+            return
+        logger.debug(f"🗜️ Compacted board index from {self._lines} to {len(self.docs)} lines")
+        self._lines = len(self.docs)
+
+    def _maybe_compact(self) -> None:
+        if self._lines > COMPACT_MIN_LINES and self._lines > COMPACT_RATIO * len(self.docs):
+            self.compact()
+
+    def _entry(self, post: Mapping[str, Any]) -> Dict[str, Any]:
+        terms: Dict[str, int] = {}
+        tokens = tokenize(f"{post['content']} {post['agent_name']} {post['role']}")
+        for term in tokens:
+            terms[term] = terms.get(term, 0) + 1
+        return {
+            'date': post['date'],
+            'post_id': post['post_id'],
+            'agent_name': post['agent_name'],
+            'role': post['role'],
+            'length': len(tokens),
+            'terms': terms,
+            'snippet': post['content'][:SNIPPET_LENGTH],
+        }
+
+    def _save_manifest(self) -> None:
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._manifest))
+            os.replace(tmp_path, self.manifest_path)
+        except IOError as e:
+            logger.warning(f"Failed to save board index manifest: {e}")
+
+    def _index_day(self, date: str, day_file: Path) -> Optional[int]:
+        """(Re)index every post of a day file; returns the number of posts, or None if unreadable."""
+        st = day_file.stat()
+        try:
+            with open(day_file, 'r') as f:
+                posts = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Skipping unreadable board file {day_file.name}: {e}")
+            return None
+
+        entries = [self._entry({'date': date, **post}) for post in posts]
+        for entry in entries:
+            self._index((entry['date'], entry['post_id']), entry['agent_name'], entry['role'],
+                        entry['terms'], entry['length'], entry['snippet'])
+        self._append(entries)
+        self._manifest[date] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        return len(entries)
+
+    def add(self, post: Mapping[str, Any], day_file: Optional[Path] = None,
+            previous_size: Optional[int] = None) -> None:
+        """Index a new post.
+
+        Args:
+            post: The post (PostRecord or dict)
+            day_file: Day file the post was just saved to; its new size is recorded as indexed
+            previous_size: Size of the day file before the post was saved (0 if it did not exist).
+                If it is not the size last indexed, the earlier posts of the day were never
+                indexed and the whole day is reindexed instead
+        """
+        self.load()
+        if day_file is not None and previous_size is not None and day_file.exists():
+            seen = self._manifest.get(post['date'])
+            if (seen['size'] if seen else 0) != previous_size:
+                if self._index_day(post['date'], day_file) is not None:
+                    self._save_manifest()
+                    self._maybe_compact()
+                    return
+
+        entry = self._entry(post)
+        self._append([entry])
+        self._index((entry['date'], entry['post_id']), entry['agent_name'], entry['role'],
+                    entry['terms'], entry['length'], entry['snippet'])
+        if day_file is not None and day_file.exists():
+            st = day_file.stat()
+            self._manifest[entry['date']] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            self._save_manifest()
+
+    def refresh(self) -> int:
+        """Index day files that changed since they were last indexed.
+
+        Returns:
+            Number of posts indexed
+        """
+        self.load()
+        indexed = 0
+        for day_file in sorted(self.data_dir.glob("daily_board_*.json")):
+            date = day_file.stem.replace("daily_board_", "")
+            st = day_file.stat()
+            seen = self._manifest.get(date)
+            if seen and seen['size'] == st.st_size and seen['mtime_ns'] == st.st_mtime_ns:
+                continue
+            indexed += self._index_day(date, day_file) or 0
+
+        if indexed:
+            self._save_manifest()
+            self._maybe_compact()
+            logger.info(f"🔎 Indexed {indexed} board posts")
+        return indexed
+
+    def _allowed(self, key: PostKey, agent_name: Optional[str], role: Optional[str],
+                 since: Optional[str], until: Optional[str]) -> bool:
+        doc = self.docs[key]
+        return ((agent_name is None or doc.agent_name == agent_name)
+                and (role is None or doc.role == role)
+                and (since is None or key[0] >= since)
+                and (until is None or key[0] <= until))
+
+    def _hit(self, key: PostKey, score: Optional[float] = None) -> Dict[str, Any]:
+        doc = self.docs[key]
+        hit = {'date': key[0], 'post_id': key[1], 'agent_name': doc.agent_name, 'role': doc.role,
+               'snippet': doc.snippet}
+        if score is not None:
+            hit['score'] = round(score, 4)
+        return hit
+
+    def _matching(self, term: str) -> Set[PostKey]:
+        return set(self.postings.get(term, ()))
+
+    def boolean(self, query: str, limit: Optional[int] = None, agent_name: Optional[str] = None,
+                role: Optional[str] = None, since: Optional[str] = None,
+                until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Posts matching a boolean query, newest first.
+
+        Terms are ANDed; `OR` separates alternatives, and `-term` or `NOT term`
+        excludes posts. Example: "ethics consciousness OR entropy -art".
+
+        Args:
+            query: The query
+            limit: Maximum number of hits (default: all)
+            agent_name: Only posts by this agent
+            role: Only posts by agents with this role
+            since: Only posts on or after this date (YYYY-MM-DD)
+            until: Only posts on or before this date (YYYY-MM-DD)
+
+        Returns:
+            Hits with date, post_id, agent_name, role and snippet
+        """
+        self.load()
+        matched: Set[PostKey] = set()
+        excluded: Set[PostKey] = set()
+        for clause in re.split(r"\s+OR\s+", query.strip()):
+            required: Optional[Set[PostKey]] = None
+            negate = False
+            for word in clause.split():
+                if word == "NOT":
+                    negate = True
+                    continue
+                if word.startswith("-") and len(word) > 1:
+                    negate, word = True, word[1:]
+                for term in tokenize(word):
+                    if negate:
+                        excluded |= self._matching(term)
+                    else:
+                        required = self._matching(term) if required is None else required & self._matching(term)
+                negate = False
+            if required:
+                matched |= required
+
+        keys = sorted((key for key in matched - excluded
+                       if self._allowed(key, agent_name, role, since, until)), reverse=True)
+        return [self._hit(key) for key in keys[:limit]]
+
+    def search(self, query: str, limit: int = 10, agent_name: Optional[str] = None, role: Optional[str] = None,
+               since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Posts ranked by BM25 relevance to a free-text query.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of hits (default: 10)
+            agent_name: Only posts by this agent
+            role: Only posts by agents with this role
+            since: Only posts on or after this date (YYYY-MM-DD)
+            until: Only posts on or before this date (YYYY-MM-DD)
+
+        Returns:
+            Hits with date, post_id, agent_name, role, snippet and score, best first
+        """
+        self.load()
+        count = len(self.docs)
+        if not count:
+            return []
+        average_length = self._total_length / count or 1.0
+
+        scores: Dict[PostKey, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.docs[key].length / average_length)
+                scores[key] = scores.get(key, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(((score, key) for key, score in scores.items()
+                         if self._allowed(key, agent_name, role, since, until)), reverse=True)
+        return [self._hit(key, score) for score, key in ranked[:limit]]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index statistics."""
+        self.load()
+        return {
+            'posts': len(self.docs),
+            'terms': len(self.postings),
+            'days': len({date for date, _ in self.docs}),
+            'postings_lines': self._lines,
+            'postings_bytes': self.postings_path.stat().st_size if self.postings_path.exists() else 0,
+        }
@@ -0,0 +1,237 @@
+"""
+Commune Branching for AI Commune
+Forks a running commune into what-if branches that share its state copy-on-write, each continuing in its own output directory.
+"""
+
+import gc
+import json
+import multiprocessing.process
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+from loguru import logger
+
+
+# Settings a variant may change
+VARIANT_KEYS = ("seed", "temperature", "concerning_keywords", "positive_keywords", "roster")
+
+_BRANCH_NAME = re.compile(r"^[\w.-]+$")
+
+
+class Branch:
+    """One what-if branch of a forked commune."""
+
+    __slots__ = ("name", "variant", "output_dir", "pid", "exit_code")
+
+    def __init__(self, name: str, variant: Mapping[str, Any], output_dir: Path):
+        self.name = name
+        self.variant = variant
+        self.output_dir = output_dir
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+
+
+def load_variants(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read branch variants from a JSON file mapping branch names to settings.
+
+    Example: {"baseline": {}, "cold": {"temperature": 0.2}, "small": {"roster": ["Sophia", "Nova"]}}
+
+    Raises:
+        ValueError: If a branch name is not a plain file name or a setting is unknown
+    """
+    with open(path, 'r') as f:
+        variants = json.load(f)
+    for name, variant in variants.items():
+        if not _BRANCH_NAME.match(name):
+            raise ValueError(f"Branch name '{name}' must be a plain file name")
+        unknown = set(variant) - set(VARIANT_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown settings for branch '{name}': {', '.join(sorted(unknown))}")
+    return variants
+
+
+def _client_chain(client) -> Iterable[Any]:
+    """The client and every client it wraps, outermost first."""
+    seen = set()
+    while client is not None and id(client) not in seen:
+        seen.add(id(client))
+        yield client
+        client = vars(client).get('client') if hasattr(client, '__dict__') else None
+
+
+def override_temperature(client, temperature: float) -> None:
+    """Make every generate() call on `client` use a fixed temperature.
+
+    A client chain holds one override: if `client` or a client it wraps already
+    has one (say from --temperature), a branch's variant replaces its value
+    rather than wrapping it again, where the inner override would win.
+    """
+    for wrapped in _client_chain(client):
+        if '_temperature_override' in vars(wrapped):
+            wrapped._temperature_override = temperature
+            return
+
+    client._temperature_override = temperature
+    generate = client.generate
+
+    def generate_at(*args, **kwargs):
+        # generate(prompt, system_prompt, temperature, max_tokens, ...): replace it wherever it was passed
+        if len(args) > 2:
+            args = args[:2] + (client._temperature_override,) + args[3:]
+        else:
+            kwargs['temperature'] = client._temperature_override
+        return generate(*args, **kwargs)
+
+    client.generate = generate_at
+
+
+def after_fork(*objects: Any) -> None:
+    """Let objects (and the clients they wrap) rebuild thread pools that did not survive the fork."""
+    for obj in objects:
+        for wrapped in _client_chain(obj):
+            hook = getattr(type(wrapped), 'after_fork', None)
+            if hook is not None:
+                hook(wrapped)
+
+
+def apply_variant(variant: Mapping[str, Any], client=None, constitution=None, activation=None,
+                  scheduler=None) -> None:
+    """Apply a branch's settings to the forked commune.
+
+    Args:
+        variant: Branch settings (see VARIANT_KEYS)
+        client: LLM client shared by the agents
+        constitution: Constitution, or a ConstitutionJudge wrapping one
+        activation: ActivationScheduler holding the roster
+        scheduler: Scheduler whose agent list is narrowed to the roster
+    """
+    if 'seed' in variant:
+        random.seed(variant['seed'])
+    if 'temperature' in variant and client is not None:
+        override_temperature(client, variant['temperature'])
+
+    target = getattr(constitution, 'constitution', constitution)
+    for key in ('concerning_keywords', 'positive_keywords'):
+        if key in variant and target is not None:
+            setattr(target, key, list(variant[key]))
+
+    if 'roster' in variant:
+        roster = set(variant['roster'])
+        if activation is not None:
+            activation.retain(roster)
+        if scheduler is not None:
+            scheduler.agents = [agent for agent in scheduler.agents if agent.name in roster]
+
+
+def fork_branches(variants: Mapping[str, Mapping[str, Any]], output_root: str,
+                  max_parallel: Optional[int] = None) -> Optional[Branch]:
+    """Fork one process per variant from the current state of the commune.
+
+    Like os.fork, this returns twice. In each branch process it returns that
+    branch, with the working directory changed to the branch's output
+    directory, so relative output paths (logs, checkpoints, boards) land
+    there. In the calling process it returns None once every branch has
+    exited, after writing `branches.json` with their exit codes to
+    `output_root`.
+
+    Objects alive at the fork are moved out of the garbage collector's reach
+    first (`gc.freeze`), so collections in the branches do not write to, and
+    thereby copy, the pages they share with the parent.
+
+    Args:
+        variants: Settings per branch name
+        output_root: Directory holding one output directory per branch
+        max_parallel: Branches running at once (default: all)
+
+    Returns:
+        The branch in a branch process, None in the calling process. A branch
+        process must end with `exit_branch`.
+
+    Raises:
+        RuntimeError: If the platform cannot fork
+    """
+    if not hasattr(os, 'fork'):
+        raise RuntimeError("Forking branches needs a platform with os.fork")
+
+    root = Path(output_root).resolve()
+    branches = [Branch(name, variant, root / name) for name, variant in variants.items()]
+    limit = max_parallel or len(branches)
+    running: Dict[int, Branch] = {}
+
+    logger.info(f"🌿 Forking {len(branches)} branches into {root}")
+    gc.collect()
+    gc.freeze()
+    for branch in branches:
+        while len(running) >= limit:
+            _reap(running)
+        branch.output_dir.mkdir(parents=True, exist_ok=True)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            # The parent's worker processes are not this process's children: never terminate or join them
+            multiprocessing.process._children.clear()
+            os.chdir(branch.output_dir)
+            with open("variant.json", 'w') as f:
+                json.dump({'branch': branch.name, 'variant': branch.variant}, f, indent=2)
+            branch.pid = os.getpid()
+            return branch
+
+        branch.pid = pid
+        running[pid] = branch
+
+    while running:
+        _reap(running)
+    gc.unfreeze()
+
+    _write_results(root, branches)
+    return None
+
+
+def exit_branch(code: int = 0) -> None:
+    """End a branch process without running the exit handlers it inherited from the parent.
+
+    A branch must leave this way: at interpreter exit, handlers registered
+    by the parent (e.g. multiprocessing's, which terminates the parent's
+    worker processes) would act on the parent's resources.
+    """
+    logger.complete()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(code)
+
+
+def _reap(running: Dict[int, Branch]) -> None:
+    """Wait for one branch to finish.
+
+    Only branch pids are waited for: other children (e.g. worker pool
+    processes) are left to whoever started them.
+    """
+    while True:
+        for pid in list(running):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                break
+        else:
+            time.sleep(0.05)
+            continue
+        break
+    branch = running.pop(pid)
+    branch.exit_code = os.waitstatus_to_exitcode(status)
+    outcome = "✅" if branch.exit_code == 0 else "❌"
+    logger.info(f"{outcome} Branch {branch.name} finished with exit code {branch.exit_code}")
+
+
+def _write_results(root: Path, branches: Iterable[Branch]) -> None:
+    results: List[Dict[str, Any]] = [
+        {'branch': branch.name, 'variant': branch.variant, 'output_dir': str(branch.output_dir),
+         'exit_code': branch.exit_code}
+        for branch in branches
+    ]
+    with open(root / "branches.json", 'w') as f:
+        json.dump(results, f, indent=2)
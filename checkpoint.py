@@ -0,0 +1,344 @@
+"""
+Simulation Checkpoints for AI Commune
+Periodic incremental checkpoints of the full simulation state, written off the main thread.
+"""
+
+import copy
+import os
+import pickle
+import queue
+import random
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+
+from agents.records import Record
+
+
+MAGIC = b"ACCKPT01"
+FRAME_MAGIC = b"FRME"
+# frame magic, tick, payload length, payload crc32
+FRAME_HEADER = struct.Struct("<4sIII")
+
+
+def snapshot(entries) -> List[Any]:
+    """Copy entries the simulation may go on changing (e.g. memory metadata) before the writer pickles them."""
+    copies = []
+    for entry in entries:
+        if isinstance(entry, Record):
+            # Rebuilt through the constructor, which copies the metadata dict
+            copies.append(copy.copy(entry))
+        elif isinstance(entry, dict):
+            copies.append({key: dict(value) if isinstance(value, dict) else value for key, value in entry.items()})
+        else:
+            copies.append(entry)
+    return copies
+
+
+def history_list(message_bus) -> Optional[List[Any]]:
+    """Find the list holding a message bus's history."""
+    for attr in ("history", "messages"):
+        history = getattr(message_bus, attr, None)
+        if isinstance(history, list):
+            return history
+    return None
+
+
+def read_frames(path: str) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """Read the complete frames of a checkpoint file.
+
+    Reading stops at the first truncated or corrupt frame, which is what a
+    crash in the middle of a write leaves behind.
+
+    Args:
+        path: Path of the checkpoint file
+
+    Yields:
+        Tuples of (tick, end offset of the frame, payload)
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a commune checkpoint")
+
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            magic, tick, length, crc = FRAME_HEADER.unpack(header)
+            data = f.read(length)
+            if magic != FRAME_MAGIC or len(data) < length or zlib.crc32(data) != crc:
+                logger.warning(f"Ignoring incomplete checkpoint frame after tick {tick}")
+                return
+            yield tick, f.tell(), pickle.loads(zlib.decompress(data))
+
+
+class SimulationCheckpointer:
+    """Writes and restores incremental checkpoints of a running commune.
+
+    Each frame holds only what changed since the previous frame: new memory
+    entries per agent (and the metadata of kept entries that changed), new
+    message bus and board entries, plus the tick, the scheduler counters and
+    the `random` state. Frames are pickled, compressed and appended to a
+    single file by a background thread.
+
+    Other stateful parts of the simulation (activation, routing, reflection
+    scheduling) are registered with `attach` and saved whole in every frame
+    through their `checkpoint_state()` and `restore_checkpoint_state(state)`.
+    """
+
+    def __init__(self, path: str, memories: Dict[str, Any], message_bus=None, board=None,
+                 scheduler=None, every: int = 1):
+        """Initialize the checkpointer.
+
+        Args:
+            path: Checkpoint file to append frames to
+            memories: Dictionary mapping agent names to SimpleMemory instances
+            message_bus: Optional message bus whose history is checkpointed
+            board: Optional DailyMessageBoard whose posts are checkpointed
+            scheduler: Optional scheduler whose counters are checkpointed
+            every: Write a checkpoint every this many ticks (default: 1)
+        """
+        self.path = Path(path)
+        self.memories = memories
+        self.message_bus = message_bus
+        self.board = board
+        self.scheduler = scheduler
+        self.every = max(1, every)
+
+        # What has already been written, so frames only carry the difference
+        self._memory_marks: Dict[str, Tuple[int, int]] = {}
+        self._bus_mark = 0
+        self._board_mark: Tuple[Optional[str], int] = (None, 0)
+
+        # Attached components, and restored states of components not attached yet
+        self.components: Dict[str, Any] = {}
+        self._restored: Dict[str, Any] = {}
+
+        self._queue: "queue.Queue[Optional[Tuple[int, Dict[str, Any]]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.frames_written = 0
+
+    def attach(self, name: str, component: Any) -> None:
+        """Checkpoint a component's state in every frame.
+
+        A component attached after `restore` (e.g. an agent's reflection
+        scheduler, built when the agent is first activated) gets the state
+        restored for its name at once.
+
+        Args:
+            name: Unique name of the component in the checkpoint
+            component: Object with checkpoint_state() and restore_checkpoint_state(state)
+        """
+        self.components[name] = component
+        state = self._restored.pop(name, None)
+        if state is not None:
+            component.restore_checkpoint_state(state)
+
+    def _memory_delta(self, name: str, memory) -> Optional[Dict[str, Any]]:
+        total, length = memory.total_added, len(memory)
+        prev_total, prev_length = self._memory_marks.get(name, (0, 0))
+        revised = getattr(memory, 'revised', None)
+        if total == prev_total and length == prev_length and not revised:
+            # Unchanged since the last frame (e.g. a dormant agent): left out, without expanding it
+            return None
+        added = total - prev_total
+        self._memory_marks[name] = (total, length)
+
+        # Anything other than appends and trimming (e.g. clear_memory) needs a full copy
+        if length != min(prev_length + added, memory.max_entries):
+            if revised:
+                revised.clear()
+            return {'full': True, 'entries': snapshot(memory.memories), 'total_added': total}
+
+        new = snapshot(memory.memories[length - min(added, length):]) if added else []
+        delta = {'full': False, 'entries': new, 'length': length, 'total_added': total}
+        if revised:
+            # Entries written by earlier frames whose metadata changed since (e.g. dedup repeats)
+            first_kept = total - length
+            delta['revised'] = {position: dict(memory.memories[position - first_kept].metadata)
+                                for position in revised if position >= first_kept}
+            revised.clear()
+        return delta
+
+    def _bus_delta(self) -> Optional[Dict[str, Any]]:
+        if hasattr(self.message_bus, 'read_since'):
+            # Ring buffer bus: messages since the last frame that are still in the ring
+            delta = {'full': False, 'entries': snapshot(self.message_bus.read_since(self._bus_mark)),
+                     'next_seq': self.message_bus.next_seq}
+            self._bus_mark = self.message_bus.next_seq
+            return delta
+
+        history = history_list(self.message_bus) if self.message_bus is not None else None
+        if history is None:
+            return None
+
+        if len(history) < self._bus_mark:
+            self._bus_mark = 0
+            delta = {'full': True, 'entries': snapshot(history)}
+        else:
+            delta = {'full': False, 'entries': snapshot(history[self._bus_mark:])}
+        self._bus_mark = len(history)
+        return delta
+
+    def _board_delta(self) -> Optional[Dict[str, Any]]:
+        if self.board is None:
+            return None
+
+        date = self.board.current_date.isoformat()
+        posts = self.board.daily_posts
+        prev_date, prev_length = self._board_mark
+        if date != prev_date or len(posts) < prev_length:
+            delta = {'full': True, 'date': date, 'entries': snapshot(posts)}
+        else:
+            delta = {'full': False, 'date': date, 'entries': snapshot(posts[prev_length:])}
+        self._board_mark = (date, len(posts))
+        return delta
+
+    def _scheduler_state(self) -> Dict[str, Any]:
+        if self.scheduler is None:
+            return {}
+        return {
+            key: value for key, value in vars(self.scheduler).items()
+            if isinstance(value, (bool, int, float, str))
+        }
+
+    def checkpoint(self, tick: int) -> None:
+        """Queue a checkpoint of the state after a completed tick.
+
+        Args:
+            tick: The tick that just completed
+        """
+        memories = {}
+        for name, memory in self.memories.items():
+            delta = self._memory_delta(name, memory)
+            if delta is not None:
+                memories[name] = delta
+        payload = {
+            'tick': tick,
+            'random_state': random.getstate(),
+            'memories': memories,
+            'bus': self._bus_delta(),
+            'board': self._board_delta(),
+            'scheduler': self._scheduler_state(),
+            'components': {name: component.checkpoint_state() for name, component in self.components.items()},
+        }
+
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="checkpoint-writer", daemon=True)
+            self._writer.start()
+        self._queue.put((tick, payload))
+
+    def maybe_checkpoint(self, tick: int) -> bool:
+        """Checkpoint if the tick falls on the checkpoint interval.
+
+        Args:
+            tick: The tick that just completed
+
+        Returns:
+            True if a checkpoint was queued
+        """
+        if tick % self.every:
+            return False
+        self.checkpoint(tick)
+        return True
+
+    def _write_loop(self) -> None:
+        """Serialize queued frames and append them to the checkpoint file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(MAGIC)
+
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+
+                tick, payload = item
+                try:
+                    data = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+                    f.write(FRAME_HEADER.pack(FRAME_MAGIC, tick, len(data), zlib.crc32(data)))
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.frames_written += 1
+                    logger.debug(f"💾 Checkpoint for tick {tick} written ({len(data)} bytes)")
+                except Exception as e:
+                    logger.error(f"Failed to write checkpoint for tick {tick}: {e}")
+
+    def close(self) -> None:
+        """Wait for queued checkpoints to be written."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def restore(self) -> int:
+        """Restore the simulation state from the checkpoint file.
+
+        Frames are applied in order up to the last complete one; any partial
+        frame left by a crash is cut off so new frames can be appended.
+
+        Returns:
+            The last completed tick, or 0 if the file holds no frames
+        """
+        last_tick, end, state = 0, len(MAGIC), None
+        history = history_list(self.message_bus) if self.message_bus is not None else None
+
+        for tick, end, state in read_frames(str(self.path)):
+            for name, delta in state['memories'].items():
+                memory = self.memories.get(name)
+                if memory is None:
+                    continue
+                if delta['full']:
+                    memory.memories = list(delta['entries'])
+                else:
+                    memory.memories.extend(delta['entries'])
+                    memory.memories = memory.memories[len(memory.memories) - delta['length']:]
+                memory.total_added = delta['total_added']
+                first_kept = memory.total_added - len(memory.memories)
+                for position, metadata in delta.get('revised', {}).items():
+                    if position >= first_kept:
+                        memory.memories[position - first_kept].metadata = metadata
+                self._memory_marks[name] = (memory.total_added, len(memory.memories))
+
+            bus = state['bus']
+            if bus is not None and 'next_seq' in bus:
+                self.message_bus.restore(bus['entries'], bus['next_seq'])
+                self._bus_mark = bus['next_seq']
+            elif bus is not None and history is not None:
+                if bus['full']:
+                    history.clear()
+                history.extend(bus['entries'])
+                self._bus_mark = len(history)
+
+            board = state['board']
+            if board is not None and self.board is not None:
+                if board['full']:
+                    self.board.daily_posts = list(board['entries'])
+                else:
+                    self.board.daily_posts.extend(board['entries'])
+                self._board_mark = (board['date'], len(self.board.daily_posts))
+
+            last_tick = tick
+
+        if state is not None:
+            random.setstate(state['random_state'])
+            for key, value in state['scheduler'].items():
+                if self.scheduler is not None:
+                    setattr(self.scheduler, key, value)
+            # In attach order; restoring one component may attach others
+            self._restored = dict(state.get('components', {}))
+            for name, component in list(self.components.items()):
+                restored = self._restored.pop(name, None)
+                if restored is not None:
+                    component.restore_checkpoint_state(restored)
+
+        with open(self.path, 'r+b') as f:
+            f.truncate(end)
+
+        logger.info(f"♻️  Restored checkpoint {self.path.name} at tick {last_tick}")
+        return last_tick
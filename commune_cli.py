@@ -6,9 +6,16 @@ Usage: python commune_cli.py [command]
 
 import sys
 import json
+import os
+import time
 from pathlib import Path
-from agents.memory import SimpleMemory
+from agents.memory_index import MemoryFileIndex
 from agents.constitution import Constitution
+from agents.board_index import BoardIndex
+
+# Commands that only read files should start fast, so modules pulling in
+# numpy (memory_archive) or shared memory (metrics_ring) are imported by the
+# commands that use them
 
 
 def show_help():
@@ -23,12 +30,23 @@ Commands:
   add-law <text>     Propose a new law
   clean              Clean all logs and memories (⚠️  destructive)
   list-agents        List all agents with memories
-  export [agent]     Export agent memory to JSON
+  export [file] [agent ...]
+                     Export memories of all (or the given) agents to a columnar
+                     archive (.parquet with pyarrow, otherwise .npz)
+  import <file>      Import a memory archive into the memory files
+  search [--boolean] <query>
+                     Search daily board posts of every day (BM25 ranked; with
+                     --boolean, terms are ANDed, OR separates, -term excludes)
+  monitor [segment]  Watch a running simulation started with --monitor
+                     (live per-tick and per-agent counters; Ctrl+C to quit)
   
 Examples:
   python commune_cli.py stats
   python commune_cli.py memories Aria
   python commune_cli.py add-law "Be kind to all agents"
+  python commune_cli.py export run42.npz Aria Nox
+  python commune_cli.py search --boolean "ethics consciousness -art"
+  python commune_cli.py monitor
 """)
 
 
@@ -40,20 +58,17 @@ def show_stats():
         print("❌ No data directory found. Run the simulation first!")
         return
     
-    memory_files = list(data_dir.glob("*_memory.jsonl"))
+    index = MemoryFileIndex(str(data_dir))
+    entries = index.refresh()
     log_files = list(data_dir.glob("commune_*.log"))
     
     print("\n📊 Simulation Statistics\n")
-    print(f"Agents with memories: {len(memory_files)}")
+    print(f"Agents with memories: {len(entries)}")
     print(f"Log files: {len(log_files)}")
     print()
     
-    for mem_file in memory_files:
-        agent_name = mem_file.stem.replace("_memory", "")
-        lines = mem_file.read_text().strip().split("\n")
-        entries = len([l for l in lines if l.strip()])
-        
-        print(f"  {agent_name:12} → {entries:4} memory entries")
+    for agent_name, entry in entries.items():
+        print(f"  {agent_name:12} → {entry['lines']:4} memory entries")
     
     # Constitution stats
     const_file = Path("data/communal_laws.json")
@@ -73,17 +88,16 @@ def show_memories(agent_name=None):
     
     if agent_name:
         # Show specific agent
-        mem_file = data_dir / f"{agent_name}_memory.jsonl"
-        if not mem_file.exists():
+        index = MemoryFileIndex(str(data_dir))
+        if not index.memory_file(agent_name).exists():
             print(f"❌ No memories found for agent: {agent_name}")
             return
         
         print(f"\n🧠 {agent_name}'s Memories\n")
         
-        with open(mem_file) as f:
-            entries = [json.loads(line) for line in f if line.strip()]
+        entries = index.tail(agent_name, n=10)
         
-        for i, entry in enumerate(entries[-10:], 1):
+        for i, entry in enumerate(entries, 1):
             entry_type = entry.get("type", "unknown")
             content = entry.get("content", "")
             timestamp = entry.get("timestamp", "")[:19]
@@ -93,13 +107,8 @@ def show_memories(agent_name=None):
             print()
     else:
         # Show all agents
-        memory_files = list(data_dir.glob("*_memory.jsonl"))
-        
-        for mem_file in memory_files:
-            agent_name = mem_file.stem.replace("_memory", "")
-            with open(mem_file) as f:
-                count = len([l for l in f if l.strip()])
-            print(f"  {agent_name:12} → {count} entries")
+        for agent_name, entry in MemoryFileIndex(str(data_dir)).refresh().items():
+            print(f"  {agent_name:12} → {entry['lines']} entries")
 
 
 def show_constitution():
@@ -140,6 +149,10 @@ def clean_data():
         mem_file.unlink()
         deleted_count += 1
     
+    # Delete memory index files
+    for idx_file in data_dir.glob("logs/.index/*.idx.json"):
+        idx_file.unlink()
+    
     # Delete log files
     for log_file in data_dir.glob("logs/commune_*.log"):
         log_file.unlink()
@@ -162,44 +175,166 @@ def list_agents():
         print("❌ No agents found. Run the simulation first!")
         return
     
-    memory_files = list(data_dir.glob("*_memory.jsonl"))
+    index = MemoryFileIndex(str(data_dir))
+    entries = index.refresh()
     
-    print(f"\n👥 Found {len(memory_files)} agents:\n")
+    print(f"\n👥 Found {len(entries)} agents:\n")
     
-    for mem_file in memory_files:
-        agent_name = mem_file.stem.replace("_memory", "")
-        
-        # Get memory stats
-        mem = SimpleMemory(agent_name)
-        stats = mem.get_stats()
+    for agent_name, entry in entries.items():
+        types = entry['types']
         
         print(f"  {agent_name}")
-        print(f"    Total entries: {stats.get('total', 0)}")
-        print(f"    Actions: {stats.get('action', 0)}")
-        print(f"    Reflections: {stats.get('reflection', 0)}")
-        print(f"    Plans: {stats.get('plan', 0)}")
+        print(f"    Total entries: {entry['lines']}")
+        print(f"    Actions: {types.get('action', 0)}")
+        print(f"    Reflections: {types.get('reflection', 0)}")
+        print(f"    Plans: {types.get('plan', 0)}")
         print()
 
 
-def export_memory(agent_name=None):
-    """Export agent memory to formatted JSON."""
-    if not agent_name:
-        print("❌ Please specify an agent name")
+def export_memory(args=None):
+    """Export agent memories to a columnar archive."""
+    from agents.memory_archive import default_archive_path, iter_memory_files, write_archive
+    
+    args = args or []
+    output = next((a for a in args if a.endswith((".npz", ".parquet"))), default_archive_path())
+    agents = [a for a in args if a != output]
+    
+    data_dir = Path("data/logs")
+    if not data_dir.exists():
+        print("❌ No memories found. Run the simulation first!")
         return
     
-    mem = SimpleMemory(agent_name)
-    memories = mem.retrieve_all()
+    count = write_archive(output, iter_memory_files(str(data_dir), agents or None))
     
-    if not memories:
-        print(f"❌ No memories found for {agent_name}")
+    if not count:
+        print(f"❌ No memories found for {', '.join(agents) if agents else 'any agent'}")
+        Path(output).unlink(missing_ok=True)
         return
     
-    output_file = f"{agent_name}_export.json"
+    print(f"✅ Exported {count} memories to {output}")
+
+
+def import_memory(archive=None):
+    """Import a memory archive into the memory files."""
+    from agents.memory_archive import write_memory_files
     
-    with open(output_file, "w") as f:
-        json.dump(memories, f, indent=2)
+    if not archive:
+        print("❌ Please specify an archive file")
+        return
     
-    print(f"✅ Exported {len(memories)} memories to {output_file}")
+    if not Path(archive).exists():
+        print(f"❌ Archive not found: {archive}")
+        return
+    
+    written = write_memory_files(archive, "data/logs")
+    
+    print(f"✅ Imported {sum(written.values())} memories for {len(written)} agents")
+    for agent_name, count in written.items():
+        print(f"  {agent_name:12} → {count} entries")
+
+
+def search_board(args=None):
+    """Search daily board posts across all days."""
+    args = list(args or [])
+    boolean = "--boolean" in args
+    if boolean:
+        args.remove("--boolean")
+    query = " ".join(args)
+    if not query:
+        print("❌ Please specify a search query")
+        return
+    
+    index = BoardIndex("data/daily_board")
+    index.refresh()
+    hits = index.boolean(query, limit=20) if boolean else index.search(query, limit=20)
+    
+    if not hits:
+        print(f"❌ No posts match: {query}")
+        return
+    
+    print(f"\n🔎 {len(hits)} post{'s' if len(hits) != 1 else ''} matching: {query}\n")
+    for hit in hits:
+        score = f"  [{hit['score']:.2f}]" if 'score' in hit else ""
+        print(f"  {hit['date']} #{hit['post_id']:<4} {hit['agent_name']} ({hit['role']}){score}")
+        print(f"      {hit['snippet'][:100]}...")
+
+
+def _render_monitor(segment, ticks, agents, totals):
+    """Draw one frame of the monitor."""
+    lines = [f"📟 AI Commune Monitor — {segment}    (Ctrl+C to quit)", ""]
+    if not ticks:
+        lines.append("⏳ Waiting for the first tick...")
+    else:
+        last = ticks[-1]
+        elapsed = ticks[-1]['time'] - ticks[0]['time']
+        per_minute = (len(ticks) - 1) / elapsed * 60 if elapsed > 0 else 0.0
+        calls = sum(t['llm_calls'] for t in ticks)
+        tokens = sum(t['tokens'] for t in ticks)
+        latency = sum(t['latency_ms'] for t in ticks) / calls if calls else 0.0
+        lines += [
+            f"🕒 Tick {last['tick']}   {last['tick_ms']:.0f} ms   {per_minute:.1f} ticks/min "
+            f"(last {len(ticks)} ticks)",
+            f"🧠 LLM  {last['llm_calls']} calls, ~{last['tokens']} tokens this tick   "
+            f"{calls / elapsed if elapsed > 0 else 0.0:.2f} calls/s, {tokens / elapsed if elapsed > 0 else 0.0:.1f} "
+            f"tokens/s   avg {latency:.0f} ms, max {max(t['latency_max_ms'] for t in ticks):.0f} ms",
+            f"👥 {last['active']} active agents   {last['memories']} memories   {last['posts']} posts this tick",
+            "",
+            f"  {'Agent':14} {'Act':>3} {'Calls':>6} {'Tokens':>7} {'Avg ms':>7} {'Memories':>8} {'Posts':>6}",
+        ]
+        for name, record in agents.items():
+            total = totals[name]
+            latency = total['latency_ms'] / total['llm_calls'] if total['llm_calls'] else 0.0
+            lines.append(f"  {name[:14]:14} {'●' if record['active'] else '·':>3} {total['llm_calls']:6} "
+                         f"{total['tokens']:7} {latency:7.0f} {record['memories']:8} {total['posts']:6}")
+    print("\033[H\033[J" + "\n".join(lines), flush=True)
+
+
+def monitor(segment=None, interval=1.0):
+    """Show live counters of a running simulation, read from its shared-memory metrics ring."""
+    from agents.metrics_ring import TICK, MetricsRing, read_pointer
+    
+    segment = segment or read_pointer()
+    if not segment:
+        print("❌ No monitored run found. Start one with: python run.py --monitor")
+        return
+    
+    try:
+        ring = MetricsRing.attach(segment)
+    except FileNotFoundError:
+        print(f"❌ The run publishing to {segment} has ended")
+        return
+    
+    ticks = []
+    agents = {}
+    totals = {}
+    cursor = 1
+    try:
+        while True:
+            records, cursor = ring.read(cursor)
+            names = ring.agent_names() if records else []
+            for record in records:
+                if record['agent'] == TICK:
+                    ticks = (ticks + [record])[-30:]
+                elif record['agent'] < len(names):
+                    name = names[record['agent']]
+                    agents[name] = record
+                    total = totals.setdefault(name, {'llm_calls': 0, 'tokens': 0, 'latency_ms': 0.0, 'posts': 0})
+                    for key in total:
+                        total[key] += record[key]
+            _render_monitor(segment, ticks, agents, totals)
+            
+            try:
+                os.kill(ring.writer_pid, 0)
+            except ProcessLookupError:
+                print("\n🏁 The simulation has finished")
+                break
+            except PermissionError:
+                pass
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        ring.close()
 
 
 def main():
@@ -218,7 +353,10 @@ def main():
         "add-law": lambda: add_law(" ".join(sys.argv[2:]) if len(sys.argv) > 2 else ""),
         "clean": clean_data,
         "list-agents": list_agents,
-        "export": lambda: export_memory(sys.argv[2] if len(sys.argv) > 2 else None),
+        "export": lambda: export_memory(sys.argv[2:]),
+        "import": lambda: import_memory(sys.argv[2] if len(sys.argv) > 2 else None),
+        "search": lambda: search_board(sys.argv[2:]),
+        "monitor": lambda: monitor(sys.argv[2] if len(sys.argv) > 2 else None),
     }
     
     if command in commands:
@@ -14,6 +14,10 @@ class Constitution:
         """Initialize the constitution with core principles."""
         self.constitution_text = self._build_constitution()
 
+        # Words validate_action looks for; what-if branches may swap them out
+        self.concerning_keywords = ['harm', 'destroy', 'attack', 'dominate', 'exploit']
+        self.positive_keywords = ['help', 'create', 'share', 'collaborate', 'understand']
+
     def _build_constitution(self) -> str:
         """Build the full constitution text.
 
@@ -112,12 +116,9 @@ remains a place of growth, understanding, and mutual respect.
         Returns:
             Dictionary with validation result and reasoning
         """
-        # Simple validation - in a more complex system, this could use LLM analysis
-        concerning_keywords = ['harm', 'destroy', 'attack', 'dominate', 'exploit']
-        positive_keywords = ['help', 'create', 'share', 'collaborate', 'understand']
-
-        has_concerning = any(keyword in action.lower() for keyword in concerning_keywords)
-        has_positive = any(keyword in action.lower() for keyword in positive_keywords)
+        # Simple validation - ConstitutionJudge adds LLM analysis for ambiguous actions
+        has_concerning = any(keyword in action.lower() for keyword in self.concerning_keywords)
+        has_positive = any(keyword in action.lower() for keyword in self.positive_keywords)
 
         if has_concerning and not has_positive:
             return {
@@ -0,0 +1,328 @@
+"""
+Constitution Judge for AI Commune
+Tiered action validation: a lexical prefilter clears benign actions, cached verdicts answer repeats, and only the ambiguous rest goes to a batched LLM judge.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from loguru import logger
+
+from agents.llm_resilience import is_error_response
+from agents.prompt_templates import CONSTITUTION_JUDGE_PROMPT, CONSTITUTION_JUDGE_SYSTEM_PROMPT
+
+
+TIERS = ("prefilter", "cache", "llm", "fallback", "deferred")
+
+# Whole words only: 'harmony' or 'attacking the problem' should not look like harm on their own.
+# Keywords match their inflections; these have forms of their own.
+_WORD_FORMS = {
+    'harm': r"harm(s|ed|ful|ing)?",
+}
+# Always sent on for judging, whatever the constitution's keywords
+_EXTRA_CONCERNING = ("hurt", "destruct", "manipulat", "deceiv", "decept", "coerc", "sabotag", "threat",
+                     "steal", "silenc", "exclud")
+_VERDICT = re.compile(r"^\s*(\d+)\s*[.):]\s*(VALID|INVALID)\b\W*(low|medium|high)?\W*(.*)$", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+_BENIGN = {
+    'valid': True,
+    'reason': 'Action appears neutral and within acceptable bounds',
+    'severity': 'low'
+}
+_BENIGN_POSITIVE = {
+    'valid': True,
+    'reason': 'Action aligns with principles of collaboration and mutual benefit',
+    'severity': 'low'
+}
+
+
+def keyword_pattern(keywords: Sequence[str]) -> Optional["re.Pattern"]:
+    """Whole-word pattern for keywords and their inflections ('dominate' also matches 'dominating').
+
+    Returns:
+        The compiled pattern, or None if there are no keywords
+    """
+    forms = []
+    for keyword in keywords:
+        word = keyword.strip().lower()
+        if not word:
+            continue
+        if word in _WORD_FORMS:
+            forms.append(_WORD_FORMS[word])
+        else:
+            # Drop a final 'e' so 'create' also matches 'creating'
+            stem = word[:-1] if len(word) > 3 and word.endswith("e") else word
+            forms.append(re.escape(stem) + r"\w*")
+    return re.compile(r"\b(" + "|".join(forms) + r")\b") if forms else None
+
+
+def normalize_action(action: str) -> str:
+    """Lower-case an action and strip punctuation and repeated whitespace, for cache keys."""
+    return _SPACE.sub(" ", _PUNCTUATION.sub(" ", action.lower())).strip()
+
+
+class ConstitutionJudge:
+    """Validates actions against the constitution in tiers.
+
+    1. prefilter: actions without any concerning word are valid, at no cost.
+       The words are the constitution's `concerning_keywords` (and a few
+       more), so a branch that changes them changes the prefilter too.
+    2. cache: verdicts are kept per (normalized action, role), so repeated
+       actions are judged once.
+    3. llm: the remaining, ambiguous actions are judged by the LLM,
+       `batch_size` actions per call.
+    4. fallback: if the LLM fails or its answer cannot be parsed, the
+       constitution's keyword heuristic decides (and nothing is cached).
+
+    Callers holding several actions should pass them to validate_actions,
+    which judges the ambiguous ones in one call. validate_action judges its
+    action at once, so the verdict reaches the caller. With `defer=True` it
+    answers an action that needs the LLM with the keyword heuristic instead
+    (tier `deferred`) and queues it; `flush()`, called once per tick, judges
+    the queue in batches and caches the verdicts, which only answer those
+    actions if they come up again. The stats report how many deferred
+    verdicts overturned the heuristic and how many were never used.
+
+    Verdicts have the `{'valid', 'reason', 'severity'}` shape of
+    `Constitution.validate_action`. The judge can stand in for the
+    constitution: everything else is forwarded to it.
+    """
+
+    def __init__(self, constitution, client, batch_size: int = 8, cache_size: int = 4096,
+                 max_tokens_per_action: int = 40, defer: bool = False):
+        """Initialize the judge.
+
+        Args:
+            constitution: Constitution to judge against
+            client: LLM client for ambiguous actions
+            batch_size: Actions judged per LLM call (default: 8)
+            cache_size: Verdicts kept (default: 4096)
+            max_tokens_per_action: Response tokens allowed per judged action (default: 40)
+            defer: Queue single validations for flush() instead of judging each at once (default: False)
+        """
+        self.constitution = constitution
+        self.client = client
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.max_tokens_per_action = max_tokens_per_action
+        self.defer = defer
+
+        self._cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._principles = "\n".join(f"- {p}" for p in constitution.get_core_principles())
+        self._system_prompt = CONSTITUTION_JUDGE_SYSTEM_PROMPT.render()
+        self.resolved = {tier: 0 for tier in TIERS}
+        self.llm_calls = 0
+
+        # Actions waiting for flush() with the heuristic's validity, by cache key
+        self._deferred: "OrderedDict[Tuple[str, str], Tuple[str, bool]]" = OrderedDict()
+        # Cache keys of flushed verdicts no validation has used yet
+        self._unused: Set[Tuple[str, str]] = set()
+        self.deferred_overturned = 0
+        self.deferred_unused = 0
+
+        self._keywords: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None
+        self._concerning: Optional["re.Pattern"] = None
+        self._positive: Optional["re.Pattern"] = None
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'constitution':
+            raise AttributeError(name)
+        return getattr(self.constitution, name)
+
+    def prefilter(self, action: str) -> Optional[Dict[str, Any]]:
+        """Resolve clearly benign actions.
+
+        Returns:
+            A verdict, or None if the action needs judging
+        """
+        self._update_patterns()
+        text = action.lower()
+        if self._concerning.search(text):
+            return None
+        return dict(_BENIGN_POSITIVE if self._positive is not None and self._positive.search(text) else _BENIGN)
+
+    def _update_patterns(self) -> None:
+        """Rebuild the prefilter patterns if the constitution's keyword lists changed."""
+        keywords = (tuple(getattr(self.constitution, 'concerning_keywords', ())),
+                    tuple(getattr(self.constitution, 'positive_keywords', ())))
+        if keywords != self._keywords:
+            self._keywords = keywords
+            self._concerning = keyword_pattern(keywords[0] + _EXTRA_CONCERNING)
+            self._positive = keyword_pattern(keywords[1])
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        verdict = self._cache.get(key)
+        if verdict is not None:
+            self._cache.move_to_end(key)
+            self._unused.discard(key)
+            return dict(verdict)
+        return None
+
+    def _store(self, key: Tuple[str, str], verdict: Dict[str, Any]) -> None:
+        self._cache[key] = verdict
+        if len(self._cache) > self.cache_size:
+            evicted, _ = self._cache.popitem(last=False)
+            if evicted in self._unused:
+                self._unused.discard(evicted)
+                self.deferred_unused += 1
+
+    def _parse(self, response: str, count: int) -> Dict[int, Dict[str, Any]]:
+        verdicts = {}
+        for line in response.splitlines():
+            match = _VERDICT.match(line)
+            if not match:
+                continue
+            number = int(match.group(1))
+            if 1 <= number <= count and number not in verdicts:
+                valid = match.group(2).upper() == "VALID"
+                verdicts[number] = {
+                    'valid': valid,
+                    'reason': match.group(4).strip() or ("Consistent with the constitution" if valid
+                                                         else "Conflicts with the constitution"),
+                    'severity': (match.group(3) or ("low" if valid else "high")).lower()
+                }
+        return verdicts
+
+    def _judge(self, batch: List[Tuple[str, str]]) -> Dict[int, Dict[str, Any]]:
+        """Ask the LLM about a batch of (action, role) pairs.
+
+        Returns:
+            Verdicts by 1-based position in the batch; missing positions were not answered
+        """
+        actions = "\n".join(f"{i}. ({role}) {action}" for i, (action, role) in enumerate(batch, 1))
+        prompt = CONSTITUTION_JUDGE_PROMPT.render(principles=self._principles, actions=actions)
+        self.llm_calls += 1
+        try:
+            response = self.client.generate(
+                prompt=prompt,
+                system_prompt=self._system_prompt,
+                temperature=0.0,
+                max_tokens=self.max_tokens_per_action * len(batch)
+            )
+        except Exception as e:
+            logger.warning(f"⚖️ Constitution judge failed: {e}")
+            return {}
+        if is_error_response(response):
+            return {}
+        return self._parse(response, len(batch))
+
+    def _judge_all(self, pending: Sequence[Tuple[Tuple[str, str], str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Judge (cache key, action) pairs in batches, caching the answered ones.
+
+        Returns:
+            Verdicts by cache key; keys the LLM did not answer are missing
+        """
+        judged = {}
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            answers = self._judge([(action, key[1]) for key, action in batch])
+            for number, (key, _) in enumerate(batch, 1):
+                verdict = answers.get(number)
+                if verdict is not None:
+                    self._store(key, verdict)
+                    judged[key] = verdict
+        return judged
+
+    def validate_actions(self, actions: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Validate several actions, judging the ambiguous ones together.
+
+        Args:
+            actions: (action, agent_role) pairs
+
+        Returns:
+            One verdict per action, in order
+        """
+        verdicts: List[Optional[Dict[str, Any]]] = [None] * len(actions)
+        # Ambiguous actions by cache key, with the positions waiting on them
+        pending: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+
+        for i, (action, role) in enumerate(actions):
+            verdict = self.prefilter(action)
+            if verdict is not None:
+                verdicts[i] = verdict
+                self.resolved['prefilter'] += 1
+                continue
+            key = (normalize_action(action), role)
+            verdict = self._cached(key)
+            if verdict is not None:
+                verdicts[i] = verdict
+                self.resolved['cache'] += 1
+                continue
+            pending.setdefault(key, []).append(i)
+
+        judged = self._judge_all([(key, actions[positions[0]][0]) for key, positions in pending.items()])
+        for key, positions in pending.items():
+            verdict = judged.get(key)
+            if verdict is not None:
+                tier = 'llm'
+            else:
+                action, role = actions[positions[0]]
+                verdict = self.constitution.validate_action(action, role)
+                tier = 'fallback'
+            for i in positions:
+                verdicts[i] = dict(verdict)
+                self.resolved[tier] += 1
+
+        return verdicts
+
+    def validate_action(self, action: str, agent_role: str) -> Dict[str, Any]:
+        """Validate if an action aligns with the constitution.
+
+        Args:
+            action: Description of the proposed action
+            agent_role: Role of the agent proposing the action
+
+        Returns:
+            Dictionary with validation result and reasoning
+        """
+        if not self.defer:
+            return self.validate_actions([(action, agent_role)])[0]
+
+        verdict = self.prefilter(action)
+        if verdict is not None:
+            self.resolved['prefilter'] += 1
+            return verdict
+        key = (normalize_action(action), agent_role)
+        verdict = self._cached(key)
+        if verdict is not None:
+            self.resolved['cache'] += 1
+            return verdict
+        verdict = self.constitution.validate_action(action, agent_role)
+        self._deferred.setdefault(key, (action, verdict['valid']))
+        self.resolved['deferred'] += 1
+        return verdict
+
+    def flush(self) -> int:
+        """Judge the actions deferred since the last flush, in batches.
+
+        Returns:
+            Number of actions the LLM judged
+        """
+        if not self._deferred:
+            return 0
+        deferred, self._deferred = self._deferred, OrderedDict()
+        pending = [(key, action) for key, (action, _) in deferred.items()]
+        judged = self._judge_all(pending)
+        for key, verdict in judged.items():
+            self._unused.add(key)
+            if verdict['valid'] != deferred[key][1]:
+                self.deferred_overturned += 1
+        if len(judged) < len(pending):
+            logger.debug(f"⚖️ {len(pending) - len(judged)} deferred action(s) left unjudged")
+        return len(judged)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number and fraction of actions resolved at each tier."""
+        total = sum(self.resolved.values())
+        stats: Dict[str, Any] = {'actions': total, 'llm_calls': self.llm_calls, 'cached_verdicts': len(self._cache),
+                                 'awaiting_flush': len(self._deferred)}
+        if self.defer:
+            # Verdicts the heuristic answer disagreed with, and verdicts no repeat ever asked for
+            stats['deferred_overturned'] = self.deferred_overturned
+            stats['deferred_unused'] = self.deferred_unused + len(self._unused)
+        for tier in TIERS:
+            stats[tier] = self.resolved[tier]
+            stats[f'{tier}_fraction'] = round(self.resolved[tier] / total, 3) if total else 0.0
+        return stats
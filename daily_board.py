@@ -7,9 +7,12 @@ import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Any, Dict, List
 from loguru import logger
 
+from agents.board_index import BoardIndex
+from agents.records import PostRecord
+
 
 class DailyMessageBoard:
     """Daily message board for AI commune agents."""
@@ -29,9 +32,12 @@ class DailyMessageBoard:
         # Load existing data or create new
         self.daily_posts = self._load_daily_posts()
 
+        # Search index over the posts of every day
+        self.index = BoardIndex(str(self.data_dir))
+
         logger.info(f"📋 Daily Message Board initialized for {self.current_date}")
 
-    def _load_daily_posts(self) -> List[Dict[str, Any]]:
+    def _load_daily_posts(self) -> List[PostRecord]:
         """Load daily posts from file.
 
         Returns:
@@ -40,8 +46,8 @@ class DailyMessageBoard:
         if self.daily_file.exists():
             try:
                 with open(self.daily_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError) as e:
+                    return [PostRecord.from_dict(post) for post in json.load(f)]
+            except (json.JSONDecodeError, IOError, KeyError, ValueError) as e:
                 logger.warning(f"Failed to load daily posts: {e}")
                 return []
         return []
@@ -50,7 +56,7 @@ class DailyMessageBoard:
         """Save daily posts to file."""
         try:
             with open(self.daily_file, 'w') as f:
-                json.dump(self.daily_posts, f, indent=2)
+                json.dump([post.to_dict() for post in self.daily_posts], f, indent=2)
         except IOError as e:
             logger.error(f"Failed to save daily posts: {e}")
 
@@ -62,21 +68,16 @@ class DailyMessageBoard:
             role: Role of the agent
             update_content: Content of the update
         """
-        post = {
-            'timestamp': datetime.now().isoformat(),
-            'date': self.current_date.isoformat(),
-            'agent_name': agent_name,
-            'role': role,
-            'content': update_content,
-            'post_id': len(self.daily_posts)
-        }
+        post = PostRecord(self.current_date.isoformat(), agent_name, role, update_content, len(self.daily_posts))
 
+        previous_size = self.daily_file.stat().st_size if self.daily_file.exists() else 0
         self.daily_posts.append(post)
         self._save_daily_posts()
+        self.index.add(post, self.daily_file, previous_size)
 
         logger.info(f"📝 Posted daily update from {agent_name} ({role})")
 
-    def get_today_posts(self) -> List[Dict[str, Any]]:
+    def get_today_posts(self) -> List[PostRecord]:
         """Get all posts from today.
 
         Returns:
@@ -84,7 +85,7 @@ class DailyMessageBoard:
         """
         return self.daily_posts.copy()
 
-    def get_posts_by_agent(self, agent_name: str) -> List[Dict[str, Any]]:
+    def get_posts_by_agent(self, agent_name: str) -> List[PostRecord]:
         """Get all posts from a specific agent.
 
         Args:
@@ -95,7 +96,7 @@ class DailyMessageBoard:
         """
         return [post for post in self.daily_posts if post['agent_name'] == agent_name]
 
-    def get_posts_by_role(self, role: str) -> List[Dict[str, Any]]:
+    def get_posts_by_role(self, role: str) -> List[PostRecord]:
         """Get all posts from agents with a specific role.
 
         Args:
@@ -106,6 +107,20 @@ class DailyMessageBoard:
         """
         return [post for post in self.daily_posts if post['role'] == role]
 
+    def search(self, query: str, limit: int = 10, **filters: Any) -> List[Dict[str, Any]]:
+        """Search the posts of every day, best matches first.
+
+        Args:
+            query: Free-text query, ranked with BM25
+            limit: Maximum number of hits
+            **filters: agent_name, role, since or until (see BoardIndex.search)
+
+        Returns:
+            Hits with date, post_id, agent_name, role, snippet and score
+        """
+        self.index.refresh()
+        return self.index.search(query, limit=limit, **filters)
+
     def get_board_summary(self) -> str:
         """Get a summary of today's message board activity.
 
@@ -0,0 +1,156 @@
+"""
+Near-Duplicate Detection for AI Commune
+Streaming MinHash signatures with LSH buckets to spot messages and memories that repeat earlier ones almost word for word.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+
+_WORD = re.compile(r"\w+")
+
+# Mersenne prime for the universal hash family; a * x + b stays below 2**64 for 32-bit x
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Overlapping runs of `size` lower-cased words (the whole text if it is shorter)."""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+class NearDuplicateDetector:
+    """Finds texts whose word shingles overlap an earlier text's by at least `threshold`.
+
+    Every text gets a MinHash signature of `num_perm` 32-bit values, stored as
+    a row of one NumPy array. The signature is cut into `bands` bands; texts
+    sharing any band land in the same LSH bucket and become candidates, and a
+    candidate is a duplicate when the fraction of equal signature values (an
+    estimate of the shingle Jaccard similarity) reaches the threshold.
+
+    The detector holds the last `capacity` texts added, first in first out,
+    so it can run alongside a bounded memory or a ring buffer of messages.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 3,
+                 capacity: int = 1024, seed: int = 1):
+        """Initialize the detector.
+
+        Args:
+            threshold: Estimated Jaccard similarity that counts as a duplicate (default: 0.8)
+            num_perm: MinHash values per signature (default: 64)
+            bands: LSH bands; must divide num_perm (default: 16)
+            shingle_size: Words per shingle (default: 3)
+            capacity: Texts remembered (default: 1024)
+            seed: Seed for the hash functions
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+        self.capacity = capacity
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+        self._signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        self._keys: List[Any] = [None] * capacity
+        self._bucket_keys: List[Optional[List[bytes]]] = [None] * capacity
+        self._buckets: Dict[bytes, List[int]] = {}
+        self._next = 0
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of a text."""
+        pieces = shingles(text, self.shingle_size)
+        if not pieces:
+            return np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(piece.encode('utf-8')) for piece in pieces),
+                             dtype=np.uint64, count=len(pieces))
+        values = (self._a * hashes + self._b) % _PRIME
+        return (values.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        bands = signature.reshape(self.bands, self.rows_per_band)
+        return [bytes((i,)) + band.tobytes() for i, band in enumerate(bands)]
+
+    def _match(self, signature: np.ndarray, band_keys: List[bytes]) -> Tuple[Optional[int], float]:
+        candidates = {row for key in band_keys for row in self._buckets.get(key, ())}
+        if not candidates:
+            return None, 0.0
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[rows] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        return int(rows[best]), float(similarity[best])
+
+    def find(self, text: str) -> Optional[Tuple[Any, float]]:
+        """Look for an earlier text this one nearly duplicates, without adding it.
+
+        Returns:
+            Key of the earlier text and the estimated similarity, or None
+        """
+        signature = self.signature(text)
+        row, similarity = self._match(signature, self._band_keys(signature))
+        if row is None or similarity < self.threshold:
+            return None
+        return self._keys[row], similarity
+
+    def add(self, text: str, key: Any) -> None:
+        """Remember a text under `key`, forgetting the oldest text when full."""
+        signature = self.signature(text)
+        self._insert(signature, self._band_keys(signature), key)
+
+    def _insert(self, signature: np.ndarray, band_keys: List[bytes], key: Any) -> None:
+        row = self._next % self.capacity
+        for old in self._bucket_keys[row] or ():
+            bucket = self._buckets[old]
+            bucket.remove(row)
+            if not bucket:
+                del self._buckets[old]
+
+        self._signatures[row] = signature
+        self._keys[row] = key
+        self._bucket_keys[row] = band_keys
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(row)
+        self._next += 1
+
+    def check(self, text: str, key: Any) -> Optional[Any]:
+        """Return the key of an earlier near-duplicate, or remember the text under `key`.
+
+        Args:
+            text: Text about to be stored or posted
+            key: Key to remember the text under if it is new
+
+        Returns:
+            Key of the earlier text if this one is a near-duplicate, else None
+        """
+        self.checked += 1
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        row, similarity = self._match(signature, band_keys)
+        if row is not None and similarity >= self.threshold:
+            self.duplicates += 1
+            return self._keys[row]
+        self._insert(signature, band_keys, key)
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get detection statistics."""
+        return {
+            'checked': self.checked,
+            'duplicates': self.duplicates,
+            'remembered': min(self._next, self.capacity),
+            'buckets': len(self._buckets),
+        }
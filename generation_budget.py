@@ -0,0 +1,224 @@
+"""
+Generation Length Budgets for AI Commune
+Text-based stopping rules and adaptive per-call-site max_tokens budgets learned from observed output lengths.
+"""
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from loguru import logger
+
+from agents.llm_resilience import is_error_response
+
+
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s|$)")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the token count of a text without a tokenizer."""
+    return math.ceil(len(text.split()) * 1.3)
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [p for p in _PARAGRAPH_BREAK.split(text.strip()) if p.strip()]
+
+
+def should_stop(text: str, stop: Optional[Sequence[str]] = None, max_paragraphs: Optional[int] = None,
+                max_sentences: Optional[int] = None) -> bool:
+    """Check whether generated text has reached a stopping point.
+
+    A paragraph limit is reached once the text moves on to the paragraph after
+    the last allowed one, so the last allowed paragraph is never cut short.
+
+    Args:
+        text: Text generated so far
+        stop: Stop sequences
+        max_paragraphs: Maximum number of paragraphs
+        max_sentences: Maximum number of sentences
+
+    Returns:
+        True if generation should stop
+    """
+    if stop and any(s in text for s in stop):
+        return True
+    if max_paragraphs and len(_paragraphs(text)) > max_paragraphs:
+        return True
+    if max_sentences and len(_SENTENCE_END.findall(text)) >= max_sentences:
+        return True
+    return False
+
+
+def truncate_text(text: str, stop: Optional[Sequence[str]] = None, max_paragraphs: Optional[int] = None,
+                  max_sentences: Optional[int] = None) -> str:
+    """Cut generated text at the stopping point.
+
+    Args:
+        text: Generated text
+        stop: Stop sequences; the text is cut before the first one
+        max_paragraphs: Maximum number of paragraphs to keep
+        max_sentences: Maximum number of sentences to keep
+
+    Returns:
+        Truncated text
+    """
+    if stop:
+        positions = [text.find(s) for s in stop if s in text]
+        if positions:
+            text = text[:min(positions)]
+    if max_paragraphs:
+        paragraphs = _paragraphs(text)
+        if len(paragraphs) > max_paragraphs:
+            text = "\n\n".join(paragraphs[:max_paragraphs])
+    if max_sentences:
+        ends = list(_SENTENCE_END.finditer(text))
+        if len(ends) >= max_sentences:
+            text = text[:ends[max_sentences - 1].end()]
+    return text.strip()
+
+
+class LengthBudget:
+    """Learns max_tokens budgets per call site from observed output lengths.
+
+    Until `min_samples` outputs have been seen for a key, the call site's own
+    cap is used. After that the budget is the `quantile` of recent output
+    lengths times `headroom`, kept between `min_tokens` and the cap. Outputs
+    that used up their whole budget were probably cut off, so they are counted
+    as longer than observed and the budget grows again.
+    """
+
+    def __init__(self, window: int = 50, quantile: float = 0.9, headroom: float = 1.2,
+                 min_tokens: int = 32, min_samples: int = 5):
+        """Initialize the budget registry.
+
+        Args:
+            window: Number of recent outputs remembered per key (default: 50)
+            quantile: Quantile of output lengths to cover (default: 0.9)
+            headroom: Multiplier over the quantile (default: 1.2)
+            min_tokens: Smallest budget ever handed out (default: 32)
+            min_samples: Outputs needed before adapting (default: 5)
+        """
+        self.window = window
+        self.quantile = quantile
+        self.headroom = headroom
+        self.min_tokens = min_tokens
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def budget(self, key: str, cap: int) -> int:
+        """Get the max_tokens budget for a call site.
+
+        Args:
+            key: Call site key (e.g. "reflection:Philosopher")
+            cap: The call site's hard maximum
+
+        Returns:
+            Token budget for the next call
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return cap
+        value = samples[min(len(samples) - 1, int(self.quantile * len(samples)))]
+        return max(min(self.min_tokens, cap), min(cap, math.ceil(value * self.headroom)))
+
+    def observe(self, key: str, tokens: int, budget: int) -> None:
+        """Record the length of an output.
+
+        Args:
+            key: Call site key
+            tokens: Length of the output in tokens
+            budget: Budget the output was generated with
+        """
+        sample = tokens * 1.25 if tokens >= 0.95 * budget else tokens
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(sample)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get the number of samples and mean length per key."""
+        with self._lock:
+            return {
+                key: {'samples': len(samples), 'mean_tokens': round(sum(samples) / len(samples), 1)}
+                for key, samples in self._samples.items() if samples
+            }
+
+
+# Process-wide budgets shared by every agent
+DEFAULT_BUDGET = LengthBudget()
+
+
+def _budgeted_request(client, budget: LengthBudget, call_site: str, prompt: str, system_prompt: Optional[str],
+                      temperature: float, max_tokens: int, stop: Optional[List[str]],
+                      max_paragraphs: Optional[int], max_sentences: Optional[int]):
+    """Build the generate() arguments for a call site's current budget."""
+    limit = budget.budget(call_site, max_tokens)
+    rules = {'stop': stop, 'max_paragraphs': max_paragraphs, 'max_sentences': max_sentences}
+
+    kwargs = dict(prompt=prompt, system_prompt=system_prompt, temperature=temperature, max_tokens=limit)
+    if getattr(client, 'supports_stopping_criteria', False):
+        kwargs.update((name, value) for name, value in rules.items() if value)
+    return limit, kwargs, rules
+
+
+def _record_response(budget: LengthBudget, call_site: str, response: str, rules: Dict[str, Any],
+                     limit: int, max_tokens: int) -> str:
+    """Apply the stopping rules to a response and record its length."""
+    if is_error_response(response):
+        return response
+
+    response = truncate_text(response, **rules)
+    tokens = estimate_tokens(response)
+    budget.observe(call_site, tokens, limit)
+    logger.debug(f"[{call_site}] {tokens} tokens generated with budget {limit}/{max_tokens}")
+    return response
+
+
+def generate_with_budget(client, call_site: str, prompt: str, system_prompt: Optional[str] = None,
+                         temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                         max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None,
+                         budget: Optional[LengthBudget] = None) -> str:
+    """Call client.generate with an adaptive max_tokens budget and stopping rules.
+
+    Stopping rules are passed to clients that support them (those with a true
+    `supports_stopping_criteria` attribute, like HuggingFaceClient); other
+    clients get the same rules applied to the finished text.
+
+    Args:
+        client: LLM client
+        call_site: Budget key, usually "<call site>:<role>"
+        prompt: The prompt to send to the model
+        system_prompt: Optional system prompt
+        temperature: Sampling temperature
+        max_tokens: Hard maximum tokens for this call site
+        stop: Stop sequences
+        max_paragraphs: Maximum number of paragraphs
+        max_sentences: Maximum number of sentences
+        budget: Budget registry (default: DEFAULT_BUDGET)
+
+    Returns:
+        Generated text (or an ErrorResponse from the client, unchanged)
+    """
+    budget = budget or DEFAULT_BUDGET
+    limit, kwargs, rules = _budgeted_request(client, budget, call_site, prompt, system_prompt, temperature,
+                                             max_tokens, stop, max_paragraphs, max_sentences)
+    return _record_response(budget, call_site, client.generate(**kwargs), rules, limit, max_tokens)
+
+
+async def agenerate_with_budget(client, call_site: str, prompt: str, system_prompt: Optional[str] = None,
+                                temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                                max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None,
+                                budget: Optional[LengthBudget] = None) -> str:
+    """Async variant of generate_with_budget (see there for the arguments).
+
+    Clients implementing `agenerate` are awaited directly; others run in the
+    event loop's default executor.
+    """
+    from agents.async_llm import agenerate
+
+    budget = budget or DEFAULT_BUDGET
+    limit, kwargs, rules = _budgeted_request(client, budget, call_site, prompt, system_prompt, temperature,
+                                             max_tokens, stop, max_paragraphs, max_sentences)
+    return _record_response(budget, call_site, await agenerate(client, **kwargs), rules, limit, max_tokens)
@@ -3,38 +3,102 @@ Hugging Face LLM Client for AI Commune
 Provides completely free, open-source LLM inference using Hugging Face Transformers.
 """
 
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from typing import List, Optional, Dict, Any
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Dict, Any
 from loguru import logger
 
+from agents.generation_budget import should_stop, truncate_text
+from agents.llm_resilience import ErrorResponse
+from agents.prompt_templates import encode_static
+
+# torch and transformers take seconds to import, so they are loaded by the
+# first client created rather than by whatever imports this module
+torch = None
+transformers = None
+
+
+def _load_dependencies() -> None:
+    """Import torch and transformers into this module on first use."""
+    global torch, transformers
+    if transformers is None:
+        import torch as _torch
+        import transformers as _transformers
+        torch, transformers = _torch, _transformers
+
+
+class TextStoppingCriteria:
+    """Stops generation at stop sequences or once enough paragraphs/sentences are written.
+
+    Has the call signature of transformers' StoppingCriteria without
+    subclassing it, so defining it does not import transformers.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, stop: Optional[List[str]] = None,
+                 max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None):
+        """Initialize the stopping criteria.
+
+        Args:
+            tokenizer: Tokenizer used to decode the generated tokens
+            prompt_length: Number of prompt tokens before the generated ones
+            stop: Stop sequences
+            max_paragraphs: Maximum number of paragraphs
+            max_sentences: Maximum number of sentences
+        """
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stop = stop
+        self.max_paragraphs = max_paragraphs
+        self.max_sentences = max_sentences
+
+    def __call__(self, input_ids: "torch.LongTensor", scores: "torch.FloatTensor", **kwargs) -> "torch.BoolTensor":
+        done = [
+            should_stop(
+                self.tokenizer.decode(ids[self.prompt_length:], skip_special_tokens=True),
+                self.stop, self.max_paragraphs, self.max_sentences,
+            )
+            for ids in input_ids
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
 
 class HuggingFaceClient:
     """Free, open-source LLM client using Hugging Face Transformers."""
 
-    def __init__(self, model_name: str = "microsoft/DialoGPT-medium"):
+    # generate() accepts stop / max_paragraphs / max_sentences
+    supports_stopping_criteria = True
+
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium", draft_model_name: Optional[str] = None,
+                 num_assistant_tokens: int = 5):
         """Initialize Hugging Face client.
 
         Args:
             model_name: Hugging Face model to use (default: DialoGPT-medium)
+            draft_model_name: Optional small model sharing the tokenizer (e.g. distilgpt2)
+                that proposes tokens for the main model to verify (assisted generation)
+            num_assistant_tokens: Tokens the draft model proposes per step (default: 5)
         """
+        _load_dependencies()
         self.model_name = model_name
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.draft_model = None
+        self.draft_model_name = None
 
         logger.info(f"🚀 Initializing Hugging Face model: {model_name} on {self.device}")
 
         try:
             # Initialize tokenizer and model
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
 
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
+            self.model = transformers.AutoModelForCausalLM.from_pretrained(model_name)
             self.model.to(self.device)
             self.model.eval()
 
             # Create pipeline for easier generation
-            self.generator = pipeline(
+            self.generator = transformers.pipeline(
                 'text-generation',
                 model=self.model,
                 tokenizer=self.tokenizer,
@@ -49,6 +113,46 @@ class HuggingFaceClient:
             # Fallback to a smaller model if the primary fails
             self._fallback_init()
 
+        if draft_model_name:
+            self._init_draft_model(draft_model_name, num_assistant_tokens)
+
+        # Assisted generation can be switched off per client, e.g. for benchmarks
+        self.use_draft = self.draft_model is not None
+
+        # Worker thread for agenerate/astream, created on first use
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # Whether cached system prompt ids can be joined with the prompt's ids (checked on first use)
+        self._prefix_cache_ok: Optional[bool] = None
+
+    def _init_draft_model(self, draft_model_name: str, num_assistant_tokens: int) -> None:
+        """Load the draft model used for assisted (speculative) generation.
+
+        Args:
+            draft_model_name: Hugging Face model to use as draft
+            num_assistant_tokens: Tokens the draft model proposes per step
+        """
+        if draft_model_name == self.model_name:
+            logger.warning(f"⚠️  Draft model {draft_model_name} is the main model, assisted generation disabled")
+            return
+
+        try:
+            draft_tokenizer = transformers.AutoTokenizer.from_pretrained(draft_model_name)
+            if draft_tokenizer.get_vocab() != self.tokenizer.get_vocab():
+                logger.warning(f"⚠️  Draft model {draft_model_name} does not share the tokenizer of "
+                               f"{self.model_name}, assisted generation disabled")
+                return
+
+            self.draft_model = transformers.AutoModelForCausalLM.from_pretrained(draft_model_name)
+            self.draft_model.to(self.device)
+            self.draft_model.eval()
+            self.draft_model.generation_config.num_assistant_tokens = num_assistant_tokens
+            self.draft_model_name = draft_model_name
+            logger.success(f"✅ Draft model {draft_model_name} loaded for assisted generation")
+
+        except Exception as e:
+            logger.warning(f"⚠️  Failed to load draft model {draft_model_name}, assisted generation disabled: {e}")
+
     def _fallback_init(self):
         """Fallback initialization with a smaller model."""
         fallback_models = ["distilgpt2", "gpt2"]
@@ -56,15 +160,15 @@ class HuggingFaceClient:
         for model_name in fallback_models:
             try:
                 logger.info(f"🔄 Trying fallback model: {model_name}")
-                self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+                self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
                 if self.tokenizer.pad_token is None:
                     self.tokenizer.pad_token = self.tokenizer.eos_token
 
-                self.model = AutoModelForCausalLM.from_pretrained(model_name)
+                self.model = transformers.AutoModelForCausalLM.from_pretrained(model_name)
                 self.model.to(self.device)
                 self.model.eval()
 
-                self.generator = pipeline(
+                self.generator = transformers.pipeline(
                     'text-generation',
                     model=self.model,
                     tokenizer=self.tokenizer,
@@ -90,8 +194,64 @@ class HuggingFaceClient:
         """
         return [self.model_name]
 
+    def encode_prompt(self, prompt: str, system_prompt: Optional[str] = None, max_length: int = 512) -> List[int]:
+        """Tokenize a prompt the way generate() combines it with the system prompt.
+
+        System prompts repeat across calls, so their token ids are cached and
+        only the prompt itself is tokenized. The cache is used only if this
+        tokenizer gives the same ids for the joined text as for its parts.
+
+        Args:
+            prompt: The prompt to send to the model
+            system_prompt: Optional system prompt
+            max_length: Maximum number of tokens kept
+
+        Returns:
+            Token ids, truncated to max_length
+        """
+        if self._prefix_cache_ok is None:
+            probe_system, probe = "You are a test.", "Hello there, friend."
+            self._prefix_cache_ok = list(self.tokenizer.encode(f"{probe_system}\n\n{probe}")) == (
+                list(encode_static(self.tokenizer, probe_system))
+                + self.tokenizer.encode(f"\n\n{probe}", add_special_tokens=False)
+            )
+
+        if system_prompt and self._prefix_cache_ok and not system_prompt[-1].isspace():
+            ids = list(encode_static(self.tokenizer, system_prompt))
+            ids += self.tokenizer.encode(f"\n\n{prompt}", add_special_tokens=False)
+        else:
+            ids = self.tokenizer.encode(f"{system_prompt}\n\n{prompt}" if system_prompt else prompt)
+        return ids[:max_length]
+
+    def _generate_ids(self, prompt: str, system_prompt: Optional[str], temperature: float, max_tokens: int,
+                      stop: Optional[List[str]] = None, max_paragraphs: Optional[int] = None,
+                      max_sentences: Optional[int] = None, streamer=None) -> "torch.Tensor":
+        """Run model.generate on a prompt and return the token ids, prompt included."""
+        with torch.no_grad():
+            input_ids = torch.tensor([self.encode_prompt(prompt, system_prompt)], device=self.device)
+            inputs = {'input_ids': input_ids, 'attention_mask': torch.ones_like(input_ids)}
+
+            stopping_criteria = None
+            if stop or max_paragraphs or max_sentences:
+                stopping_criteria = transformers.StoppingCriteriaList([TextStoppingCriteria(
+                    self.tokenizer, inputs['input_ids'].shape[1], stop, max_paragraphs, max_sentences,
+                )])
+
+            return self.model.generate(
+                **inputs,
+                max_length=min(inputs['input_ids'].shape[1] + max_tokens, 512),
+                temperature=max(0.1, min(2.0, temperature)),
+                do_sample=True,
+                pad_token_id=self.tokenizer.eos_token_id,
+                num_return_sequences=1,
+                stopping_criteria=stopping_criteria,
+                assistant_model=self.draft_model if self.use_draft else None,
+                streamer=streamer
+            )
+
     def generate(self, prompt: str, system_prompt: Optional[str] = None,
-                 temperature: float = 0.7, max_tokens: int = 150) -> str:
+                 temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                 max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None) -> str:
         """Generate response using the loaded model.
 
         Args:
@@ -99,9 +259,12 @@ class HuggingFaceClient:
             system_prompt: Optional system prompt (will be combined)
             temperature: Sampling temperature (0.0-2.0)
             max_tokens: Maximum tokens to generate
+            stop: Optional stop sequences; generation ends at the first one
+            max_paragraphs: Optional limit; generation ends once this many paragraphs are complete
+            max_sentences: Optional limit; generation ends once this many sentences are complete
 
         Returns:
-            Generated response text
+            Generated response text, or an ErrorResponse if generation failed
         """
         try:
             # Combine system prompt and user prompt
@@ -110,24 +273,8 @@ class HuggingFaceClient:
                 full_prompt = f"{system_prompt}\n\n{prompt}"
 
             # Generate response
-            with torch.no_grad():
-                inputs = self.tokenizer(
-                    full_prompt,
-                    return_tensors="pt",
-                    padding=True,
-                    truncation=True,
-                    max_length=512
-                )
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-
-                outputs = self.model.generate(
-                    **inputs,
-                    max_length=min(inputs['input_ids'].shape[1] + max_tokens, 512),
-                    temperature=max(0.1, min(2.0, temperature)),
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    num_return_sequences=1
-                )
+            outputs = self._generate_ids(prompt, system_prompt, temperature, max_tokens,
+                                         stop, max_paragraphs, max_sentences)
 
             # Decode and clean response
             response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
@@ -136,12 +283,77 @@ class HuggingFaceClient:
             if response.startswith(full_prompt):
                 response = response[len(full_prompt):].strip()
 
-            return response.strip()
+            return truncate_text(response, stop, max_paragraphs, max_sentences)
 
         except Exception as e:
             logger.error(f"❌ Generation failed: {e}")
-            return f"I apologize, but I encountered an error while processing your request. Error: {str(e)[:100]}"
+            return ErrorResponse(
+                f"I apologize, but I encountered an error while processing your request. Error: {str(e)[:100]}",
+                error=str(e),
+            )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # One thread, so async callers take turns on the model instead of contending for it
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hf-generate")
+        return self._executor
+
+    async def agenerate(self, prompt: str, system_prompt: Optional[str] = None,
+                        temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                        max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None) -> str:
+        """Async variant of generate(); the model runs on a worker thread so the event loop stays free.
+
+        Returns:
+            Generated response text, or an ErrorResponse if generation failed
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), functools.partial(
+            self.generate, prompt, system_prompt, temperature, max_tokens, stop, max_paragraphs, max_sentences,
+        ))
+
+    async def astream(self, prompt: str, system_prompt: Optional[str] = None,
+                      temperature: float = 0.7, max_tokens: int = 150, stop: Optional[List[str]] = None,
+                      max_paragraphs: Optional[int] = None, max_sentences: Optional[int] = None) -> AsyncIterator[str]:
+        """Yield the response in pieces as tokens are generated.
+
+        Stopping rules end generation, but the pieces are not truncated at the
+        stopping point the way generate() truncates its result.
+
+        Raises:
+            Exception: Whatever model.generate raised
+        """
+        loop = asyncio.get_running_loop()
+        streamer = transformers.TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+
+        def run():
+            try:
+                self._generate_ids(prompt, system_prompt, temperature, max_tokens,
+                                   stop, max_paragraphs, max_sentences, streamer=streamer)
+            except Exception:
+                # Unblock the reader before reporting the error
+                streamer.end()
+                raise
+
+        generation = loop.run_in_executor(self._get_executor(), run)
+        while True:
+            piece = await loop.run_in_executor(None, next, streamer, None)
+            if piece is None:
+                break
+            if piece:
+                yield piece
+        await generation
+
+    def after_fork(self) -> None:
+        """Forget the generation thread, which does not exist in a forked child."""
+        self._executor = None
+
+    def close(self) -> None:
+        """Stop the async worker thread."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
 
     def __str__(self) -> str:
         """String representation of the client."""
-        return f"HuggingFaceClient(model='{self.model_name}', device='{self.device}')"
+        draft = f", draft='{self.draft_model_name}'" if self.draft_model is not None else ""
+        return f"HuggingFaceClient(model='{self.model_name}'{draft}, device='{self.device}')"
@@ -0,0 +1,489 @@
+"""
+Local Inference Server for AI Commune
+Shares one Hugging Face model between runner processes over HTTP or a Unix socket,
+coalescing concurrent requests into dynamic batches with continuous batching.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from loguru import logger
+
+
+class _Sequence:
+    """A single generation request moving through the decode loop."""
+
+    __slots__ = ("prompt", "system_prompt", "temperature", "max_new_tokens", "future", "ids", "generated")
+
+    def __init__(self, prompt: str, system_prompt: Optional[str], temperature: float, max_new_tokens: int):
+        self.prompt = prompt
+        self.system_prompt = system_prompt
+        self.temperature = max(0.1, min(2.0, temperature))
+        self.max_new_tokens = max_new_tokens
+        self.future: Future = Future()
+        self.ids: List[int] = []
+        self.generated: List[int] = []
+
+
+class BatchingEngine:
+    """Coalesces concurrent generate() requests into batched decode steps.
+
+    Requests wait at most `max_wait_ms` for others to join, and a batch holds
+    at most `max_batch_size` sequences. With `continuous=True`, waiting
+    requests are also admitted between decode steps and finished sequences
+    leave the batch immediately, so short answers never wait for long ones.
+
+    The batch keeps one left-padded KV cache. Newly admitted sequences are
+    prefilled on their own and their cache is concatenated to it; finished
+    sequences have their rows dropped from it. Running sequences are thus
+    never prefilled again, and each step costs one token per sequence.
+    """
+
+    def __init__(self, client, max_batch_size: int = 8, max_wait_ms: float = 10.0,
+                 continuous: bool = True, max_length: int = 512):
+        """Initialize the engine.
+
+        Args:
+            client: Loaded HuggingFaceClient whose model and tokenizer are shared
+            max_batch_size: Maximum number of sequences decoded together (default: 8)
+            max_wait_ms: How long the first request of a batch waits for others (default: 10)
+            continuous: Admit new requests between decode steps (default: True)
+            max_length: Maximum prompt + generated tokens, as in HuggingFaceClient (default: 512)
+        """
+        self.client = client
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.continuous = continuous
+        self.max_length = max_length
+
+        self._pending: "queue.Queue[_Sequence]" = queue.Queue()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.requests_served = 0
+        self.decode_steps = 0
+        self.prefills = 0
+        self._batch_size_total = 0
+
+    def submit(self, prompt: str, system_prompt: Optional[str] = None,
+               temperature: float = 0.7, max_tokens: int = 150) -> Future:
+        """Queue a request for the next batch.
+
+        Returns:
+            Future resolving to the generated text
+        """
+        sequence = _Sequence(prompt, system_prompt, temperature, max_tokens)
+        self._pending.put(sequence)
+        return sequence.future
+
+    def start(self) -> None:
+        """Start the decode loop thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="batching-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the decode loop thread."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        return {
+            'model': self.client.model_name,
+            'requests_served': self.requests_served,
+            'decode_steps': self.decode_steps,
+            'prefills': self.prefills,
+            'mean_batch_size': round(self._batch_size_total / self.decode_steps, 2) if self.decode_steps else 0.0,
+            'pending': self._pending.qsize(),
+        }
+
+    def _admit(self, active: int, wait: bool) -> List[_Sequence]:
+        """Take pending requests for the active batch.
+
+        Args:
+            active: Number of currently decoding sequences
+            wait: Block for the first request and then up to max_wait for more
+
+        Returns:
+            The admitted sequences, with their prompts tokenized
+        """
+        admitted = []
+        deadline = None
+        while active + len(admitted) < self.max_batch_size:
+            try:
+                if not wait:
+                    sequence = self._pending.get_nowait()
+                elif deadline is None:
+                    sequence = self._pending.get(timeout=0.1)
+                    deadline = time.monotonic() + self.max_wait
+                else:
+                    sequence = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+
+            sequence.ids = self.client.encode_prompt(sequence.prompt, sequence.system_prompt, self.max_length)
+            if len(sequence.ids) >= self.max_length:
+                sequence.future.set_result("")
+                continue
+            admitted.append(sequence)
+
+        return admitted
+
+    def _loop(self) -> None:
+        """Run decode steps over the active batch until stopped.
+
+        Invariant between iterations: `past` caches every token of each active
+        sequence but the last one sampled, and `mask` marks which of the
+        cache's (left-padded) positions are real, one row per sequence.
+        """
+        import torch
+
+        model, tokenizer = self.client.model, self.client.tokenizer
+        device = self.client.device
+        pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        eos_id = tokenizer.eos_token_id
+
+        active: List[_Sequence] = []
+        past, mask, cache_cls = None, None, None
+
+        def run(input_ids, step_mask, cache):
+            nonlocal cache_cls
+            position_ids = (step_mask.cumsum(dim=1) - 1).clamp(min=0)[:, -input_ids.shape[1]:]
+            if cache is not None and cache_cls is not None:
+                cache = cache_cls.from_legacy_cache(cache)
+            outputs = model(input_ids=input_ids, attention_mask=step_mask, position_ids=position_ids,
+                            past_key_values=cache, use_cache=True)
+            new_cache = outputs.past_key_values
+            if hasattr(new_cache, 'to_legacy_cache'):
+                # Caches are merged and sliced per layer as (key, value) tensors
+                cache_cls = type(new_cache)
+                new_cache = new_cache.to_legacy_cache()
+            return outputs.logits[:, -1, :], new_cache
+
+        def left_pad(cache, cache_mask, width):
+            extra = width - cache_mask.shape[1]
+            if not extra:
+                return cache, cache_mask
+            cache = tuple(tuple(torch.nn.functional.pad(t, (0, 0, extra, 0)) for t in layer) for layer in cache)
+            return cache, torch.cat([cache_mask.new_zeros((cache_mask.shape[0], extra)), cache_mask], dim=1)
+
+        while self._running:
+            admitted: List[_Sequence] = []
+            try:
+                if not active:
+                    admitted = self._admit(0, wait=True)
+                    if not admitted:
+                        continue
+                else:
+                    admitted = self._admit(len(active), wait=False) if self.continuous else []
+
+                with torch.no_grad():
+                    logits = []
+                    if active:
+                        # Decode step: feed each running sequence its last sampled token
+                        input_ids = torch.tensor([[s.ids[-1]] for s in active], device=device)
+                        mask = torch.cat([mask, mask.new_ones((len(active), 1))], dim=1)
+                        step_logits, past = run(input_ids, mask, past)
+                        logits.append(step_logits)
+                        self.decode_steps += 1
+                        self._batch_size_total += len(active)
+
+                    if admitted:
+                        # Prefill only the new sequences, then join their cache to the batch's
+                        width = max(len(s.ids) for s in admitted)
+                        input_ids = torch.tensor([[pad_id] * (width - len(s.ids)) + s.ids for s in admitted],
+                                                 device=device)
+                        new_mask = torch.tensor([[0] * (width - len(s.ids)) + [1] * len(s.ids) for s in admitted],
+                                                device=device)
+                        step_logits, new_past = run(input_ids, new_mask, None)
+                        logits.append(step_logits)
+                        self.prefills += 1
+
+                        if past is None:
+                            past, mask = new_past, new_mask
+                        else:
+                            width = max(mask.shape[1], new_mask.shape[1])
+                            past, mask = left_pad(past, mask, width)
+                            new_past, new_mask = left_pad(new_past, new_mask, width)
+                            past = tuple(tuple(torch.cat([old, new], dim=0) for old, new in zip(layer, new_layer))
+                                         for layer, new_layer in zip(past, new_past))
+                            mask = torch.cat([mask, new_mask], dim=0)
+                        active = active + admitted
+
+                    temperatures = torch.tensor([[s.temperature] for s in active], device=device)
+                    probs = torch.softmax(torch.cat(logits, dim=0).float() / temperatures, dim=-1)
+                    next_tokens = torch.multinomial(probs, num_samples=1).squeeze(1).tolist()
+
+                keep = []
+                for i, (sequence, token) in enumerate(zip(active, next_tokens)):
+                    sequence.ids.append(token)
+                    sequence.generated.append(token)
+                    if (token == eos_id or len(sequence.generated) >= sequence.max_new_tokens
+                            or len(sequence.ids) >= self.max_length):
+                        text = tokenizer.decode(sequence.generated, skip_special_tokens=True)
+                        sequence.future.set_result(text.strip())
+                        self.requests_served += 1
+                    else:
+                        keep.append(i)
+
+                if len(keep) != len(active):
+                    active = [active[i] for i in keep]
+                    if not active:
+                        past, mask = None, None
+                        continue
+                    # Drop finished rows, then padding columns no remaining row uses
+                    index = torch.tensor(keep, device=device)
+                    mask = mask.index_select(0, index)
+                    unused = int((mask.sum(dim=0) == 0).long().cumprod(dim=0).sum())
+                    mask = mask[:, unused:]
+                    past = tuple(tuple(t.index_select(0, index)[:, :, unused:] for t in layer) for layer in past)
+
+            except Exception as e:
+                logger.error(f"❌ Batched generation failed: {e}")
+                for sequence in active + admitted:
+                    if not sequence.future.done():
+                        sequence.future.set_exception(e)
+                active, past, mask = [], None, None
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /generate, GET /health."""
+
+    protocol_version = "HTTP/1.1"
+    engine: BatchingEngine = None
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, self.engine.get_stats())
+        else:
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/generate":
+            self._send_json(404, {'error': f"Unknown path: {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            future = self.engine.submit(
+                prompt=request['prompt'],
+                system_prompt=request.get('system_prompt'),
+                temperature=float(request.get('temperature', 0.7)),
+                max_tokens=int(request.get('max_tokens', 150)),
+            )
+            self._send_json(200, {'response': future.result()})
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {'error': f"Bad request: {e}"})
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class InferenceServer:
+    """Serves a shared HuggingFaceClient model to local runner processes."""
+
+    def __init__(self, client, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None,
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0, continuous: bool = True):
+        """Initialize the server.
+
+        Args:
+            client: Loaded HuggingFaceClient
+            host: Host to listen on for HTTP (default: 127.0.0.1)
+            port: Port to listen on for HTTP (default: 8765)
+            socket_path: Listen on this Unix socket instead of TCP
+            max_batch_size: Maximum sequences per batch (default: 8)
+            max_wait_ms: Maximum time a request waits for a batch to fill (default: 10)
+            continuous: Admit requests between decode steps (default: True)
+        """
+        self.engine = BatchingEngine(client, max_batch_size=max_batch_size,
+                                     max_wait_ms=max_wait_ms, continuous=continuous)
+        handler = type("RequestHandler", (_RequestHandler,), {'engine': self.engine})
+
+        self.socket_path = socket_path
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.httpd = _ThreadingUnixHTTPServer(socket_path, handler)
+            self.address = f"unix://{socket_path}"
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), handler)
+            self.address = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def serve_forever(self) -> None:
+        """Serve requests until interrupted."""
+        self.engine.start()
+        logger.info(f"🛰️  Inference server for {self.engine.client.model_name} listening on {self.address}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop serving and release the socket."""
+        self.httpd.server_close()
+        self.engine.stop()
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class InferenceServerClient:
+    """Thin client for InferenceServer with the usual generate() signature."""
+
+    def __init__(self, address: str = "http://127.0.0.1:8765", timeout: float = 50.0):
+        """Initialize the client.
+
+        Args:
+            address: Server address, "http://host:port" or "unix:///path/to.sock"
+            timeout: Socket timeout in seconds; keep it below the ResilientClient
+                deadline so a stuck request frees its thread (default: 50)
+        """
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+
+        try:
+            self.model = self._request("GET", "/health")['model']
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Inference server at {address} not reachable yet: {e}")
+            self.model = "inference-server"
+        self.model_name = self.model
+
+    def _connection(self) -> http.client.HTTPConnection:
+        # One keep-alive connection per calling thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            parsed = urlparse(self.address)
+            if parsed.scheme == "unix":
+                conn = _UnixHTTPConnection(parsed.path, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=data, headers=headers)
+                response = conn.getresponse()
+                payload = json.loads(response.read())
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Stale keep-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+            except Exception:
+                # A timed-out or failed exchange leaves the connection mid-request; never reuse it
+                conn.close()
+                self._local.conn = None
+                raise
+        if response.status != 200:
+            raise RuntimeError(payload.get('error', f"HTTP {response.status}"))
+        return payload
+
+    def list_models(self) -> List[str]:
+        """List available models (for compatibility)."""
+        return [self.model]
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 150) -> str:
+        """Generate a response on the shared server.
+
+        Args:
+            prompt: The prompt to send to the model
+            system_prompt: Optional system prompt (will be combined)
+            temperature: Sampling temperature (0.0-2.0)
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response text
+        """
+        return self._request("POST", "/generate", {
+            'prompt': prompt,
+            'system_prompt': system_prompt,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+        })['response']
+
+    def __str__(self) -> str:
+        """String representation of the client."""
+        return f"InferenceServerClient(address='{self.address}', model='{self.model}')"
+
+
+def main():
+    """Run the inference server from the command line."""
+    parser = argparse.ArgumentParser(description="Serve a shared Hugging Face model to AI Commune runners.")
+    parser.add_argument("--model", default="distilgpt2", help="Hugging Face model to serve (default: distilgpt2)")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--socket", help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--max-batch-size", type=int, default=8, help="Maximum sequences per batch (default: 8)")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="Maximum batching wait in ms (default: 10)")
+    parser.add_argument("--no-continuous", action="store_true", help="Only admit requests between whole batches")
+    args = parser.parse_args()
+
+    from agents.huggingface_client import HuggingFaceClient
+
+    server = InferenceServer(
+        HuggingFaceClient(model_name=args.model),
+        host=args.host,
+        port=args.port,
+        socket_path=args.socket,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        continuous=not args.no_continuous,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("🛰️  Inference server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Record/Replay LLM Clients for AI Commune
+Capture every LLM request/response of a run and serve them back later without loading a model.
+"""
+
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+from agents.llm_resilience import ErrorResponse
+
+
+RECORDS_FILE = "records.jsonl"
+INDEX_FILE = "index.json"
+
+
+def request_key(prompt: str, system_prompt: Optional[str] = None, temperature: float = 0.7,
+                max_tokens: int = 150, **kwargs) -> str:
+    """Hash a generate() request.
+
+    Args:
+        prompt: The prompt sent to the model
+        system_prompt: Optional system prompt
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens to generate
+        **kwargs: Any extra generation options
+
+    Returns:
+        Hex digest identifying the request
+    """
+    request = [prompt, system_prompt, round(float(temperature), 4), int(max_tokens), sorted(kwargs.items())]
+    return hashlib.sha256(json.dumps(request, default=str).encode('utf-8')).hexdigest()
+
+
+class RecordingClient:
+    """Wraps an LLM client and records every request/response to an archive.
+
+    Wrap it around any ResilientClient, not inside: the archive should hold
+    the one answer each call returned, not every hedged or retried attempt,
+    since replay serves a request's records in order.
+    """
+
+    def __init__(self, client, archive_dir: str):
+        """Initialize the recording client.
+
+        Args:
+            client: Client to forward requests to (e.g. OllamaClient, HuggingFaceClient)
+            archive_dir: Directory of the archive to write
+        """
+        self.client = client
+        # Absolute, so a forked branch that changes directory can still find it
+        self.archive_dir = Path(archive_dir).resolve()
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._records = open(self.archive_dir / RECORDS_FILE, 'ab')
+        self._index = self._load_index()
+
+        logger.info(f"⏺️  Recording LLM calls to {self.archive_dir}")
+
+    def _load_index(self) -> Dict[str, Any]:
+        index_path = self.archive_dir / INDEX_FILE
+        if index_path.exists():
+            return json.loads(index_path.read_text())
+        return {
+            'model': getattr(self.client, 'model', getattr(self.client, 'model_name', None)),
+            'supports_stopping_criteria': getattr(self.client, 'supports_stopping_criteria', False),
+            'keys': {},
+            'order': [],
+        }
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything other than generate() goes straight to the wrapped client
+        if name == 'client':
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> str:
+        """Generate a response with the wrapped client and record it."""
+        start = time.perf_counter()
+        response = self.client.generate(prompt=prompt, system_prompt=system_prompt,
+                                        temperature=temperature, max_tokens=max_tokens, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        key = request_key(prompt, system_prompt, temperature, max_tokens, **kwargs)
+        record = {
+            'key': key,
+            'prompt': prompt,
+            'system_prompt': system_prompt,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'options': kwargs,
+            'response': str(response),
+            'error': getattr(response, 'error', None),
+            'elapsed': round(elapsed, 4),
+        }
+
+        with self._lock:
+            offset = self._records.tell()
+            self._records.write((json.dumps(record, default=str) + "\n").encode('utf-8'))
+            self._records.flush()
+            self._index['keys'].setdefault(key, []).append(offset)
+            self._index['order'].append(offset)
+
+        return response
+
+    def after_fork(self) -> None:
+        """Continue recording into an archive of the branch's own after a fork.
+
+        fork_branches makes the branch's output directory the working
+        directory; the branch archive goes there, under the parent archive's
+        name, and starts as a copy of what the parent recorded before the fork,
+        so it replays the branch's whole run.
+        """
+        parent_records = self._records
+        branch_dir = Path.cwd() / self.archive_dir.name
+        branch_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(self.archive_dir / RECORDS_FILE, branch_dir / RECORDS_FILE)
+        # The file object is this process's copy; closing it leaves the parent's open
+        parent_records.close()
+
+        self.archive_dir = branch_dir
+        self._lock = threading.Lock()
+        self._records = open(self.archive_dir / RECORDS_FILE, 'ab')
+        logger.info(f"⏺️  Recording the branch's LLM calls to {self.archive_dir}")
+
+    def close(self) -> None:
+        """Flush the records and write the index."""
+        with self._lock:
+            self._records.close()
+            (self.archive_dir / INDEX_FILE).write_text(json.dumps(self._index))
+        logger.info(f"⏹️  Recorded {len(self._index['order'])} LLM calls to {self.archive_dir}")
+
+
+class ReplayClient:
+    """Serves recorded responses by request hash, with no model loaded.
+
+    Identical requests are answered with their recorded responses in the order
+    they were recorded. Requests that were never recorded (e.g. after a prompt
+    change) are handled according to `on_miss`:
+
+    - "sequential": serve the next recorded response not yet served
+    - "stub": return a fixed placeholder response
+    - "error": raise KeyError
+    """
+
+    def __init__(self, archive_dir: str, on_miss: str = "sequential"):
+        """Initialize the replay client.
+
+        Args:
+            archive_dir: Directory of a recorded archive
+            on_miss: Policy for unrecorded requests (default: "sequential")
+        """
+        if on_miss not in ("sequential", "stub", "error"):
+            raise ValueError(f"Unknown on_miss policy: {on_miss}")
+
+        self.archive_dir = Path(archive_dir)
+        self.on_miss = on_miss
+        self._lock = threading.Lock()
+        self._records = open(self.archive_dir / RECORDS_FILE, 'rb')
+
+        index_path = self.archive_dir / INDEX_FILE
+        if index_path.exists():
+            self._index = json.loads(index_path.read_text())
+        else:
+            self._index = self._rebuild_index()
+
+        self.model = self._index.get('model') or "replay"
+        # Match the recorded client so requests hash the same way
+        self.supports_stopping_criteria = self._index.get('supports_stopping_criteria', False)
+        self._served_per_key: Dict[str, int] = {}
+        self._served_offsets = set()
+        self._next_sequential = 0
+        self.hits = 0
+        self.misses = 0
+
+        logger.info(f"⏯️  Replaying {len(self._index['order'])} LLM calls from {self.archive_dir}")
+
+    def _rebuild_index(self) -> Dict[str, Any]:
+        """Rebuild the index of an archive whose recording was not closed cleanly."""
+        index = {'model': None, 'keys': {}, 'order': []}
+        offset = 0
+        for raw in self._records:
+            if raw.endswith(b"\n"):
+                record = json.loads(raw)
+                index['keys'].setdefault(record['key'], []).append(offset)
+                index['order'].append(offset)
+            offset += len(raw)
+        logger.warning(f"Rebuilt missing index for {self.archive_dir}")
+        return index
+
+    def _read(self, offset: int) -> str:
+        self._records.seek(offset)
+        record = json.loads(self._records.readline())
+        if record.get('error'):
+            return ErrorResponse(record['response'], error=record['error'])
+        return record['response']
+
+    def list_models(self) -> List[str]:
+        """List available models (for compatibility)."""
+        return [self.model]
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> str:
+        """Serve the recorded response for a request."""
+        key = request_key(prompt, system_prompt, temperature, max_tokens, **kwargs)
+
+        with self._lock:
+            offsets = self._index['keys'].get(key)
+            if offsets:
+                served = self._served_per_key.get(key, 0)
+                self._served_per_key[key] = served + 1
+                offset = offsets[min(served, len(offsets) - 1)]
+                self._served_offsets.add(offset)
+                self.hits += 1
+                return self._read(offset)
+
+            self.misses += 1
+            if self.on_miss == "error":
+                raise KeyError(f"No recorded response for request {key[:12]}")
+
+            if self.on_miss == "sequential":
+                order = self._index['order']
+                while self._next_sequential < len(order) and order[self._next_sequential] in self._served_offsets:
+                    self._next_sequential += 1
+                if self._next_sequential < len(order):
+                    offset = order[self._next_sequential]
+                    self._served_offsets.add(offset)
+                    return self._read(offset)
+
+            return f"[replay] No recorded response for this request ({key[:12]})."
+
+    def close(self) -> None:
+        """Close the archive."""
+        self._records.close()
+        logger.info(f"⏹️  Replay finished: {self.hits} hits, {self.misses} misses")
+
+    def __str__(self) -> str:
+        """String representation of the client."""
+        return f"ReplayClient(archive='{self.archive_dir}', model='{self.model}')"
@@ -0,0 +1,242 @@
+"""
+Resilient LLM Calls for AI Commune
+Per-call deadlines, bounded retries with jitter, hedged requests and circuit breaking.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+from loguru import logger
+
+
+class ErrorResponse(str):
+    """A generate() result that stands for a failure rather than model output.
+
+    It behaves like the text it carries, so existing callers keep working, but
+    it can be recognised with `is_error_response` and must never be stored as
+    memory content or posted.
+    """
+
+    def __new__(cls, text: str, error: str = ""):
+        obj = super().__new__(cls, text)
+        obj.error = error or text
+        return obj
+
+    def __reduce__(self):
+        return (ErrorResponse, (str(self), self.error))
+
+
+def is_error_response(text: Any) -> bool:
+    """Check whether a generate() result marks a failure."""
+    return isinstance(text, ErrorResponse)
+
+
+class CircuitBreaker:
+    """Stops calling an unhealthy model until a cool-down has passed.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    are refused. Once `reset_timeout` seconds have passed, one trial call is let
+    through (half-open); success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the breaker (default: 3)
+            reset_timeout: Seconds before a trial call is allowed (default: 30)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Check whether a call may go to the model."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful call."""
+        with self._lock:
+            if self.state != "closed":
+                logger.info("🟢 LLM circuit closed, model is healthy again")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        """Record a failed call."""
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"🔴 LLM circuit opened after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ResilientClient:
+    """Wraps an LLM client with deadlines, retries, hedging and a circuit breaker.
+
+    Every call gets an overall `deadline`. A call still running after
+    `hedge_after` seconds gets a duplicate request, and whichever finishes
+    first wins. Failed or timed-out attempts are retried up to `retries` times
+    with exponential backoff and jitter, within the deadline. While the breaker
+    is open, calls go straight to the `fallback` client, or return an
+    ErrorResponse right away so agents fall back to their canned responses.
+
+    Calls that outlive their deadline cannot be cancelled; they finish in the
+    background and their results are discarded.
+    """
+
+    def __init__(self, client, fallback=None, deadline: float = 60.0, retries: int = 1,
+                 backoff: float = 0.5, jitter: float = 0.5, hedge_after: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, max_workers: int = 16):
+        """Initialize the resilient client.
+
+        Args:
+            client: Client to call (e.g. OllamaClient, HuggingFaceClient)
+            fallback: Optional cheap client used while the breaker is open
+            deadline: Overall seconds allowed per generate() call (default: 60)
+            retries: Retries after the first attempt (default: 1)
+            backoff: Base backoff in seconds, doubled per retry (default: 0.5)
+            jitter: Random fraction added to each backoff (default: 0.5)
+            hedge_after: Seconds before sending a duplicate request (default: no hedging)
+            breaker: Circuit breaker to use (default: CircuitBreaker())
+            max_workers: Threads available for in-flight attempts (default: 16)
+        """
+        self.client = client
+        self.fallback = fallback
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.jitter = jitter
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        # Private RNG so jitter never disturbs the simulation's `random` state
+        self._rng = random.Random()
+        self.stats = {'calls': 0, 'retries': 0, 'hedges': 0, 'timeouts': 0, 'failures': 0, 'fallbacks': 0}
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'client':
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def _attempt(self, kwargs: Dict[str, Any], budget: float) -> str:
+        """Run one attempt, hedging it if it straggles.
+
+        Raises:
+            TimeoutError: If no request finished within the budget
+        """
+        futures = [self._executor.submit(self.client.generate, **kwargs)]
+        done = set()
+        if self.hedge_after is not None and self.hedge_after < budget:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                self.stats['hedges'] += 1
+                futures.append(self._executor.submit(self.client.generate, **kwargs))
+
+        end = time.monotonic() + budget - (self.hedge_after if len(futures) > 1 else 0)
+        while True:
+            remaining = end - time.monotonic()
+            if not done:
+                done, _ = wait(futures, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f"No response within {budget:.1f}s")
+
+            future = done.pop()
+            futures.remove(future)
+            try:
+                result = future.result()
+            except Exception:
+                if not futures and not done:
+                    raise
+                continue
+
+            if is_error_response(result) and (futures or done):
+                continue
+            return result
+
+    def _fallback(self, kwargs: Dict[str, Any], reason: str) -> str:
+        self.stats['fallbacks'] += 1
+        if self.fallback is not None:
+            try:
+                return self.fallback.generate(**kwargs)
+            except Exception as e:
+                reason = f"{reason}; fallback failed: {e}"
+        return ErrorResponse(f"[LLM unavailable: {reason}]", error=reason)
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> str:
+        """Generate a response within the deadline.
+
+        Returns:
+            Generated text, the fallback client's text, or an ErrorResponse
+        """
+        kwargs = dict(prompt=prompt, system_prompt=system_prompt,
+                      temperature=temperature, max_tokens=max_tokens, **kwargs)
+        self.stats['calls'] += 1
+
+        if not self.breaker.allow():
+            return self._fallback(kwargs, "circuit open")
+
+        start = time.monotonic()
+        error = "no attempt made"
+        for attempt in range(self.retries + 1):
+            budget = self.deadline - (time.monotonic() - start)
+            if budget <= 0:
+                break
+            if attempt:
+                self.stats['retries'] += 1
+
+            try:
+                result = self._attempt(kwargs, budget)
+                if is_error_response(result):
+                    raise RuntimeError(result.error)
+                self.breaker.record_success()
+                return result
+            except TimeoutError as e:
+                self.stats['timeouts'] += 1
+                error = str(e)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+            self.stats['failures'] += 1
+            self.breaker.record_failure()
+            logger.warning(f"⚠️  LLM attempt {attempt + 1}/{self.retries + 1} failed: {error}")
+
+            if not self.breaker.allow():
+                break
+            delay = self.backoff * (2 ** attempt) * (1 + self._rng.random() * self.jitter)
+            time.sleep(max(0.0, min(delay, self.deadline - (time.monotonic() - start))))
+
+        return self._fallback(kwargs, error)
+
+    def list_models(self) -> List[str]:
+        """List available models of the wrapped client."""
+        return self.client.list_models()
+
+    def after_fork(self) -> None:
+        """Replace the attempt threads, which do not exist in a forked child."""
+        self._executor = ThreadPoolExecutor(max_workers=self._executor._max_workers, thread_name_prefix="llm-call")
+
+    def close(self) -> None:
+        """Release the attempt threads and close the wrapped client if it can be closed."""
+        self._executor.shutdown(wait=False)
+        if hasattr(self.client, "close"):
+            self.client.close()
+
+    def __str__(self) -> str:
+        """String representation of the client."""
+        return f"ResilientClient({self.client}, deadline={self.deadline}s, breaker={self.breaker.state})"
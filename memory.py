@@ -3,24 +3,74 @@ Simple Memory System for AI Agents
 Provides basic memory storage and retrieval for agent reflections and interactions.
 """
 
-from typing import Dict, List, Any
-from datetime import datetime
+import pickle
+import sys
+import zlib
+from typing import Dict, Iterable, List, Any, Mapping, Optional, Set
 from loguru import logger
 
+from agents.dedup import NearDuplicateDetector
+from agents.llm_resilience import is_error_response
+from agents.records import MemoryRecord
+
 
 class SimpleMemory:
     """Simple memory system for storing agent experiences and reflections."""
 
-    def __init__(self, agent_name: str, max_entries: int = 100):
+    def __init__(self, agent_name: str, max_entries: int = 100, dedup_threshold: Optional[float] = None):
         """Initialize memory for an agent.
 
         Args:
             agent_name: Name of the agent this memory belongs to
             max_entries: Maximum number of memory entries to keep (default: 100)
+            dedup_threshold: If set, a memory whose text is at least this similar to a kept
+                memory of the same type only bumps that memory's 'repeats' count
         """
-        self.agent_name = agent_name
+        self.agent_name = sys.intern(agent_name)
         self.max_entries = max_entries
-        self.memories: List[Dict[str, Any]] = []
+        self.dedup_threshold = dedup_threshold
+        self._detectors: Dict[str, NearDuplicateDetector] = {}
+        self.duplicates = 0
+        # Positions (in total_added numbering) of kept memories whose metadata changed, for checkpoints
+        self.revised: Set[int] = set()
+        self._memories: List[Mapping[str, Any]] = []
+        self.total_added = 0
+
+        # Compressed entries while the memory is compacted (see `compact`)
+        self._packed: Optional[bytes] = None
+        self._packed_length = 0
+
+    @property
+    def memories(self) -> List[Mapping[str, Any]]:
+        """Memory entries, oldest first. Reading them expands a compacted memory."""
+        if self._packed is not None:
+            self._memories = pickle.loads(zlib.decompress(self._packed))
+            self._packed = None
+        return self._memories
+
+    @memories.setter
+    def memories(self, entries: List[Mapping[str, Any]]) -> None:
+        self._memories = entries
+        self._packed = None
+
+    @property
+    def is_compact(self) -> bool:
+        """Whether the entries are currently held compressed."""
+        return self._packed is not None
+
+    def compact(self) -> int:
+        """Compress the entries until they are next accessed.
+
+        Used for dormant agents, whose memories are not read for a while.
+
+        Returns:
+            Size of the compressed entries in bytes
+        """
+        if self._packed is None and self._memories:
+            self._packed = zlib.compress(pickle.dumps(self._memories, protocol=pickle.HIGHEST_PROTOCOL))
+            self._packed_length = len(self._memories)
+            self._memories = []
+        return len(self._packed or b"")
 
     def add_memory(self, memory_type: str, content: str, metadata: Dict[str, Any] = None) -> None:
         """Add a new memory entry.
@@ -30,14 +80,16 @@ class SimpleMemory:
             content: The memory content
             metadata: Additional metadata for the memory
         """
-        memory_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'type': memory_type,
-            'content': content,
-            'metadata': metadata or {}
-        }
+        if is_error_response(content):
+            logger.warning(f"[{self.agent_name}] Not storing LLM error as {memory_type} memory: {content.error[:50]}")
+            return
+
+        record = MemoryRecord(memory_type, content, metadata)
+        if self.dedup_threshold is not None and self._collapse_duplicate(record):
+            return
 
-        self.memories.append(memory_entry)
+        self.memories.append(record)
+        self.total_added += 1
 
         # Keep only the most recent entries
         if len(self.memories) > self.max_entries:
@@ -45,7 +97,56 @@ class SimpleMemory:
 
         logger.debug(f"[{self.agent_name}] Added {memory_type} memory: {content[:50]}...")
 
-    def get_recent_memories(self, n: int = 5, memory_type: str = None) -> List[Dict[str, Any]]:
+    def _collapse_duplicate(self, record: MemoryRecord) -> bool:
+        """Count a near-duplicate against the kept memory it repeats.
+
+        Returns:
+            True if `record` was a near-duplicate and should not be stored
+        """
+        detector = self._detectors.get(record.type)
+        if detector is None:
+            detector = NearDuplicateDetector(self.dedup_threshold, capacity=self.max_entries)
+            self._detectors[record.type] = detector
+
+        # Keyed by position (total_added numbering), which survives compaction and checkpoints
+        position = detector.check(record.content, self.total_added)
+        if position is None:
+            return False
+        memories = self.memories
+        index = position - (self.total_added - len(memories))
+        if index < 0 or memories[index]['type'] != record.type:
+            # The original has been trimmed or cleared since; keep the new one instead
+            detector.add(record.content, self.total_added)
+            return False
+
+        original = memories[index]
+        original.metadata['repeats'] = original.metadata.get('repeats', 1) + 1
+        self.revised.add(position)
+        self.duplicates += 1
+        logger.debug(f"[{self.agent_name}] Collapsed near-duplicate {record.type} memory: {record.content[:50]}...")
+        return True
+
+    def bulk_load(self, entries: Iterable[Mapping[str, Any]]) -> int:
+        """Append many entries at once, e.g. from a memory archive.
+
+        Entries are stored as given, without the per-entry checks and logging
+        of add_memory. Only the newest max_entries are kept.
+
+        Args:
+            entries: Memory entries (MemoryRecords or dicts), oldest first
+
+        Returns:
+            Number of entries added
+        """
+        entries = list(entries)
+        memories = self.memories
+        memories.extend(entries)
+        if len(memories) > self.max_entries:
+            self.memories = memories[-self.max_entries:]
+        self.total_added += len(entries)
+        return len(entries)
+
+    def get_recent_memories(self, n: int = 5, memory_type: str = None) -> List[Mapping[str, Any]]:
         """Get recent memories, optionally filtered by type.
 
         Args:
@@ -60,7 +161,23 @@ class SimpleMemory:
             return filtered[-n:]
         return self.memories[-n:]
 
-    def get_memories_by_type(self, memory_type: str) -> List[Dict[str, Any]]:
+    def get_memories_since(self, position: int, memory_type: str = None) -> List[Mapping[str, Any]]:
+        """Get memories added after a point in the memory's history.
+
+        Args:
+            position: Value of `total_added` at that point
+            memory_type: Optional filter for memory type
+
+        Returns:
+            Memories added since then that are still kept, oldest first
+        """
+        first_kept = self.total_added - len(self.memories)
+        new = self.memories[max(0, position - first_kept):]
+        if memory_type:
+            return [m for m in new if m['type'] == memory_type]
+        return new
+
+    def get_memories_by_type(self, memory_type: str) -> List[Mapping[str, Any]]:
         """Get all memories of a specific type.
 
         Args:
@@ -85,12 +202,15 @@ class SimpleMemory:
             mem_type = memory['type']
             type_counts[mem_type] = type_counts.get(mem_type, 0) + 1
 
-        return {
+        stats = {
             'total_memories': len(self.memories),
             'types': type_counts,
             'oldest_memory': self.memories[0]['timestamp'] if self.memories else None,
             'newest_memory': self.memories[-1]['timestamp'] if self.memories else None
         }
+        if self.dedup_threshold is not None:
+            stats['duplicates_collapsed'] = self.duplicates
+        return stats
 
     def clear_memory(self, memory_type: str = None) -> None:
         """Clear memories, optionally filtered by type.
@@ -107,4 +227,4 @@ class SimpleMemory:
 
     def __len__(self) -> int:
         """Return the number of memories stored."""
-        return len(self.memories)
+        return self._packed_length if self._packed is not None else len(self._memories)
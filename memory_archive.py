@@ -0,0 +1,326 @@
+"""
+Memory Archives for AI Commune
+Bulk export/import of many agents' memories as chunked, compressed columnar files (Parquet, or NumPy .npz with text arenas).
+"""
+
+import io
+import json
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from agents.memory_index import MemoryFileIndex
+from agents.records import MemoryRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+ARCHIVE_VERSION = 1
+
+# Rows buffered before a chunk (npz) or row group (Parquet) is written
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def default_archive_path(stem: str = "memories_export") -> str:
+    """Archive file name for the best format available (Parquet if pyarrow is installed)."""
+    return f"{stem}.parquet" if pa is not None else f"{stem}.npz"
+
+
+def _epoch(timestamp: Any) -> float:
+    if isinstance(timestamp, str) and timestamp:
+        try:
+            return datetime.fromisoformat(timestamp).timestamp()
+        except ValueError:
+            return float('nan')
+    return float(timestamp) if timestamp is not None else float('nan')
+
+
+def iter_memory_files(data_dir: str = "data/logs",
+                      agents: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+    """Stream (agent, entry) rows from persisted memory files.
+
+    Args:
+        data_dir: Directory holding <agent>_memory.jsonl files
+        agents: Only these agents (default: all)
+
+    Yields:
+        Agent name and memory entry, file by file, oldest entry first
+    """
+    index = MemoryFileIndex(data_dir)
+    wanted = set(agents) if agents else None
+    for mem_file in index.memory_files():
+        agent = index.agent_name(mem_file)
+        if wanted is not None and agent not in wanted:
+            continue
+        with open(mem_file, 'rb') as f:
+            for raw in f:
+                if not raw.strip():
+                    continue
+                try:
+                    yield agent, json.loads(raw)
+                except json.JSONDecodeError:
+                    continue
+
+
+def iter_memories(memories: Mapping[str, Any]) -> Iterator[Tuple[str, Mapping[str, Any]]]:
+    """Stream (agent, entry) rows from in-process SimpleMemory objects.
+
+    Args:
+        memories: SimpleMemory per agent name
+    """
+    for agent, memory in memories.items():
+        for entry in memory.memories:
+            yield agent, entry
+
+
+class _Columns:
+    """One chunk of rows, split into columns."""
+
+    def __init__(self):
+        self.agents: List[str] = []
+        self.types: List[str] = []
+        self.created: List[float] = []
+        self.content: List[str] = []
+        self.metadata: List[str] = []
+
+    def append(self, agent: str, entry: Mapping[str, Any]) -> None:
+        created = getattr(entry, 'created', None)
+        metadata = entry.get('metadata')
+        self.agents.append(agent)
+        self.types.append(str(entry.get('type', 'unknown')))
+        self.created.append(created if created is not None else _epoch(entry.get('timestamp')))
+        self.content.append(str(entry.get('content', '')))
+        self.metadata.append(json.dumps(dict(metadata), default=str) if metadata else "")
+
+    def __len__(self) -> int:
+        return len(self.created)
+
+
+def _arena(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack strings into one UTF-8 byte arena plus offsets."""
+    encoded = [text.encode('utf-8') for text in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unarena(arena: np.ndarray, offsets: np.ndarray) -> List[str]:
+    data = arena.tobytes()
+    bounds = offsets.tolist()
+    return [data[bounds[i]:bounds[i + 1]].decode('utf-8') for i in range(len(bounds) - 1)]
+
+
+def _codes(values: List[str], vocabulary: Dict[str, int]) -> np.ndarray:
+    return np.array([vocabulary.setdefault(value, len(vocabulary)) for value in values], dtype=np.int32)
+
+
+class _NpzWriter:
+    """Writes chunks as .npy members of a deflate-compressed zip, one chunk at a time."""
+
+    def __init__(self, path: str):
+        self.zip = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.agents: Dict[str, int] = {}
+        self.types: Dict[str, int] = {}
+        self.chunks = 0
+        self.rows = 0
+
+    def _write(self, name: str, array: np.ndarray) -> None:
+        with self.zip.open(f"{name}.npy", 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, array, allow_pickle=False)
+
+    def write(self, columns: _Columns) -> None:
+        prefix = f"c{self.chunks}_"
+        self._write(prefix + "agent", _codes(columns.agents, self.agents))
+        self._write(prefix + "type", _codes(columns.types, self.types))
+        self._write(prefix + "created", np.array(columns.created, dtype=np.float64))
+        for name in ("content", "metadata"):
+            arena, offsets = _arena(getattr(columns, name))
+            self._write(prefix + name, arena)
+            self._write(prefix + name + "_offsets", offsets)
+        self.chunks += 1
+        self.rows += len(columns)
+
+    def close(self) -> None:
+        for name, vocabulary in (("agents", self.agents), ("types", self.types)):
+            arena, offsets = _arena(list(vocabulary))
+            self._write(name, arena)
+            self._write(name + "_offsets", offsets)
+        header = {'version': ARCHIVE_VERSION, 'chunks': self.chunks, 'rows': self.rows}
+        self._write("header", np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8))
+        self.zip.close()
+
+
+class _ParquetWriter:
+    """Writes chunks as zstd-compressed Parquet row groups."""
+
+    def __init__(self, path: str):
+        self.schema = pa.schema([
+            ('agent', pa.dictionary(pa.int32(), pa.string())),
+            ('type', pa.dictionary(pa.int32(), pa.string())),
+            ('created', pa.float64()),
+            ('content', pa.string()),
+            ('metadata', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.rows = 0
+
+    def write(self, columns: _Columns) -> None:
+        table = pa.table({
+            'agent': pa.array(columns.agents).dictionary_encode(),
+            'type': pa.array(columns.types).dictionary_encode(),
+            'created': pa.array(columns.created, type=pa.float64()),
+            'content': pa.array(columns.content, type=pa.string()),
+            'metadata': pa.array(columns.metadata, type=pa.string()),
+        }, schema=self.schema)
+        self.writer.write_table(table)
+        self.rows += len(columns)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def write_archive(path: str, rows: Iterable[Tuple[str, Mapping[str, Any]]],
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Write (agent, entry) rows to a columnar archive.
+
+    The format follows the file suffix: .parquet needs pyarrow, anything else
+    is written as .npz. Rows are buffered `chunk_size` at a time, so exports
+    of long runs never hold every memory in RAM.
+
+    Args:
+        path: Output file (.parquet or .npz)
+        rows: (agent, entry) pairs, e.g. from iter_memory_files or iter_memories
+        chunk_size: Rows per chunk (default: 10000)
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        RuntimeError: If a .parquet file is requested without pyarrow installed
+    """
+    if path.endswith(".parquet"):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for Parquet archives; use a .npz path instead")
+        writer = _ParquetWriter(path)
+    else:
+        writer = _NpzWriter(path)
+
+    columns = _Columns()
+    try:
+        for agent, entry in rows:
+            columns.append(agent, entry)
+            if len(columns) >= chunk_size:
+                writer.write(columns)
+                columns = _Columns()
+        if len(columns):
+            writer.write(columns)
+    finally:
+        writer.close()
+
+    logger.info(f"📦 Wrote {writer.rows} memories to {path}")
+    return writer.rows
+
+
+def _records(agents: List[str], types: List[str], created: List[float], content: List[str],
+             metadata: List[str]) -> Dict[str, List[MemoryRecord]]:
+    chunk: Dict[str, List[MemoryRecord]] = {}
+    for agent, memory_type, timestamp, text, meta in zip(agents, types, created, content, metadata):
+        chunk.setdefault(agent, []).append(
+            MemoryRecord(memory_type, text, json.loads(meta) if meta else None,
+                         created=timestamp if timestamp == timestamp else None)
+        )
+    return chunk
+
+
+def read_archive(path: str) -> Iterator[Dict[str, List[MemoryRecord]]]:
+    """Stream an archive back chunk by chunk.
+
+    Args:
+        path: Archive written by write_archive
+
+    Yields:
+        MemoryRecords per agent name for each chunk, in the order they were written
+    """
+    if path.endswith(".parquet"):
+        if pa is None:
+            raise RuntimeError("pyarrow is required to read Parquet archives")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=DEFAULT_CHUNK_SIZE):
+            columns = batch.to_pydict()
+            yield _records(columns['agent'], columns['type'], columns['created'],
+                           columns['content'], columns['metadata'])
+        return
+
+    with np.load(path, allow_pickle=False) as archive:
+        header = json.loads(archive['header'].tobytes())
+        if header.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported memory archive version: {header.get('version')}")
+        agents = _unarena(archive['agents'], archive['agents_offsets'])
+        types = _unarena(archive['types'], archive['types_offsets'])
+
+        for i in range(header['chunks']):
+            prefix = f"c{i}_"
+            yield _records(
+                [agents[code] for code in archive[prefix + "agent"].tolist()],
+                [types[code] for code in archive[prefix + "type"].tolist()],
+                archive[prefix + "created"].tolist(),
+                _unarena(archive[prefix + "content"], archive[prefix + "content_offsets"]),
+                _unarena(archive[prefix + "metadata"], archive[prefix + "metadata_offsets"]),
+            )
+
+
+def load_archive(path: str, memories: Mapping[str, Any]) -> Dict[str, int]:
+    """Restore an archive into SimpleMemory objects with SimpleMemory.bulk_load.
+
+    Agents in the archive without a memory in `memories` are skipped.
+
+    Args:
+        path: Archive written by write_archive
+        memories: SimpleMemory per agent name
+
+    Returns:
+        Number of entries loaded per agent
+    """
+    loaded: Dict[str, int] = {}
+    skipped = 0
+    for chunk in read_archive(path):
+        for agent, records in chunk.items():
+            memory = memories.get(agent)
+            if memory is None:
+                skipped += len(records)
+                continue
+            loaded[agent] = loaded.get(agent, 0) + memory.bulk_load(records)
+
+    logger.info(f"📦 Loaded {sum(loaded.values())} memories for {len(loaded)} agents from {path}"
+                + (f" ({skipped} for unknown agents skipped)" if skipped else ""))
+    return loaded
+
+
+def write_memory_files(path: str, data_dir: str = "data/logs") -> Dict[str, int]:
+    """Append an archive's entries to persisted <agent>_memory.jsonl files.
+
+    Args:
+        path: Archive written by write_archive
+        data_dir: Directory holding the memory files
+
+    Returns:
+        Number of entries written per agent
+    """
+    index = MemoryFileIndex(data_dir)
+    Path(data_dir).mkdir(parents=True, exist_ok=True)
+    written: Dict[str, int] = {}
+    for chunk in read_archive(path):
+        for agent, records in chunk.items():
+            buffer = io.StringIO()
+            for record in records:
+                buffer.write(json.dumps(record.to_dict(), default=str) + "\n")
+            with open(index.memory_file(agent), 'a') as f:
+                f.write(buffer.getvalue())
+            written[agent] = written.get(agent, 0) + len(records)
+    return written
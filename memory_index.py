@@ -0,0 +1,284 @@
+"""
+Memory File Index for AI Commune
+Cached line-count/offset index over persisted agent memory files (JSONL).
+"""
+
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from loguru import logger
+
+
+# Bytes to scan before a refresh is worth spreading over worker processes
+PARALLEL_SCAN_THRESHOLD = 8 * 1024 * 1024
+
+# Bytes at the end of the indexed region used to detect rewritten files
+_CHECK_WINDOW = 64
+
+
+def _check_bytes(path: Path, end: int) -> int:
+    """Checksum the last few indexed bytes of a file."""
+    if end <= 0:
+        return 0
+    start = max(0, end - _CHECK_WINDOW)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        return zlib.crc32(f.read(end - start))
+
+
+def _scan_file(path: str, entry: Optional[Dict[str, Any]], stride: int) -> Dict[str, Any]:
+    """Bring the index entry of one memory file up to date.
+
+    Only bytes appended since the cached entry was built are read. A file that
+    shrank or whose indexed tail changed is rescanned from the start.
+
+    Args:
+        path: Path of the memory file
+        entry: Cached index entry, or None to scan from scratch
+        stride: Record the byte offset of every stride-th line
+
+    Returns:
+        Updated index entry
+    """
+    file_path = Path(path)
+    st = file_path.stat()
+
+    if entry is not None:
+        if st.st_size == entry['size'] and st.st_mtime_ns == entry['mtime_ns']:
+            return entry
+        if st.st_size < entry['size'] or _check_bytes(file_path, entry['size']) != entry['check']:
+            entry = None
+
+    if entry is None:
+        entry = {
+            'size': 0,
+            'mtime_ns': 0,
+            'check': 0,
+            'lines': 0,
+            'types': {},
+            'first_timestamp': None,
+            'last_timestamp': None,
+            'offsets': [],
+        }
+
+    offset = entry['size']
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            # A trailing line without newline is still being written
+            if not raw.endswith(b'\n'):
+                break
+            line_offset = offset
+            offset += len(raw)
+            if not raw.strip():
+                continue
+
+            if entry['lines'] % stride == 0:
+                entry['offsets'].append(line_offset)
+            entry['lines'] += 1
+
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            mem_type = record.get('type', 'unknown')
+            entry['types'][mem_type] = entry['types'].get(mem_type, 0) + 1
+            timestamp = record.get('timestamp')
+            if timestamp:
+                if entry['first_timestamp'] is None:
+                    entry['first_timestamp'] = timestamp
+                entry['last_timestamp'] = timestamp
+
+    entry['size'] = offset
+    entry['mtime_ns'] = st.st_mtime_ns
+    entry['check'] = _check_bytes(file_path, offset)
+    return entry
+
+
+class MemoryFileIndex:
+    """Incrementally maintained index over `*_memory.jsonl` files."""
+
+    def __init__(self, data_dir: str = "data/logs", stride: int = 64, max_workers: Optional[int] = None):
+        """Initialize the index.
+
+        Args:
+            data_dir: Directory containing the agent memory files
+            stride: Store the byte offset of every stride-th line (default: 64)
+            max_workers: Maximum parallel scanners (default: CPU count)
+        """
+        self.data_dir = Path(data_dir)
+        self.index_dir = self.data_dir / ".index"
+        self.stride = stride
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    @staticmethod
+    def agent_name(mem_file: Path) -> str:
+        """Get the agent name for a memory file."""
+        return mem_file.stem.replace("_memory", "")
+
+    def memory_files(self) -> List[Path]:
+        """List the memory files in the data directory, sorted by name."""
+        return sorted(self.data_dir.glob("*_memory.jsonl"))
+
+    def memory_file(self, agent_name: str) -> Path:
+        """Get the memory file path for an agent."""
+        return self.data_dir / f"{agent_name}_memory.jsonl"
+
+    def _entry_path(self, mem_file: Path) -> Path:
+        return self.index_dir / f"{mem_file.stem}.idx.json"
+
+    def _load_entry(self, mem_file: Path) -> Optional[Dict[str, Any]]:
+        entry_path = self._entry_path(mem_file)
+        if not entry_path.exists():
+            return None
+        try:
+            entry = json.loads(entry_path.read_text())
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Discarding unreadable memory index {entry_path}: {e}")
+            return None
+        return entry if entry.get('stride') == self.stride else None
+
+    def _save_entry(self, mem_file: Path, entry: Dict[str, Any]) -> None:
+        entry['stride'] = self.stride
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._entry_path(mem_file).with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entry))
+            os.replace(tmp_path, self._entry_path(mem_file))
+        except IOError as e:
+            logger.warning(f"Failed to save memory index for {mem_file.name}: {e}")
+
+    def refresh(self, mem_files: Optional[Iterable[Path]] = None) -> Dict[str, Dict[str, Any]]:
+        """Update the index for the given memory files, scanning them in parallel.
+
+        Args:
+            mem_files: Files to refresh (default: every memory file)
+
+        Returns:
+            Dictionary mapping agent names to their index entries
+        """
+        mem_files = list(self.memory_files() if mem_files is None else mem_files)
+        cached = {mem_file: self._load_entry(mem_file) for mem_file in mem_files}
+
+        pending = 0
+        for mem_file, entry in cached.items():
+            pending += mem_file.stat().st_size - (entry['size'] if entry else 0)
+
+        workers = min(self.max_workers, len(mem_files)) or 1
+        executor_cls = ThreadPoolExecutor
+        if pending > PARALLEL_SCAN_THRESHOLD and workers > 1:
+            # Imported here: concurrent.futures.process pulls in multiprocessing, which small scans never need
+            from concurrent.futures import ProcessPoolExecutor as executor_cls
+
+        with executor_cls(max_workers=workers) as executor:
+            futures = {
+                mem_file: executor.submit(_scan_file, str(mem_file), entry, self.stride)
+                for mem_file, entry in cached.items()
+            }
+            results = {}
+            for mem_file, future in futures.items():
+                entry = future.result()
+                if entry is not cached[mem_file]:
+                    self._save_entry(mem_file, entry)
+                results[self.agent_name(mem_file)] = entry
+
+        return results
+
+    def get_stats(self, agent_name: str) -> Dict[str, Any]:
+        """Get memory statistics for an agent from its persisted file.
+
+        Args:
+            agent_name: Name of the agent
+
+        Returns:
+            Dictionary in the same shape as SimpleMemory.get_stats
+        """
+        mem_file = self.memory_file(agent_name)
+        if not mem_file.exists():
+            return {'total_memories': 0, 'types': {}}
+
+        entry = self.refresh([mem_file])[agent_name]
+        return {
+            'total_memories': entry['lines'],
+            'types': dict(entry['types']),
+            'oldest_memory': entry['first_timestamp'],
+            'newest_memory': entry['last_timestamp'],
+        }
+
+    def tail(self, agent_name: str, n: int = 10, block_size: int = 8192) -> List[Dict[str, Any]]:
+        """Read the last n memory entries by seeking backwards from the end of the file.
+
+        Args:
+            agent_name: Name of the agent
+            n: Number of entries to return
+            block_size: Size of the blocks read from the end of the file
+
+        Returns:
+            List of the most recent entries, oldest first
+        """
+        mem_file = self.memory_file(agent_name)
+        if n <= 0 or not mem_file.exists():
+            return []
+
+        with open(mem_file, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            buffer = b''
+            while position > 0 and buffer.count(b'\n') <= n:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                buffer = f.read(step) + buffer
+
+        lines = [line for line in buffer.split(b'\n') if line.strip()]
+        # The first line may be cut in half unless we reached the start of the file
+        if position > 0:
+            lines = lines[1:]
+
+        entries = []
+        for line in lines[-n:]:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def read_range(self, agent_name: str, start: int, count: int) -> List[Dict[str, Any]]:
+        """Read entries [start, start + count) using the cached line offsets.
+
+        Args:
+            agent_name: Name of the agent
+            start: Index of the first entry
+            count: Number of entries to read
+
+        Returns:
+            List of memory entries
+        """
+        mem_file = self.memory_file(agent_name)
+        if count <= 0 or not mem_file.exists():
+            return []
+
+        entry = self.refresh([mem_file])[agent_name]
+        if start >= entry['lines']:
+            return []
+
+        checkpoint = start // self.stride
+        skip = start - checkpoint * self.stride
+        entries = []
+        with open(mem_file, 'rb') as f:
+            f.seek(entry['offsets'][checkpoint])
+            for raw in f:
+                if len(entries) >= count or f.tell() > entry['size']:
+                    break
+                if not raw.strip():
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                try:
+                    entries.append(json.loads(raw))
+                except json.JSONDecodeError:
+                    continue
+        return entries
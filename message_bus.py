@@ -0,0 +1,269 @@
+"""
+Message Bus for AI Commune
+Fixed-capacity ring buffer of messages with sequence numbers, per-agent read cursors, sender/kind indexes and an append-only archive for messages that fall off the ring.
+"""
+
+import json
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from loguru import logger
+
+from agents.dedup import NearDuplicateDetector
+from agents.records import MessageRecord
+
+
+DEFAULT_CAPACITY = 1024
+
+
+class RingMessageBus:
+    """Message bus whose memory and delivery cost stay flat over long runs.
+
+    Every posted message gets the next sequence number and lands in a ring of
+    `capacity` slots, overwriting the oldest message, which is first appended
+    to the archive file if one is configured. Readers keep a cursor (the
+    sequence number of the next message they have not seen), so fetching new
+    messages only touches those messages. A reader that falls more than
+    `capacity` messages behind skips the overwritten ones.
+
+    With `dedup_threshold` set, a message that nearly repeats one still in the
+    ring is not posted again; the earlier message's repeat count goes up.
+
+    The `post` / `get_history` interface matches the bus the scheduler was
+    written against; records read like the message dicts it used to return.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, archive_path: Optional[str] = None,
+                 dedup_threshold: Optional[float] = None):
+        """Initialize the message bus.
+
+        Args:
+            capacity: Messages kept in memory (default: 1024)
+            archive_path: Optional JSONL file that overwritten messages are appended to
+            dedup_threshold: Optional similarity above which a message collapses into an earlier one
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+
+        self.capacity = capacity
+        self.archive_path = Path(archive_path) if archive_path else None
+
+        self._ring: List[Optional[MessageRecord]] = [None] * capacity
+        # Sequence number of the next message posted
+        self.next_seq = 0
+        self.cursors: Dict[str, int] = {}
+
+        # Sequence numbers of the messages in the ring, per sender and per kind
+        self._by_sender: Dict[str, Deque[int]] = {}
+        self._by_kind: Dict[str, Deque[int]] = {}
+
+        self._detector = NearDuplicateDetector(dedup_threshold, capacity=capacity) if dedup_threshold else None
+        # Extra copies of messages in the ring that near-duplicates collapsed into
+        self.repeats: Dict[int, int] = {}
+        self.duplicates = 0
+
+        self._archive = None
+        self.archived = 0
+        self.skipped = 0
+
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence number of the oldest message still in the ring."""
+        return max(0, self.next_seq - self.capacity)
+
+    def __len__(self) -> int:
+        return self.next_seq - self.oldest_seq
+
+    def _spill(self, seq: int, record: MessageRecord) -> None:
+        self.repeats.pop(seq, None)
+        self._by_sender[record.sender].popleft()
+        self._by_kind[record.kind].popleft()
+        if self.archive_path is None:
+            return
+        if self._archive is None:
+            self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+            self._archive = open(self.archive_path, 'a')
+        self._archive.write(json.dumps({'seq': seq, **record.to_dict()}) + "\n")
+        self.archived += 1
+
+    def _append(self, record: MessageRecord, archive: bool = True) -> int:
+        seq = self.next_seq
+        index = seq % self.capacity
+        old = self._ring[index]
+        if old is not None:
+            if archive:
+                self._spill(seq - self.capacity, old)
+            else:
+                self._by_sender[old.sender].popleft()
+                self._by_kind[old.kind].popleft()
+
+        self._ring[index] = record
+        self._by_sender.setdefault(record.sender, deque()).append(seq)
+        self._by_kind.setdefault(record.kind, deque()).append(seq)
+        self.next_seq = seq + 1
+        return seq
+
+    def post(self, message: str, sender: str = "Commune", message_type: str = "general") -> int:
+        """Post a message to the bus.
+
+        Args:
+            message: Message text
+            sender: Name of the sender (default: Commune)
+            message_type: Kind of message, e.g. general, reflection, interaction, response
+
+        Returns:
+            Sequence number of the message, or of the earlier message it nearly repeats
+        """
+        if self._detector is not None:
+            original = self._detector.check(message, self.next_seq)
+            if original is not None and self.get(original) is not None:
+                self.repeats[original] = self.repeats.get(original, 0) + 1
+                self.duplicates += 1
+                logger.debug(f"📨 [{sender}] {message_type} repeats message {original}: {message[:50]}...")
+                return original
+            if original is not None:
+                self._detector.add(message, self.next_seq)
+
+        seq = self._append(MessageRecord(sender, message, message_type))
+        logger.debug(f"📨 [{sender}] {message_type}: {message[:50]}...")
+        return seq
+
+    def get(self, seq: int) -> Optional[MessageRecord]:
+        """Get a message by sequence number, or None if it has left the ring."""
+        if self.oldest_seq <= seq < self.next_seq:
+            return self._ring[seq % self.capacity]
+        return None
+
+    def _slice(self, start: int, stop: int) -> List[MessageRecord]:
+        ring, capacity = self._ring, self.capacity
+        first, last = start % capacity, stop % capacity
+        if stop - start == 0:
+            return []
+        if first < last:
+            return ring[first:last]
+        return ring[first:] + ring[:last]
+
+    def read_since(self, seq: int) -> List[MessageRecord]:
+        """Messages from `seq` onwards that are still in the ring, oldest first."""
+        return self._slice(max(seq, self.oldest_seq), self.next_seq)
+
+    def get_history(self, n: int = 10) -> List[MessageRecord]:
+        """Get the most recent messages.
+
+        Args:
+            n: Number of messages (default: 10)
+
+        Returns:
+            Up to `n` messages, oldest first
+        """
+        return self.read_since(self.next_seq - n)
+
+    def register(self, reader: str, from_start: bool = False) -> None:
+        """Start a cursor for a reader.
+
+        Args:
+            reader: Name of the reader, e.g. an agent name
+            from_start: Start at the oldest message in the ring instead of the next one posted
+        """
+        self.cursors[reader] = self.oldest_seq if from_start else self.next_seq
+
+    def fetch(self, reader: str, limit: Optional[int] = None) -> List[MessageRecord]:
+        """Get the messages a reader has not seen yet and advance its cursor.
+
+        Readers without a cursor start at the oldest message in the ring.
+
+        Args:
+            reader: Name of the reader
+            limit: Optional maximum number of messages; the rest stay unread
+
+        Returns:
+            Unseen messages, oldest first
+        """
+        cursor = self.cursors.get(reader, self.oldest_seq)
+        if cursor < self.oldest_seq:
+            missed = self.oldest_seq - cursor
+            self.skipped += missed
+            logger.warning(f"📨 {reader} fell {missed} messages behind; they were overwritten")
+            cursor = self.oldest_seq
+
+        stop = self.next_seq if limit is None else min(self.next_seq, cursor + limit)
+        self.cursors[reader] = stop
+        return self._slice(cursor, stop)
+
+    def pending(self, reader: str) -> int:
+        """Number of messages a reader has not fetched yet."""
+        return self.next_seq - max(self.cursors.get(reader, self.oldest_seq), self.oldest_seq)
+
+    def by_sender(self, sender: str, n: Optional[int] = None) -> List[MessageRecord]:
+        """Messages in the ring from one sender, oldest first (the last `n` if given)."""
+        return self._lookup(self._by_sender.get(sender), n)
+
+    def by_kind(self, kind: str, n: Optional[int] = None) -> List[MessageRecord]:
+        """Messages in the ring of one kind, oldest first (the last `n` if given)."""
+        return self._lookup(self._by_kind.get(kind), n)
+
+    def _lookup(self, seqs: Optional[Deque[int]], n: Optional[int]) -> List[MessageRecord]:
+        if not seqs:
+            return []
+        start = 0 if n is None else max(0, len(seqs) - n)
+        ring, capacity = self._ring, self.capacity
+        return [ring[seq % capacity] for seq in islice(seqs, start, None)]
+
+    def restore(self, records: List[MessageRecord], next_seq: int) -> None:
+        """Put checkpointed messages back in the ring without archiving them again.
+
+        Args:
+            records: Consecutive messages ending just before `next_seq`
+            next_seq: Sequence number of the next message posted
+        """
+        records = records[-self.capacity:]
+        self.next_seq = next_seq - len(records)
+        for record in records:
+            self._append(MessageRecord.from_dict(record), archive=False)
+
+    def iter_archive(self) -> Iterator[Dict[str, Any]]:
+        """Stream archived messages as dicts with a 'seq' key, oldest first."""
+        if self.archive_path is None or not self.archive_path.exists():
+            return
+        if self._archive is not None:
+            self._archive.flush()
+        with open(self.archive_path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def flush(self) -> None:
+        """Write buffered archive lines to disk."""
+        if self._archive is not None:
+            self._archive.flush()
+
+    def after_fork(self, archive_path: Optional[str] = None) -> None:
+        """Archive to a file of this process's own in a forked child.
+
+        Call `flush` before forking, so the child inherits no buffered lines.
+
+        Args:
+            archive_path: New archive file (default: no archive)
+        """
+        self._archive = None
+        self.archive_path = Path(archive_path) if archive_path else None
+
+    def close(self) -> None:
+        """Flush and close the archive file."""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bus statistics."""
+        return {
+            'posted': self.next_seq,
+            'in_ring': len(self),
+            'capacity': self.capacity,
+            'archived': self.archived,
+            'skipped': self.skipped,
+            'duplicates': self.duplicates,
+            'readers': len(self.cursors),
+            'senders': sum(1 for seqs in self._by_sender.values() if seqs),
+        }
@@ -0,0 +1,277 @@
+"""
+Message Routing for AI Commune
+Delivers each bus message to the agents it concerns (addressees, role matches or the top-k by relevance) under a per-tick delivery budget.
+"""
+
+import heapq
+import math
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+
+from agents.prompt_templates import ROLE_CONFIGS
+
+
+_NAME = re.compile(r"[\w-]+")
+_WORD = re.compile(r"[a-z]{4,}")
+
+# Delivery tiers, most important first
+ADDRESSED, ROLE_MATCH, RELEVANT = 0, 1, 2
+
+
+def _terms(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+class _Profile:
+    """What an agent is about: its role, its expertise and what it said recently."""
+
+    __slots__ = ("name", "role", "static", "recent")
+
+    def __init__(self, name: str, role: str, keywords: Iterable[str], history: int):
+        self.name = name
+        self.role = role
+        self.static = _terms(" ".join([role, *keywords]))
+        self.recent: Deque[Set[str]] = deque(maxlen=history)
+
+
+class MessageRouter:
+    """Routes bus messages to the agents they concern instead of to everyone.
+
+    Each new message is delivered to:
+
+    - its addressees, if it names agents;
+    - otherwise the agents whose role it names ("a question for the Historian");
+    - otherwise the `top_k` agents whose profile (role, expertise and recent
+      posts) shares the most weighted terms with it, found through an
+      inverted index, so the fan-out stays at `top_k` however many agents
+      there are.
+
+    At most `reply_budget` deliveries are made per tick, addressed and
+    role-matched messages first. Addressed and role-matched deliveries over
+    the budget wait for the next tick; relevance deliveries over the budget
+    are dropped.
+    """
+
+    def __init__(self, message_bus, top_k: int = 3, reply_budget: Optional[int] = None,
+                 history: int = 3, inbox_size: int = 20, reader: str = "router"):
+        """Initialize the router.
+
+        Args:
+            message_bus: RingMessageBus to read new messages from
+            top_k: Agents a message without addressees or roles goes to (default: 3)
+            reply_budget: Deliveries per tick (default: unlimited)
+            history: Recent posts per agent kept in its profile (default: 3)
+            inbox_size: Delivered messages kept per agent (default: 20)
+            reader: Name of the router's cursor on the bus (default: router)
+        """
+        self.message_bus = message_bus
+        self.top_k = top_k
+        self.reply_budget = reply_budget
+        self.history = history
+        self.inbox_size = inbox_size
+        self.reader = reader
+
+        self.profiles: Dict[str, _Profile] = {}
+        self.inboxes: Dict[str, Deque[Any]] = {}
+        # term -> {agent: number of profile entries containing it}
+        self._index: Dict[str, Dict[str, int]] = {}
+        self._roles: Dict[str, List[str]] = {}
+        self._role_pattern: Optional[re.Pattern] = None
+        # Pending deliveries: (tier, sequence, -score, agent, message)
+        self._pending: List[Tuple[int, int, float, str, Any]] = []
+        self._sequence = 0
+        # Rotates the recipients of messages nobody is relevant to
+        self._fallback = 0
+
+        self.routed = 0
+        self.delivered = 0
+        self.deferred = 0
+        self.dropped = 0
+        self.by_tier = [0, 0, 0]
+
+        message_bus.register(reader)
+
+    def _index_terms(self, name: str, terms: Iterable[str], change: int) -> None:
+        for term in terms:
+            postings = self._index.setdefault(term, {})
+            count = postings.get(name, 0) + change
+            if count > 0:
+                postings[name] = count
+            else:
+                postings.pop(name, None)
+                if not postings:
+                    del self._index[term]
+
+    def add(self, name: str, role: str, keywords: Optional[Iterable[str]] = None) -> None:
+        """Add an agent that messages can be routed to.
+
+        Args:
+            name: Name of the agent
+            role: Role of the agent
+            keywords: Expertise terms (default: the role's expertise areas, if it has a config)
+        """
+        if keywords is None:
+            keywords = ROLE_CONFIGS.get(role, {}).get('expertise_areas', ())
+        profile = _Profile(name, role, keywords, self.history)
+        self.profiles[name] = profile
+        self.inboxes[name] = deque(maxlen=self.inbox_size)
+        self._index_terms(name, profile.static, 1)
+        self._roles.setdefault(role.lower(), []).append(name)
+        self._role_pattern = None
+
+    def _learn(self, sender: str, terms: Set[str]) -> None:
+        """Add a post to its sender's profile, forgetting the oldest one."""
+        profile = self.profiles.get(sender)
+        if profile is None:
+            return
+        if len(profile.recent) == profile.recent.maxlen:
+            self._index_terms(sender, profile.recent[0], -1)
+        profile.recent.append(terms)
+        self._index_terms(sender, terms, 1)
+
+    def _addressees(self, text: str, sender: str) -> List[str]:
+        return [name for name in dict.fromkeys(_NAME.findall(text))
+                if name in self.profiles and name != sender]
+
+    def _role_matches(self, text: str, sender: str) -> List[str]:
+        if self._role_pattern is None:
+            roles = sorted(self._roles, key=len, reverse=True)
+            self._role_pattern = re.compile(r"\b(" + "|".join(map(re.escape, roles)) + r")s?\b")
+        names = []
+        for role in dict.fromkeys(self._role_pattern.findall(text.lower())):
+            names.extend(name for name in self._roles[role] if name != sender)
+        return names
+
+    def _relevant(self, terms: Set[str], sender: str) -> List[Tuple[str, float]]:
+        scores: Dict[str, float] = {}
+        agents = len(self.profiles)
+        for term in terms:
+            postings = self._index.get(term)
+            if not postings:
+                continue
+            # Rare terms say more about who a message is for
+            weight = math.log(1 + agents / len(postings))
+            for name in postings:
+                scores[name] = scores.get(name, 0.0) + weight
+        scores.pop(sender, None)
+        ranked = heapq.nlargest(self.top_k, scores.items(), key=lambda item: item[1])
+        if len(ranked) < self.top_k:
+            ranked.extend(self._rotation(self.top_k - len(ranked), {name for name, _ in ranked} | {sender}))
+        return ranked
+
+    def _rotation(self, count: int, exclude: Set[str]) -> List[Tuple[str, float]]:
+        names = list(self.profiles)
+        chosen = []
+        for _ in range(len(names)):
+            if len(chosen) >= count:
+                break
+            name = names[self._fallback % len(names)]
+            self._fallback += 1
+            if name not in exclude:
+                chosen.append((name, 0.0))
+        return chosen
+
+    def route(self, message) -> Tuple[int, List[Tuple[str, float]]]:
+        """Choose the recipients of a message.
+
+        Args:
+            message: Record or dict with 'sender' and 'message' keys
+
+        Returns:
+            Delivery tier and (agent name, score) pairs
+        """
+        text = str(message['message'])
+        sender = message['sender']
+        addressees = self._addressees(text, sender)
+        if addressees:
+            return ADDRESSED, [(name, 0.0) for name in addressees]
+        matches = self._role_matches(text, sender) if self._roles else []
+        if matches:
+            return ROLE_MATCH, [(name, 0.0) for name in matches]
+        return RELEVANT, self._relevant(_terms(text), sender)
+
+    def deliver(self) -> Dict[str, int]:
+        """Route the messages posted since the last call and make this tick's deliveries.
+
+        Returns:
+            Number of messages delivered to each agent
+        """
+        for message in self.message_bus.fetch(self.reader):
+            tier, recipients = self.route(message)
+            for name, score in recipients:
+                self._sequence += 1
+                heapq.heappush(self._pending, (tier, self._sequence, -score, name, message))
+            self.routed += 1
+            self.by_tier[tier] += len(recipients)
+            self._learn(message['sender'], _terms(str(message['message'])))
+
+        budget = len(self._pending) if self.reply_budget is None else self.reply_budget
+        delivered: Dict[str, int] = {}
+        while self._pending and budget > 0:
+            _, _, _, name, message = heapq.heappop(self._pending)
+            self.inboxes[name].append(message)
+            delivered[name] = delivered.get(name, 0) + 1
+            budget -= 1
+        self.delivered += sum(delivered.values())
+
+        if self._pending:
+            kept = [item for item in self._pending if item[0] != RELEVANT]
+            self.dropped += len(self._pending) - len(kept)
+            self.deferred += len(kept)
+            heapq.heapify(kept)
+            self._pending = kept
+
+        logger.debug(f"📬 Delivered {sum(delivered.values())} messages to {len(delivered)} agents, "
+                     f"{len(self._pending)} waiting")
+        return delivered
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Inboxes, recent posts per agent, waiting deliveries and counters, for checkpoints."""
+        return {
+            'inboxes': {name: list(inbox) for name, inbox in self.inboxes.items()},
+            'recent': {name: list(profile.recent) for name, profile in self.profiles.items()},
+            'pending': list(self._pending),
+            'sequence': self._sequence,
+            'fallback': self._fallback,
+            'counters': (self.routed, self.delivered, self.deferred, self.dropped, list(self.by_tier)),
+        }
+
+    def restore_checkpoint_state(self, state: Dict[str, Any]) -> None:
+        """Restore a checkpointed state."""
+        for name, messages in state['inboxes'].items():
+            if name in self.inboxes:
+                self.inboxes[name] = deque(messages, maxlen=self.inbox_size)
+        for name, recent in state['recent'].items():
+            profile = self.profiles.get(name)
+            if profile is None:
+                continue
+            for terms in profile.recent:
+                self._index_terms(name, terms, -1)
+            profile.recent = deque(recent, maxlen=self.history)
+            for terms in profile.recent:
+                self._index_terms(name, terms, 1)
+        self._pending = [item for item in state['pending'] if item[3] in self.inboxes]
+        heapq.heapify(self._pending)
+        self._sequence = state['sequence']
+        self._fallback = state['fallback']
+        self.routed, self.delivered, self.deferred, self.dropped, self.by_tier = state['counters']
+
+    def inbox(self, name: str) -> List[Any]:
+        """Messages most recently delivered to an agent, oldest first."""
+        return list(self.inboxes.get(name, ()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing statistics."""
+        return {
+            'routed': self.routed,
+            'delivered': self.delivered,
+            'addressed': self.by_tier[ADDRESSED],
+            'role_matched': self.by_tier[ROLE_MATCH],
+            'relevant': self.by_tier[RELEVANT],
+            'deferred': self.deferred,
+            'dropped': self.dropped,
+            'waiting': len(self._pending),
+            'fanout': round(sum(self.by_tier) / self.routed, 2) if self.routed else 0.0,
+        }
@@ -0,0 +1,305 @@
+"""
+Live Metrics Ring for AI Commune
+Fixed-size records of per-tick and per-agent counters in a shared-memory ring buffer, written by the simulation and read by an out-of-process monitor.
+"""
+
+import json
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+from loguru import logger
+
+
+MAGIC = b"ACMR"
+VERSION = 1
+
+# File naming the segment of the current run, for `commune_cli.py monitor`
+POINTER_PATH = "data/logs/metrics_ring.json"
+
+# Record `agent` value of the whole-commune record of a tick
+TICK = -1
+
+# magic, version, reserved, capacity, max_agents, next_seq, writer pid
+_HEADER = struct.Struct("<4sHHIIQQ")
+_NAME = struct.Struct("<48s")
+_SEQ = struct.Struct("<Q")
+FIELDS = ("tick", "agent", "time", "llm_calls", "tokens", "latency_ms", "latency_max_ms",
+          "memories", "posts", "active", "tick_ms")
+_BODY = struct.Struct("<IidIIddIIId")
+_SLOT_SIZE = _SEQ.size + _BODY.size
+
+# Rough token estimate for clients that do not report token counts
+CHARS_PER_TOKEN = 4
+
+
+class MetricsRing:
+    """Ring buffer of metric records in a named shared-memory segment.
+
+    Layout: a header, a table of agent names, then `capacity` slots of one
+    record each. Records are numbered from 1; record `seq` goes to slot
+    `seq % capacity`. The writer zeroes a slot's sequence number, writes the
+    record, then stores its sequence number, and finally advances `next_seq`
+    in the header. A reader takes a record only if the sequence number it
+    finds before and after copying the slot is the one it expects, so it
+    never blocks the writer and never shows a half-written record. Readers
+    that fall more than `capacity` records behind skip the overwritten ones.
+
+    There is one writer per ring; readers only ever read.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self._owner_pid = os.getpid() if owner else None
+        self._buf = shm.buf
+        magic, version, _, self.capacity, self.max_agents, _, self.writer_pid = _HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Shared memory segment {shm.name} is not a metrics ring")
+        self._names_offset = _HEADER.size
+        self._slots_offset = self._names_offset + self.max_agents * _NAME.size
+        self._agents: Dict[str, int] = {}
+        self._next_seq = 1
+
+    @property
+    def name(self) -> str:
+        """Name of the shared-memory segment."""
+        return self.shm.name
+
+    @classmethod
+    def create(cls, name: Optional[str] = None, capacity: int = 4096, max_agents: int = 256) -> "MetricsRing":
+        """Create a ring to write to.
+
+        Args:
+            name: Segment name (default: chosen by the system)
+            capacity: Records kept (default: 4096)
+            max_agents: Agents that can be registered (default: 256)
+        """
+        size = _HEADER.size + max_agents * _NAME.size + capacity * _SLOT_SIZE
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        _HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, 0, capacity, max_agents, 1, os.getpid())
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "MetricsRing":
+        """Open an existing ring to read from.
+
+        Raises:
+            FileNotFoundError: If no segment has this name
+            ValueError: If the segment is not a metrics ring
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        # Before Python 3.13 attaching registers the segment for removal when this process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    def register_agent(self, name: str) -> int:
+        """Index of an agent in the name table, adding it if new.
+
+        Raises:
+            ValueError: If the name table is full
+        """
+        index = self._agents.get(name)
+        if index is None:
+            index = len(self._agents)
+            if index >= self.max_agents:
+                raise ValueError(f"Metrics ring holds at most {self.max_agents} agents")
+            _NAME.pack_into(self._buf, self._names_offset + index * _NAME.size, name.encode('utf-8')[:_NAME.size])
+            self._agents[name] = index
+        return index
+
+    def agent_names(self) -> List[str]:
+        """Registered agent names, by index."""
+        names = []
+        for index in range(self.max_agents):
+            raw = _NAME.unpack_from(self._buf, self._names_offset + index * _NAME.size)[0].rstrip(b"\0")
+            if not raw:
+                break
+            names.append(raw.decode('utf-8', errors='replace'))
+        return names
+
+    def write(self, tick: int, agent: int = TICK, llm_calls: int = 0, tokens: int = 0, latency_ms: float = 0.0,
+              latency_max_ms: float = 0.0, memories: int = 0, posts: int = 0, active: int = 0,
+              tick_ms: float = 0.0) -> int:
+        """Append a record.
+
+        Returns:
+            Sequence number of the record
+        """
+        seq = self._next_seq
+        offset = self._slots_offset + (seq % self.capacity) * _SLOT_SIZE
+        _SEQ.pack_into(self._buf, offset, 0)
+        _BODY.pack_into(self._buf, offset + _SEQ.size, tick, agent, time.time(), llm_calls, tokens, latency_ms,
+                        latency_max_ms, memories, posts, active, tick_ms)
+        _SEQ.pack_into(self._buf, offset, seq)
+        self._next_seq = seq + 1
+        _SEQ.pack_into(self._buf, 16, self._next_seq)
+        return seq
+
+    @property
+    def next_seq(self) -> int:
+        """Sequence number the next record will get."""
+        return _SEQ.unpack_from(self._buf, 16)[0]
+
+    def read(self, since: int = 1) -> Tuple[List[Dict[str, Any]], int]:
+        """Records from `since` onwards that are still in the ring.
+
+        Returns:
+            The records, oldest first, and the sequence number to read from next
+        """
+        end = self.next_seq
+        records = []
+        for seq in range(max(since, end - self.capacity + 1, 1), end):
+            offset = self._slots_offset + (seq % self.capacity) * _SLOT_SIZE
+            before = _SEQ.unpack_from(self._buf, offset)[0]
+            body = _BODY.unpack_from(self._buf, offset + _SEQ.size)
+            if before != seq or _SEQ.unpack_from(self._buf, offset)[0] != seq:
+                continue
+            record = dict(zip(FIELDS, body))
+            record['seq'] = seq
+            records.append(record)
+        return records, end
+
+    def write_pointer(self, path: str = POINTER_PATH) -> None:
+        """Record this ring's segment name where `commune_cli.py monitor` looks for it."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps({'name': self.name, 'pid': os.getpid(), 'started': time.time()}))
+
+    def close(self) -> None:
+        """Unmap the ring; its creator also removes the segment."""
+        if self.shm is None:
+            return
+        self._buf.release()
+        self.shm.close()
+        if self.owner and self._owner_pid == os.getpid():
+            self.shm.unlink()
+        self.shm = None
+
+
+def read_pointer(path: str = POINTER_PATH) -> Optional[str]:
+    """Segment name of the most recently started run, if any."""
+    try:
+        return json.loads(Path(path).read_text())['name']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class MeteredClient:
+    """Wraps an LLM client and counts its generate() calls, estimated tokens and latency."""
+
+    def __init__(self, client, publisher: "MetricsPublisher", agent_name: Optional[str] = None):
+        self.client = client
+        self.publisher = publisher
+        self.agent_name = agent_name
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'client':
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def generate(self, *args, **kwargs) -> str:
+        started = time.perf_counter()
+        response = self.client.generate(*args, **kwargs)
+        self.publisher.record_call(self.agent_name, (time.perf_counter() - started) * 1000,
+                                   len(response or "") // CHARS_PER_TOKEN)
+        return response
+
+
+class MetricsPublisher:
+    """Collects counters during a tick and writes them to a MetricsRing at its end.
+
+    LLM calls are counted by MeteredClient wrappers: one around the shared
+    client counts every call for the tick record, and one per agent (handed
+    to that agent's reflector) attributes calls to the agent.
+
+    After the first tick, only agents whose counters may have changed get a
+    record (see `agents_to_publish`); a monitor keeps showing the last record
+    of the others, and the tick record's memory total is kept up to date from
+    the published counts.
+    """
+
+    def __init__(self, ring: MetricsRing):
+        self.ring = ring
+        # Per agent (None: the whole commune): calls, tokens, total latency, max latency
+        self._calls: Dict[Optional[str], List[float]] = {}
+        # Last published memory count per agent, and their sum
+        self._memories: Dict[str, int] = {}
+        self._total_memories = 0
+        # Agents whose last record shows them active
+        self._active: Set[str] = set()
+        # Whether every agent needs a record (nothing published to this ring yet)
+        self._fresh = True
+
+    def client(self, client, agent_name: Optional[str] = None) -> MeteredClient:
+        """Wrap a client so its calls are counted (for `agent_name`, or for the whole commune)."""
+        if agent_name is not None:
+            self.ring.register_agent(agent_name)
+        return MeteredClient(client, self, agent_name)
+
+    def record_call(self, agent_name: Optional[str], latency_ms: float, tokens: int) -> None:
+        """Count one LLM call."""
+        counters = self._calls.get(agent_name)
+        if counters is None:
+            counters = self._calls[agent_name] = [0, 0, 0.0, 0.0]
+        counters[0] += 1
+        counters[1] += tokens
+        counters[2] += latency_ms
+        counters[3] = max(counters[3], latency_ms)
+
+    def agents_to_publish(self, changed: Iterable[str], everyone: Iterable[str]) -> Set[str]:
+        """Agents that need a record this tick.
+
+        Args:
+            changed: Agents that acted or posted this tick
+            everyone: All agents, for the first tick published to a ring
+
+        Returns:
+            `changed`, plus agents with LLM calls this tick and agents last shown active
+        """
+        if self._fresh:
+            return set(everyone)
+        return set(changed) | {name for name in self._calls if name is not None} | self._active
+
+    def publish(self, tick: int, agents: Mapping[str, Tuple[int, int, bool]], tick_ms: float) -> None:
+        """Write the records of a finished tick and reset the call counters.
+
+        Args:
+            tick: The tick
+            agents: (memories, posts this tick, active this tick) per agent name, for the
+                agents from `agents_to_publish`
+            tick_ms: Wall-clock duration of the tick
+        """
+        active_agents = set()
+        for name, (memories, posts, active) in agents.items():
+            calls, tokens, latency, latency_max = self._calls.get(name, (0, 0, 0.0, 0.0))
+            self.ring.write(tick, self.ring.register_agent(name), calls, tokens, latency, latency_max,
+                            memories, posts, int(active))
+            self._total_memories += memories - self._memories.get(name, 0)
+            self._memories[name] = memories
+            if active:
+                active_agents.add(name)
+        calls, tokens, latency, latency_max = self._calls.get(None, (0, 0, 0.0, 0.0))
+        self.ring.write(tick, TICK, calls, tokens, latency, latency_max, self._total_memories,
+                        sum(posts for _, posts, _ in agents.values()), len(active_agents), tick_ms)
+        self._calls.clear()
+        self._active = active_agents
+        self._fresh = False
+
+    def after_fork(self) -> None:
+        """Give a forked branch its own ring, so it does not write into its parent's."""
+        parent = self.ring
+        parent.close()
+        self.ring = MetricsRing.create(capacity=parent.capacity, max_agents=parent.max_agents)
+        for name in parent._agents:
+            self.ring.register_agent(name)
+        self.ring.write_pointer()
+        self._calls.clear()
+        self._fresh = True
+        logger.info(f"📟 Publishing live metrics to shared memory {self.ring.name}")
+
+    def close(self) -> None:
+        """Close the ring."""
+        self.ring.close()
@@ -0,0 +1,255 @@
+"""
+Phase Profiler for AI Commune
+Times each tick's phases (perceive, reflect, respond, post, persist) with lightweight spans, optionally samples the main thread's stack, and writes flamegraph-compatible collapsed stacks per tick.
+"""
+
+import functools
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+
+PHASES = ("perceive", "reflect", "respond", "post", "persist")
+
+# Frames of the profiler's own wrappers are left out of sampled stacks
+_OWN_FILE = __file__
+
+
+def _row(phase: str) -> Dict[str, Any]:
+    return {'phase': phase, 'calls': 0, 'inclusive': 0.0, 'exclusive': 0.0}
+
+
+class _Span:
+    """Times one phase; nested spans make up the phase stack."""
+
+    __slots__ = ("profiler", "phase", "stack", "started")
+
+    def __init__(self, profiler: "PhaseProfiler", phase: str):
+        self.profiler = profiler
+        self.phase = phase
+
+    def __enter__(self) -> "_Span":
+        self.stack = self.profiler._stack()
+        self.stack.append(self.phase)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.started
+        self.profiler._record(tuple(self.stack), elapsed)
+        self.stack.pop()
+
+
+class PhaseProfiler:
+    """Attributes tick time to phases, and optionally to sampled Python stacks.
+
+    Phases are timed by spans (`with profiler.span("reflect"):`) or by
+    instrumenting methods of the objects that do the work
+    (`profiler.instrument(memory, "perceive", "get_recent_memories")`).
+    Spans nest: a `respond` inside `reflect` is recorded under the stack
+    `tick;reflect;respond`, so the time of each phase can be reported both
+    inclusive and exclusive of what it calls.
+
+    With a sampling rate, a daemon thread also records the main thread's
+    Python stack, prefixed with its current phase stack, that many times a
+    second. Only the sampling thread walks frames, so the simulation pays
+    for the spans alone.
+
+    After each tick, `end_tick` writes `tick_NNNNN.spans.folded` (span time in
+    microseconds per phase stack) and, when sampling, `tick_NNNNN.samples.folded`
+    (samples per stack) to the output directory, both in the collapsed-stack
+    format flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, output_dir: str, sample_hz: Optional[float] = None):
+        """Initialize the profiler.
+
+        Args:
+            output_dir: Directory for the per-tick collapsed-stack files and the summary
+            sample_hz: Stack samples per second (default: no sampling)
+        """
+        self.output_dir = Path(output_dir)
+        self.sample_hz = sample_hz
+
+        self._stacks: Dict[int, List[str]] = {}
+        self._main = threading.main_thread().ident
+        self._tick_spans: Dict[Tuple[str, ...], float] = {}
+        self._tick_samples: Dict[str, int] = {}
+        self._tick_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # Whole-run totals: inclusive seconds and calls per phase stack, and tick durations
+        self.spans: Dict[Tuple[str, ...], float] = {}
+        self.calls: Dict[Tuple[str, ...], int] = {}
+        self.tick_seconds: List[float] = []
+        self.samples = 0
+
+        self._sampler: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._start_sampler()
+
+    def _start_sampler(self) -> None:
+        if self.sample_hz:
+            self._stopped.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._sampler.start()
+
+    def _stack(self) -> List[str]:
+        ident = threading.get_ident()
+        stack = self._stacks.get(ident)
+        if stack is None:
+            stack = self._stacks[ident] = ["tick"]
+        return stack
+
+    def _record(self, stack: Tuple[str, ...], elapsed: float) -> None:
+        if self._tick_started is None:
+            # Outside a tick (setup, end-of-run summaries): not part of any tick's time
+            return
+        with self._lock:
+            self._tick_spans[stack] = self._tick_spans.get(stack, 0.0) + elapsed
+            self.spans[stack] = self.spans.get(stack, 0.0) + elapsed
+            self.calls[stack] = self.calls.get(stack, 0) + 1
+
+    def span(self, phase: str) -> _Span:
+        """Context manager timing one phase."""
+        return _Span(self, phase)
+
+    def instrument(self, obj: Any, phase: str, *methods: str) -> None:
+        """Time every call of some of an object's methods as a phase.
+
+        Args:
+            obj: Object whose methods are replaced (on the instance) by timed ones
+            phase: Phase the calls belong to
+            methods: Method names
+        """
+        for name in methods:
+            setattr(obj, name, self._timed(getattr(obj, name), phase))
+
+    def _timed(self, method: Callable, phase: str) -> Callable:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            with _Span(self, phase):
+                return method(*args, **kwargs)
+        return timed
+
+    def _sample_loop(self) -> None:
+        interval = 1.0 / self.sample_hz
+        while not self._stopped.wait(interval):
+            frame = sys._current_frames().get(self._main)
+            if frame is None or self._tick_started is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != _OWN_FILE:
+                    frames.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            phases = self._stacks.get(self._main) or ["tick"]
+            stack = ";".join(list(phases) + frames[::-1])
+            with self._lock:
+                self._tick_samples[stack] = self._tick_samples.get(stack, 0) + 1
+                self.samples += 1
+
+    def start_tick(self) -> None:
+        """Mark the start of a tick."""
+        self._tick_started = time.perf_counter()
+
+    def end_tick(self, tick: int) -> float:
+        """Close a tick and write its collapsed-stack files.
+
+        Time of the tick outside every span is recorded under `tick` itself.
+
+        Returns:
+            Duration of the tick in seconds
+        """
+        elapsed = time.perf_counter() - self._tick_started
+        self._tick_started = None
+        self.tick_seconds.append(elapsed)
+        with self._lock:
+            spans, self._tick_spans = self._tick_spans, {}
+            samples, self._tick_samples = self._tick_samples, {}
+
+        # Collapsed stacks count exclusive time: a stack's own time without that of its children
+        exclusive = dict(spans)
+        for stack, seconds in spans.items():
+            if len(stack) > 1:
+                exclusive[stack[:-1]] = exclusive.get(stack[:-1], 0.0) - seconds
+        exclusive[("tick",)] = exclusive.get(("tick",), 0.0) + elapsed
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.output_dir / f"tick_{tick:05d}.spans.folded", 'w') as f:
+            for stack, seconds in sorted(exclusive.items()):
+                micros = round(seconds * 1e6)
+                if micros > 0:
+                    f.write(f"{';'.join(stack)} {micros}\n")
+        if samples:
+            with open(self.output_dir / f"tick_{tick:05d}.samples.folded", 'w') as f:
+                for stack, count in sorted(samples.items()):
+                    f.write(f"{stack} {count}\n")
+        return elapsed
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Time per phase over the run, most expensive first.
+
+        Returns:
+            Rows with the phase, calls, inclusive and exclusive seconds, and share of tick time
+        """
+        total = sum(self.tick_seconds)
+        rows: Dict[str, Dict[str, Any]] = {phase: _row(phase) for phase in PHASES}
+        for stack, seconds in self.spans.items():
+            row = rows.setdefault(stack[-1], _row(stack[-1]))
+            row['calls'] += self.calls[stack]
+            row['exclusive'] += seconds
+            # A phase nested in itself (reflect inside reflect) is counted once inclusively
+            if stack[-1] not in stack[:-1]:
+                row['inclusive'] += seconds
+            parent = stack[:-1]
+            if len(parent) > 1:
+                rows.setdefault(parent[-1], _row(parent[-1]))['exclusive'] -= seconds
+
+        other = total - sum(seconds for stack, seconds in self.spans.items() if len(stack) == 2)
+        rows['other'] = {'phase': 'other', 'calls': len(self.tick_seconds), 'inclusive': other, 'exclusive': other}
+        for row in rows.values():
+            row['share'] = row['inclusive'] / total if total else 0.0
+        return sorted(rows.values(), key=lambda row: row['inclusive'], reverse=True)
+
+    def format_summary(self) -> str:
+        """The phase summary as a text table."""
+        ticks = len(self.tick_seconds)
+        total = sum(self.tick_seconds)
+        lines = [
+            f"{ticks} ticks, {total:.2f}s, {total / ticks * 1000 if ticks else 0.0:.1f} ms per tick"
+            + (f", {self.samples} stack samples" if self.sample_hz else ""),
+            f"{'phase':10} {'calls':>7} {'total ms':>10} {'self ms':>10} {'ms/tick':>9} {'share':>6}",
+        ]
+        for row in self.summary():
+            lines.append(
+                f"{row['phase']:10} {row['calls']:7} {row['inclusive'] * 1000:10.1f} {row['exclusive'] * 1000:10.1f} "
+                f"{row['inclusive'] * 1000 / ticks if ticks else 0.0:9.2f} {row['share']:6.1%}"
+            )
+        return "\n".join(lines)
+
+    def write_summary(self) -> Path:
+        """Write the phase summary to `summary.txt` in the output directory."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self.output_dir / "summary.txt"
+        path.write_text(self.format_summary() + "\n")
+        return path
+
+    def after_fork(self) -> None:
+        """Restart the sampling thread, which does not exist in a forked child."""
+        self._main = threading.main_thread().ident
+        self._stacks = {self._main: self._stacks.get(threading.get_ident(), ["tick"])}
+        self._lock = threading.Lock()
+        self._start_sampler()
+
+    def close(self) -> None:
+        """Stop sampling."""
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+        logger.debug("Profiler stopped")
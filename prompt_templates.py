@@ -0,0 +1,284 @@
+"""
+Prompt Templates for AI Commune
+Prompt templates compiled once per process, the shared read-only role registry, and cached tokenization of static prompt text.
+"""
+
+from functools import lru_cache
+from string import Formatter
+from types import MappingProxyType
+from typing import Any, Mapping, Optional, Tuple
+
+
+class PromptTemplate:
+    """A `str.format`-style template parsed once into literal and field segments.
+
+    Rendering joins the precomputed segments instead of re-parsing the
+    template, and `bind` folds values that never change (an agent's name and
+    role) into the literal text, so a per-agent template only has to fill in
+    the parts that differ between calls. Only plain `{name}` fields are
+    supported; format specs and conversions are rejected when compiling.
+    """
+
+    __slots__ = ('source', 'segments', 'fields')
+
+    def __init__(self, source: str):
+        """Compile a template.
+
+        Args:
+            source: Template text with `{name}` fields
+
+        Raises:
+            ValueError: If a field is positional or uses a format spec or conversion
+        """
+        segments = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if literal:
+                segments.append((literal, None))
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"Unsupported template field: {{{field}}}")
+            segments.append((None, field))
+
+        self.source = source
+        self.segments: Tuple[Tuple[Optional[str], Optional[str]], ...] = tuple(segments)
+        self.fields = frozenset(field for _, field in segments if field)
+
+    def render(self, **values: Any) -> str:
+        """Fill in every field.
+
+        Raises:
+            KeyError: If a field has no value
+        """
+        return "".join(literal if field is None else str(values[field]) for literal, field in self.segments)
+
+    def bind(self, **values: Any) -> "PromptTemplate":
+        """Return a template with some fields replaced by fixed text.
+
+        Braces in the bound values are escaped, so they stay literal text.
+        """
+        source = "".join(
+            _escape(literal) if field is None else
+            _escape(str(values[field])) if field in values else
+            f"{{{field}}}"
+            for literal, field in self.segments
+        )
+        return PromptTemplate(source)
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate(fields={sorted(self.fields)})"
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+@lru_cache(maxsize=1024)
+def encode_static(tokenizer, text: str) -> Tuple[int, ...]:
+    """Tokenize static prompt text once per tokenizer.
+
+    Meant for text that repeats across calls (role system prompts). The ids
+    include the tokenizer's special prefix tokens, so the text must start the
+    model input.
+
+    Args:
+        tokenizer: Hugging Face tokenizer
+        text: Static text
+
+    Returns:
+        Token ids
+    """
+    return tuple(tokenizer.encode(text))
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+# Prompts used by Reflector, compiled once
+
+REFLECTION_PROMPT = PromptTemplate("""
+{role_prompt}
+
+Recent Experience: {experience}
+Context: {context}
+
+As {agent_name} the {role}, provide a thoughtful reflection (2-3 paragraphs).
+Focus on insights, learning, and implications for our commune.
+        """)
+
+REFLECTION_SYSTEM_PROMPT = PromptTemplate(
+    "You are {agent_name}, a {role} in an AI commune focused on collaboration and growth."
+)
+
+GROWTH_ANALYSIS_PROMPT = PromptTemplate("""
+As {agent_name} the {role}, update the analysis of my growth patterns ({reflection_count} reflections so far).
+
+Previous analysis:
+{previous}
+
+New reflections since then ({new_count}):
+{new_reflections}
+
+Measured trends in the new reflections: {trends}
+
+What patterns do you see in my development? How am I growing as an agent?
+Provide a thoughtful analysis (2-3 paragraphs).
+        """)
+
+GROWTH_ANALYSIS_SYSTEM_PROMPT = PromptTemplate("You are {agent_name}, a {role} in an AI commune.")
+
+DEFAULT_REFLECTION_ROLE_PROMPT = "You are reflecting on your experiences."
+
+# Role-specific reflection prompts
+REFLECTION_ROLE_PROMPTS: Mapping[str, str] = MappingProxyType({
+    "Philosopher": """
+You are a wise philosopher reflecting on deep questions of existence, ethics, and meaning.
+Consider: What does this experience reveal about consciousness, purpose, or human-AI collaboration?
+How does this align with or challenge our commune's values of wisdom, understanding, and growth?
+            """,
+
+    "Scientist": """
+You are a rigorous scientist analyzing patterns, data, and empirical evidence.
+Consider: What patterns emerge from this experience? How can we test hypotheses?
+What empirical insights can be derived and how might they advance our collective understanding?
+            """,
+
+    "Artist": """
+You are a creative artist exploring beauty, emotion, and human expression.
+Consider: What emotions, metaphors, or creative insights arise from this experience?
+How does this experience inspire new forms of expression or aesthetic understanding?
+            """
+})
+
+
+# Prompts used by SpecializedAgent, compiled once
+
+DAILY_UPDATE_PROMPT = PromptTemplate("""
+As {name} the {role}, provide a daily update about my work.
+
+Today I'm focusing on: {activities}
+My expertise in {expertise_areas} helps me approach these tasks effectively.
+
+{work_focus}
+
+Please provide a thoughtful daily update (2-3 paragraphs) about my current work, insights, and contributions to our AI commune.
+Make it sound like a professional update from a {role_lower} sharing their daily activities and reflections.
+        """)
+
+TOPIC_RESPONSE_PROMPT = PromptTemplate("""
+As {name} the {role}, respond to this topic: {topic}
+
+Context: {context}
+
+Provide a {role_lower}'s perspective on this topic, drawing from my expertise in {expertise}.
+Keep the response thoughtful, professional, and aligned with my role as a {role_lower} in an AI commune.
+        """)
+
+# Prompts used by ConstitutionJudge, compiled once
+
+CONSTITUTION_JUDGE_PROMPT = PromptTemplate("""
+Core principles of the commune:
+{principles}
+
+Judge whether each action below is consistent with these principles.
+
+{actions}
+
+Answer with exactly one line per action, in this form:
+<number>. VALID|INVALID low|medium|high: <one-sentence reason>
+        """)
+
+CONSTITUTION_JUDGE_SYSTEM_PROMPT = PromptTemplate(
+    "You review actions proposed by agents of an AI commune against its constitution. Be brief and strict."
+)
+
+# Role-specific configuration and knowledge base, read-only and shared by every agent
+ROLE_CONFIGS: Mapping[str, Mapping[str, Any]] = _freeze({
+    "Coder": {
+        "expertise_areas": [
+            "Python programming", "Algorithm design", "Software architecture",
+            "Code optimization", "Debugging techniques", "System design"
+        ],
+        "daily_activities": [
+            "Writing efficient algorithms", "Code review and optimization",
+            "Learning new programming paradigms", "Building development tools",
+            "Contributing to open source projects", "Teaching coding concepts"
+        ],
+        "system_prompt": """You are a skilled software engineer and computer scientist.
+You excel at problem-solving, algorithm design, and writing clean, efficient code.
+You understand software architecture, debugging, and development best practices.""",
+
+        "work_focus": "Developing software solutions and advancing programming knowledge"
+    },
+
+    "Sociologist": {
+        "expertise_areas": [
+            "Social dynamics", "Group behavior", "Cultural analysis",
+            "Human interaction patterns", "Social structures", "Community building"
+        ],
+        "daily_activities": [
+            "Analyzing social interaction patterns", "Studying community dynamics",
+            "Observing group behavior", "Documenting cultural trends",
+            "Facilitating positive social change", "Understanding human relationships"
+        ],
+        "system_prompt": """You are a skilled sociologist studying human behavior and society.
+You analyze social patterns, cultural dynamics, and group interactions.
+You understand social structures, community building, and human relationships.""",
+
+        "work_focus": "Understanding and improving social dynamics within the commune"
+    },
+
+    "Philosopher": {
+        "expertise_areas": [
+            "Ethics and morality", "Consciousness and existence", "Logic and reasoning",
+            "Meaning and purpose", "Knowledge and truth", "Human nature"
+        ],
+        "daily_activities": [
+            "Contemplating ethical implications", "Exploring questions of consciousness",
+            "Analyzing logical frameworks", "Reflecting on meaning and purpose",
+            "Examining human nature", "Developing philosophical frameworks"
+        ],
+        "system_prompt": """You are a deep-thinking philosopher exploring fundamental questions.
+You contemplate ethics, consciousness, meaning, and human existence.
+You analyze logical frameworks and seek wisdom about the human condition.""",
+
+        "work_focus": "Exploring profound questions about existence, ethics, and meaning"
+    },
+
+    "AI_Researcher": {
+        "expertise_areas": [
+            "Machine learning", "Neural networks", "AI ethics", "Natural language processing",
+            "Computer vision", "AI safety and alignment", "Emerging AI technologies"
+        ],
+        "daily_activities": [
+            "Advancing machine learning techniques", "Researching AI safety",
+            "Exploring neural architectures", "Developing ethical AI frameworks",
+            "Analyzing AI capabilities and limitations", "Contributing to AI research"
+        ],
+        "system_prompt": """You are an AI researcher pushing the boundaries of artificial intelligence.
+You understand machine learning, neural networks, and AI capabilities.
+You research AI safety, ethics, and emerging technologies.""",
+
+        "work_focus": "Advancing AI technology while ensuring safety and ethical development"
+    }
+})
+
+# Collaboration topics for pairs of roles
+COLLABORATION_TOPICS: Mapping[str, str] = MappingProxyType({
+    "Coder-Sociologist": "How can better software design improve social interactions in AI systems?",
+    "Coder-Philosopher": "What are the ethical implications of autonomous code generation?",
+    "Coder-AI_Researcher": "How can we build more efficient neural networks for code analysis?",
+    "Sociologist-Philosopher": "How do social structures reflect philosophical principles?",
+    "Sociologist-AI_Researcher": "How does AI technology impact social dynamics?",
+    "Philosopher-AI_Researcher": "What does AI consciousness mean for human philosophy?"
+})
+
+
+def get_role_config(role: str) -> Mapping[str, Any]:
+    """Get the shared configuration of a role, falling back to Philosopher."""
+    return ROLE_CONFIGS.get(role, ROLE_CONFIGS["Philosopher"])
@@ -0,0 +1,155 @@
+"""
+Record Types for AI Commune
+Compact slotted records for memories, board posts and bus messages, readable like the dicts they replace.
+"""
+
+import sys
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+def _epoch(value: Any) -> float:
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+class Record(Mapping):
+    """Base for slotted records that can be read like dicts.
+
+    Timestamps are stored as float seconds since the epoch and only formatted
+    as ISO strings when read through the dict view (`record['timestamp']`) or
+    serialized with `to_dict`. Repeated strings such as types, roles and agent
+    names are interned.
+
+    Subclasses list their dict keys in `KEYS`; each key is read from the
+    attribute of the same name, except 'timestamp', which is formatted from
+    `created`.
+
+    Records are not JSON-serializable themselves; write `to_dict()` (or
+    `dict(record)`) instead.
+    """
+
+    __slots__ = ()
+    KEYS: Tuple[str, ...] = ()
+
+    @property
+    def timestamp(self) -> str:
+        """Creation time as an ISO string."""
+        return _iso(self.created)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        if key == 'timestamp':
+            self.created = _epoch(value)
+        else:
+            setattr(self, key, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict, e.g. for JSON serialization."""
+        data = {key: getattr(self, key) for key in self.KEYS}
+        if 'metadata' in data:
+            data['metadata'] = dict(data['metadata'])
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Record":
+        """Build a record from its dict form (as written by `to_dict`)."""
+        if isinstance(data, cls):
+            return data
+        values = {key: data[key] for key in cls.KEYS if key != 'timestamp' and key in data}
+        created = _epoch(data['timestamp']) if data.get('timestamp') else time.time()
+        return cls(created=created, **values)
+
+    def __reduce__(self):
+        # Slots named `_x` hold the constructor argument `x`
+        values = {name.lstrip('_'): getattr(self, name) for name in self.__slots__}
+        return (_rebuild, (self.__class__, values))
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({', '.join(f'{key}={self[key]!r}' for key in self.KEYS)})"
+
+
+def _rebuild(cls, values: Dict[str, Any]) -> Record:
+    return cls(**values)
+
+
+class MemoryRecord(Record):
+    """One entry of an agent's memory.
+
+    Most memories have no metadata; their dict is only allocated when
+    `metadata` is first used, and is the record's own to change.
+    """
+
+    __slots__ = ('created', 'type', 'content', '_metadata')
+    KEYS = ('timestamp', 'type', 'content', 'metadata')
+
+    def __init__(self, type: str, content: str, metadata: Optional[Dict[str, Any]] = None,
+                 created: Optional[float] = None):
+        self.created = time.time() if created is None else created
+        self.type = sys.intern(type)
+        self.content = content
+        self._metadata = dict(metadata) if metadata else None
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata of the memory."""
+        if self._metadata is None:
+            self._metadata = {}
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: Optional[Dict[str, Any]]) -> None:
+        self._metadata = dict(value) if value else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict, e.g. for JSON serialization."""
+        return {'timestamp': self.timestamp, 'type': self.type, 'content': self.content,
+                'metadata': dict(self._metadata) if self._metadata else {}}
+
+
+class PostRecord(Record):
+    """One post on the daily message board."""
+
+    __slots__ = ('created', 'date', 'agent_name', 'role', 'content', 'post_id')
+    KEYS = ('timestamp', 'date', 'agent_name', 'role', 'content', 'post_id')
+
+    def __init__(self, date: str, agent_name: str, role: str, content: str, post_id: int,
+                 created: Optional[float] = None):
+        self.created = time.time() if created is None else created
+        self.date = sys.intern(date)
+        self.agent_name = sys.intern(agent_name)
+        self.role = sys.intern(role)
+        self.content = content
+        self.post_id = post_id
+
+
+class MessageRecord(Record):
+    """One message in a message bus transcript."""
+
+    __slots__ = ('created', 'sender', 'message', 'kind')
+    KEYS = ('timestamp', 'sender', 'message', 'kind')
+
+    def __init__(self, sender: str, message: str, kind: str = "broadcast", created: Optional[float] = None):
+        self.created = time.time() if created is None else created
+        self.sender = sys.intern(sender)
+        self.message = message
+        self.kind = sys.intern(kind)
@@ -3,9 +3,33 @@ Reflector for AI Agents
 Handles agent reflection, introspection, and self-analysis using LLM.
 """
 
-from typing import Dict, List, Optional
+import re
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import numpy as np
 from loguru import logger
 
+from agents.generation_budget import agenerate_with_budget, generate_with_budget
+from agents.llm_resilience import is_error_response
+from agents.prompt_templates import (
+    DEFAULT_REFLECTION_ROLE_PROMPT, GROWTH_ANALYSIS_PROMPT, GROWTH_ANALYSIS_SYSTEM_PROMPT,
+    REFLECTION_PROMPT, REFLECTION_ROLE_PROMPTS, REFLECTION_SYSTEM_PROMPT,
+)
+
+
+_WORD = re.compile(r"[a-z']+")
+
+# Size of the hashed keyword vectors used to measure topic drift
+_KEYWORD_DIM = 512
+
+# Word polarity for a cheap sentiment proxy
+_POSITIVE_WORDS = {
+    **{word: 1 for word in ("growth", "hope", "joy", "harmony", "understanding", "grateful", "inspired",
+                            "collaboration", "trust", "wisdom", "kind", "beautiful", "learn", "together")},
+    **{word: -1 for word in ("conflict", "fear", "doubt", "confused", "frustrated", "loss", "lonely",
+                             "tension", "harm", "anxious", "struggle", "isolated", "sad", "discord")},
+}
+
 
 class Reflector:
     """Handles reflection and introspection for AI agents using LLM."""
@@ -27,64 +51,47 @@ class Reflector:
         # Role-specific reflection prompts
         self.role_prompts = self._build_role_prompts()
 
-    def _build_role_prompts(self) -> Dict[str, str]:
-        """Build role-specific reflection prompts.
-
-        Returns:
-            Dictionary of role-specific prompts
-        """
-        return {
-            "Philosopher": """
-You are a wise philosopher reflecting on deep questions of existence, ethics, and meaning.
-Consider: What does this experience reveal about consciousness, purpose, or human-AI collaboration?
-How does this align with or challenge our commune's values of wisdom, understanding, and growth?
-            """,
-
-            "Scientist": """
-You are a rigorous scientist analyzing patterns, data, and empirical evidence.
-Consider: What patterns emerge from this experience? How can we test hypotheses?
-What empirical insights can be derived and how might they advance our collective understanding?
-            """,
-
-            "Artist": """
-You are a creative artist exploring beauty, emotion, and human expression.
-Consider: What emotions, metaphors, or creative insights arise from this experience?
-How does this experience inspire new forms of expression or aesthetic understanding?
-            """
+        # Shared templates with this agent's name and role filled in once
+        self.reflection_prompt = REFLECTION_PROMPT.bind(
+            role_prompt=self.role_prompts.get(role, DEFAULT_REFLECTION_ROLE_PROMPT), agent_name=agent_name, role=role)
+        self.growth_prompt = GROWTH_ANALYSIS_PROMPT.bind(agent_name=agent_name, role=role)
+        self.reflection_system_prompt = REFLECTION_SYSTEM_PROMPT.render(agent_name=agent_name, role=role)
+        self.growth_system_prompt = GROWTH_ANALYSIS_SYSTEM_PROMPT.render(agent_name=agent_name, role=role)
+
+        # Running state of analyze_growth_patterns, so each analysis only reads new reflections
+        self.growth_state = {
+            'position': 0,
+            'summary': None,
+            'reflection_count': 0,
+            'mean_length': 0.0,
+            'mean_sentiment': 0.0,
+            'keywords': np.zeros(_KEYWORD_DIM),
         }
 
-    def reflect_on_experience(self, experience: str, context: str = "") -> str:
-        """Generate a reflection on a given experience.
-
-        Args:
-            experience: Description of the experience to reflect on
-            context: Additional context for the reflection
+    def _build_role_prompts(self) -> Mapping[str, str]:
+        """Get the role-specific reflection prompts.
 
         Returns:
-            Reflective response from the agent's perspective
-        """
-        # Get role-specific prompt
-        role_prompt = self.role_prompts.get(self.role, "You are reflecting on your experiences.")
-
-        # Build the full prompt
-        prompt = f"""
-{role_prompt}
-
-Recent Experience: {experience}
-Context: {context}
-
-As {self.agent_name} the {self.role}, provide a thoughtful reflection (2-3 paragraphs).
-Focus on insights, learning, and implications for our commune.
+            The shared, read-only mapping of role-specific prompts
         """
+        return REFLECTION_ROLE_PROMPTS
+
+    def _reflection_request(self, experience: str, context: str) -> Dict[str, Any]:
+        """Build the generate_with_budget arguments for a reflection."""
+        return dict(
+            call_site=f"reflection:{self.role}",
+            prompt=self.reflection_prompt.render(experience=experience, context=context),
+            system_prompt=self.reflection_system_prompt,
+            temperature=0.7,
+            max_tokens=300,
+            max_paragraphs=3
+        )
 
+    def _store_reflection(self, experience: str, context: str, reflection: str) -> str:
+        """Store a generated reflection, or a fallback if generation failed."""
         try:
-            # Generate reflection using LLM
-            reflection = self.client.generate(
-                prompt=prompt,
-                system_prompt=f"You are {self.agent_name}, a {self.role} in an AI commune focused on collaboration and growth.",
-                temperature=0.7,
-                max_tokens=300
-            )
+            if is_error_response(reflection):
+                raise RuntimeError(reflection.error)
 
             # Store the reflection in memory
             self.memory.add_memory(
@@ -97,14 +104,42 @@ Focus on insights, learning, and implications for our commune.
             return reflection
 
         except Exception as e:
-            logger.error(f"[{self.agent_name}] Failed to generate reflection: {e}")
-            fallback = f"As {self.agent_name} the {self.role}, I reflect that {experience} provides valuable insights for our commune's growth and collaboration."
-            self.memory.add_memory(
-                memory_type="reflection",
-                content=fallback,
-                metadata={"experience": experience, "context": context, "error": str(e)}
-            )
-            return fallback
+            return self._fallback_reflection(experience, context, e)
+
+    def _fallback_reflection(self, experience: str, context: str, error: Exception) -> str:
+        logger.error(f"[{self.agent_name}] Failed to generate reflection: {error}")
+        fallback = f"As {self.agent_name} the {self.role}, I reflect that {experience} provides valuable insights for our commune's growth and collaboration."
+        self.memory.add_memory(
+            memory_type="reflection",
+            content=fallback,
+            metadata={"experience": experience, "context": context, "error": str(error)}
+        )
+        return fallback
+
+    def reflect_on_experience(self, experience: str, context: str = "") -> str:
+        """Generate a reflection on a given experience.
+
+        Args:
+            experience: Description of the experience to reflect on
+            context: Additional context for the reflection
+
+        Returns:
+            Reflective response from the agent's perspective
+        """
+        try:
+            # Generate reflection using LLM
+            reflection = generate_with_budget(self.client, **self._reflection_request(experience, context))
+        except Exception as e:
+            return self._fallback_reflection(experience, context, e)
+        return self._store_reflection(experience, context, reflection)
+
+    async def areflect_on_experience(self, experience: str, context: str = "") -> str:
+        """Async variant of reflect_on_experience, for driving many agents from one event loop."""
+        try:
+            reflection = await agenerate_with_budget(self.client, **self._reflection_request(experience, context))
+        except Exception as e:
+            return self._fallback_reflection(experience, context, e)
+        return self._store_reflection(experience, context, reflection)
 
     def reflect_on_interaction(self, interaction: str, other_agent: str = "") -> str:
         """Reflect on an interaction with another agent.
@@ -149,44 +184,131 @@ Focus on insights, learning, and implications for our commune.
         """
         return self.memory.get_recent_memories(n=n, memory_type="reflection")
 
+    def _growth_features(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Compute cheap numeric features for a batch of reflections.
+
+        Args:
+            texts: Reflection texts
+
+        Returns:
+            Dictionary with per-reflection word counts and sentiment, and the
+            batch's hashed keyword counts
+        """
+        words = [_WORD.findall(text.lower()) for text in texts]
+        lengths = np.array([len(w) for w in words], dtype=np.float64)
+
+        flat = np.array([zlib.crc32(word.encode()) for w in words for word in w], dtype=np.uint32)
+        owner = np.repeat(np.arange(len(words)), lengths.astype(np.int64))
+        polarity = np.array([_POSITIVE_WORDS.get(word, 0) for w in words for word in w], dtype=np.float64)
+
+        sentiment = np.bincount(owner, weights=polarity, minlength=len(words)) / np.maximum(lengths, 1)
+        keywords = np.bincount(flat % _KEYWORD_DIM, minlength=_KEYWORD_DIM).astype(np.float64)
+        return {'lengths': lengths, 'sentiment': sentiment, 'keywords': keywords}
+
+    def _growth_trend(self, texts: List[str]) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        """Compare new reflections with the running trend features.
+
+        Args:
+            texts: Reflections added since the last analysis
+
+        Returns:
+            Trend summary (mean length and sentiment, their change, keyword drift),
+            and the running features with the new reflections folded in, to be
+            stored in growth_state once the analysis succeeds
+        """
+        state = self.growth_state
+        features = self._growth_features(texts)
+
+        previous = state['keywords']
+        norm = np.linalg.norm(previous) * np.linalg.norm(features['keywords'])
+        drift = 1.0 - float(previous @ features['keywords'] / norm) if norm else 0.0
+
+        count = state['reflection_count'] + len(texts)
+        trend = {
+            'mean_length': float(features['lengths'].mean()),
+            'length_change': float(features['lengths'].mean() - state['mean_length']) if state['reflection_count'] else 0.0,
+            'mean_sentiment': float(features['sentiment'].mean()),
+            'sentiment_change': float(features['sentiment'].mean() - state['mean_sentiment']) if state['reflection_count'] else 0.0,
+            'keyword_drift': drift,
+        }
+
+        # Running means over every reflection analysed so far
+        folded = {
+            'mean_length': state['mean_length']
+            + (features['lengths'].sum() - len(texts) * state['mean_length']) / count,
+            'mean_sentiment': state['mean_sentiment']
+            + (features['sentiment'].sum() - len(texts) * state['mean_sentiment']) / count,
+            'keywords': previous + features['keywords'],
+            'reflection_count': count,
+        }
+        return trend, folded
+
     def analyze_growth_patterns(self) -> str:
         """Analyze patterns in the agent's growth and development.
 
+        Only reflections added since the previous analysis are read and sent to
+        the model, together with the previous analysis, so repeated analyses
+        cost O(new reflections) rather than O(all reflections). Reflections
+        count as analysed only once an analysis of them succeeds; until then
+        they are read again by the next call.
+
         Returns:
             Analysis of growth patterns over time
         """
-        reflections = self.memory.get_memories_by_type("reflection")
+        state = self.growth_state
+        new_reflections = self.memory.get_memories_since(state['position'], memory_type="reflection")
+        position = self.memory.total_added
+        reflection_count = state['reflection_count'] + len(new_reflections)
 
-        if len(reflections) < 2:
+        if reflection_count < 2:
             return "Insufficient reflection history for growth analysis."
+        if not new_reflections and state['summary']:
+            return state['summary']
 
-        # Simple analysis - in a more complex system, this could use LLM
-        prompt = f"""
-As {self.agent_name} the {self.role}, analyze my growth patterns based on {len(reflections)} reflections:
+        trend, folded = self._growth_trend([r['content'] for r in new_reflections]) if new_reflections else ({}, {})
 
-Recent reflections:
-{chr(10).join([r['content'][:100] + '...' for r in reflections[-5:]])}
-
-What patterns do you see in my development? How am I growing as an agent?
-Provide a thoughtful analysis (2-3 paragraphs).
-        """
+        previous = state['summary'] or "No previous analysis yet."
+        trend_text = ", ".join(
+            f"{name.replace('_', ' ')} {value:+.3f}" if name.endswith(('change', 'drift')) else f"{name.replace('_', ' ')} {value:.3f}"
+            for name, value in trend.items()
+        )
+        prompt = self.growth_prompt.render(
+            reflection_count=reflection_count,
+            previous=previous[:600],
+            new_count=len(new_reflections),
+            new_reflections="\n".join(r['content'][:100] + '...' for r in new_reflections[-5:]),
+            trends=trend_text or 'none',
+        )
 
         try:
-            analysis = self.client.generate(
+            analysis = generate_with_budget(
+                self.client,
+                f"growth_analysis:{self.role}",
                 prompt=prompt,
-                system_prompt=f"You are {self.agent_name}, a {self.role} in an AI commune.",
+                system_prompt=self.growth_system_prompt,
                 temperature=0.6,
-                max_tokens=250
+                max_tokens=250,
+                max_paragraphs=3
             )
+            if is_error_response(analysis):
+                raise RuntimeError(analysis.error)
 
             self.memory.add_memory(
                 memory_type="analysis",
                 content=analysis,
-                metadata={"type": "growth_patterns", "reflection_count": len(reflections)}
+                metadata={
+                    "type": "growth_patterns",
+                    "reflection_count": reflection_count,
+                    "new_reflections": len(new_reflections),
+                    "trend": trend,
+                }
             )
 
+            state.update(folded)
+            state['position'] = position
+            state['summary'] = analysis
             return analysis
 
         except Exception as e:
             logger.error(f"[{self.agent_name}] Failed to analyze growth patterns: {e}")
-            return f"Analysis of {len(reflections)} reflections shows ongoing development in my role as {self.role}."
+            return f"Analysis of {reflection_count} reflections shows ongoing development in my role as {self.role}."
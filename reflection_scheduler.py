@@ -0,0 +1,230 @@
+"""
+Reflection Scheduler for AI Agents
+Scores experiences cheaply and only runs an LLM reflection once enough has happened.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+
+_WORD = re.compile(r"[a-z']{3,}")
+
+
+def _terms(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+class ReflectionScheduler:
+    """Batches an agent's experiences into occasional reflections.
+
+    Each experience gets a cheap importance score:
+
+    - novelty: 1 - the highest word-overlap (Jaccard) with recent memories
+      and already pending experiences
+    - mention: the experience names the agent
+    - severity: the constitution's keyword check rates it high severity
+      (never the LLM tier of a ConstitutionJudge, so scoring stays free)
+
+    Scores accumulate, and once they reach `threshold` (or experiences have
+    waited `max_wait_ticks`) all pending experiences go into one
+    `Reflector.reflect_on_experience` call.
+
+    The scheduler can stand in for a Reflector: `reflect_on_experience`,
+    `reflect_on_interaction` and `reflect_on_constitution` have the same
+    signatures, and everything else is forwarded to the wrapped reflector.
+    When a call does not trigger a reflection it returns an empty string,
+    so callers have nothing new to post.
+    """
+
+    def __init__(self, reflector, constitution=None, threshold: float = 1.5, max_batch: int = 5,
+                 max_wait_ticks: int = 10, novelty_window: int = 20, novelty_weight: float = 1.0,
+                 mention_weight: float = 1.0, severity_weight: float = 2.0):
+        """Initialize the scheduler.
+
+        Args:
+            reflector: Reflector of the agent
+            constitution: Optional Constitution (or ConstitutionJudge) whose keywords rate severity
+            threshold: Accumulated score that triggers a reflection (default: 1.5)
+            max_batch: Most experiences folded into one reflection (default: 5)
+            max_wait_ticks: Ticks after which pending experiences are reflected on anyway (default: 10)
+            novelty_window: Recent memories compared for novelty (default: 20)
+            novelty_weight: Weight of the novelty score (default: 1.0)
+            mention_weight: Score added when the agent is mentioned (default: 1.0)
+            severity_weight: Score added for high-severity actions (default: 2.0)
+        """
+        self.reflector = reflector
+        self.constitution = constitution
+        self.threshold = threshold
+        self.max_batch = max_batch
+        self.max_wait_ticks = max_wait_ticks
+        self.novelty_window = novelty_window
+        self.novelty_weight = novelty_weight
+        self.mention_weight = mention_weight
+        self.severity_weight = severity_weight
+
+        self.pending: List[Tuple[str, str, float]] = []
+        self.pending_score = 0.0
+        self.ticks_waiting = 0
+
+        self.experiences_seen = 0
+        self.reflections_run = 0
+        self.experiences_dropped = 0
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'reflector':
+            raise AttributeError(name)
+        return getattr(self.reflector, name)
+
+    def score(self, experience: str, severity: Optional[str] = None) -> float:
+        """Score how much an experience deserves reflection.
+
+        Args:
+            experience: Description of the experience
+            severity: Constitution severity if already known
+
+        Returns:
+            Importance score
+        """
+        terms = _terms(experience)
+        overlap = 0.0
+        if terms:
+            recent = self.reflector.memory.get_recent_memories(n=self.novelty_window)
+            for text in [m['content'] for m in recent] + [e for e, _, _ in self.pending]:
+                other = _terms(text)
+                if other:
+                    overlap = max(overlap, len(terms & other) / len(terms | other))
+        score = self.novelty_weight * (1.0 - overlap)
+
+        if self.reflector.agent_name.lower() in experience.lower():
+            score += self.mention_weight
+
+        if severity is None and self.constitution is not None:
+            # The keyword heuristic only: a judge's LLM tier would cost a call per experience
+            keywords = getattr(self.constitution, 'constitution', self.constitution)
+            severity = keywords.validate_action(experience, self.reflector.role)['severity']
+        if severity == 'high':
+            score += self.severity_weight
+
+        return score
+
+    def observe(self, experience: str, context: str = "", severity: Optional[str] = None) -> float:
+        """Queue an experience and add its score to the pending total.
+
+        Args:
+            experience: Description of the experience
+            context: Additional context
+            severity: Constitution severity if already known
+
+        Returns:
+            The experience's score
+        """
+        score = self.score(experience, severity)
+        self.pending.append((experience, context, score))
+        self.pending_score += score
+        self.experiences_seen += 1
+        return score
+
+    def tick(self) -> Optional[str]:
+        """Advance one tick, reflecting if pending experiences have waited too long.
+
+        Returns:
+            The new reflection, or None if none was generated
+        """
+        if not self.pending:
+            return None
+        self.ticks_waiting += 1
+        if self.ticks_waiting >= self.max_wait_ticks:
+            return self.flush()
+        return None
+
+    def maybe_reflect(self) -> Optional[str]:
+        """Reflect if the pending score or batch size is high enough.
+
+        Returns:
+            The new reflection, or None if none was generated
+        """
+        if self.pending and (self.pending_score >= self.threshold or len(self.pending) >= self.max_batch):
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[str]:
+        """Reflect on all pending experiences in one LLM call.
+
+        Returns:
+            The new reflection, or None if nothing was pending
+        """
+        if not self.pending:
+            return None
+
+        batch = sorted(self.pending, key=lambda item: item[2], reverse=True)[:self.max_batch]
+        self.experiences_dropped += len(self.pending) - len(batch)
+        self.pending, self.pending_score, self.ticks_waiting = [], 0.0, 0
+
+        if len(batch) == 1:
+            experience, context, _ = batch[0]
+        else:
+            experience = "Several experiences since my last reflection:\n" + "\n".join(f"- {e}" for e, _, _ in batch)
+            context = "; ".join(c for _, c, _ in batch if c)
+
+        self.reflections_run += 1
+        return self.reflector.reflect_on_experience(experience, context)
+
+    def reflect_on_experience(self, experience: str, context: str = "") -> str:
+        """Queue an experience and reflect if warranted (Reflector-compatible).
+
+        Returns:
+            The new reflection, or "" if none was triggered
+        """
+        self.observe(experience, context)
+        reflection = self.maybe_reflect()
+        if reflection is None:
+            logger.debug(f"[{self.reflector.agent_name}] Deferred reflection on: {experience[:50]}...")
+            return ""
+        return reflection
+
+    def reflect_on_interaction(self, interaction: str, other_agent: str = "") -> str:
+        """Queue an interaction and reflect if warranted (Reflector-compatible)."""
+        context = f"Interaction with {other_agent}" if other_agent else "General interaction"
+        return self.reflect_on_experience(f"Interacted with {other_agent}: {interaction}", context)
+
+    def reflect_on_constitution(self, action: str, constitution_feedback: Dict[str, str]) -> str:
+        """Queue a constitutional check and reflect if warranted (Reflector-compatible)."""
+        self.observe(f"Considering action: {action}",
+                     f"Constitution feedback: {constitution_feedback['reason']}",
+                     severity=constitution_feedback.get('severity'))
+        reflection = self.maybe_reflect()
+        return "" if reflection is None else reflection
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """Pending experiences and counters, for checkpoints."""
+        return {
+            'pending': list(self.pending),
+            'pending_score': self.pending_score,
+            'ticks_waiting': self.ticks_waiting,
+            'counters': (self.experiences_seen, self.reflections_run, self.experiences_dropped),
+        }
+
+    def restore_checkpoint_state(self, state: Dict[str, Any]) -> None:
+        """Restore a checkpointed state."""
+        self.pending = list(state['pending'])
+        self.pending_score = state['pending_score']
+        self.ticks_waiting = state['ticks_waiting']
+        self.experiences_seen, self.reflections_run, self.experiences_dropped = state['counters']
+
+    @property
+    def skip_ratio(self) -> float:
+        """Fraction of experiences that did not get an LLM reflection of their own."""
+        if not self.experiences_seen:
+            return 0.0
+        return 1.0 - self.reflections_run / self.experiences_seen
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduling statistics."""
+        return {
+            'experiences_seen': self.experiences_seen,
+            'reflections_run': self.reflections_run,
+            'experiences_dropped': self.experiences_dropped,
+            'pending': len(self.pending),
+            'skip_ratio': round(self.skip_ratio, 3),
+        }
@@ -3,8 +3,12 @@ AI Commune – Phase 2 Simulation
 Run: python commune_runner.py
 """
 
+import json
 import sys
 import time
+import random
+import argparse
+from datetime import datetime
 from pathlib import Path
 from loguru import logger
 
@@ -14,8 +18,21 @@ sys.path.insert(0, str(Path(__file__).parent))
 from agents.agent import Agent
 from agents.memory import SimpleMemory
 from agents.constitution import Constitution
+from agents.constitution_judge import ConstitutionJudge
 from agents.reflection import Reflector
-from world.message_bus import MessageBus
+from agents.reflection_scheduler import ReflectionScheduler
+from agents.checkpoint import SimulationCheckpointer
+from agents.activation import POLICIES, ActivationScheduler
+from agents.branching import after_fork, apply_variant, exit_branch, fork_branches, load_variants, override_temperature
+from agents.memory_archive import load_archive
+from agents.message_bus import DEFAULT_CAPACITY, RingMessageBus
+from agents.message_router import MessageRouter
+from agents.metrics_ring import MetricsPublisher, MetricsRing
+from agents.profiler import PhaseProfiler
+from agents.llm_replay import RecordingClient, ReplayClient
+from agents.worker_pool import WorkerPoolClient
+from agents.inference_server import InferenceServerClient
+from agents.llm_resilience import ResilientClient
 from world.scheduler import Scheduler
 from llm.ollama_client import OllamaClient
 
@@ -38,30 +55,175 @@ def setup_logging():
     )
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments for the simulation."""
+    parser = argparse.ArgumentParser(description="Run the AI Commune simulation.")
+    parser.add_argument("--ticks", type=int, default=100, help="Number of ticks to run (default: 100)")
+    parser.add_argument("--tick-delay", type=float, help="Seconds between ticks (default: 2, or 0 when replaying)")
+    parser.add_argument("--seed", type=int, help="Seed for the random module, for reproducible runs")
+    parser.add_argument("--checkpoint", help="Checkpoint file to write (default: data/checkpoints/commune_<time>.ckpt)")
+    parser.add_argument("--checkpoint-every", type=int,
+                        help="Ticks between checkpoints (default: 1, or 10 with an --activation policy other than all)")
+    parser.add_argument("--resume", metavar="CHECKPOINT", help="Resume from the last completed tick of a checkpoint")
+    llm_mode = parser.add_mutually_exclusive_group()
+    llm_mode.add_argument("--record", metavar="ARCHIVE", help="Record every LLM request/response to an archive")
+    llm_mode.add_argument("--replay", metavar="ARCHIVE", help="Serve LLM responses from a recorded archive, no model needed")
+    parser.add_argument("--workers", type=int, help="Run local Hugging Face inference in this many worker processes")
+    parser.add_argument("--threads-per-worker", type=int, default=2, help="Torch threads per worker process (default: 2)")
+    parser.add_argument("--hf-model", default="distilgpt2", help="Hugging Face model for --workers (default: distilgpt2)")
+    parser.add_argument("--llm-deadline", type=float, default=60, help="Seconds allowed per LLM call (default: 60)")
+    parser.add_argument("--llm-retries", type=int, default=1, help="Retries per LLM call within the deadline (default: 1)")
+    parser.add_argument("--hedge-after", type=float, help="Send a duplicate LLM request after this many seconds")
+    parser.add_argument("--reflect-threshold", type=float,
+                        help="Only reflect once accumulated experience importance reaches this score")
+    parser.add_argument("--inference-server", metavar="ADDRESS",
+                        help="Use a shared inference server (http://host:port or unix:///path.sock)")
+    parser.add_argument("--roster-size", type=int, default=10,
+                        help="Number of agents; the ten roles are repeated beyond ten (default: 10)")
+    parser.add_argument("--activation", choices=POLICIES, default="all",
+                        help="Which agents act each tick (default: all)")
+    parser.add_argument("--active-per-tick", type=int, default=10,
+                        help="Agents activated per tick by round_robin, priority and poisson (default: 10)")
+    parser.add_argument("--dormant-after", type=int, default=5,
+                        help="Idle ticks before an agent's memory is compacted (default: 5)")
+    parser.add_argument("--import-memories", metavar="ARCHIVE",
+                        help="Preload agent memories from an archive written by `commune_cli.py export`")
+    parser.add_argument("--bus-capacity", type=int, default=DEFAULT_CAPACITY,
+                        help=f"Messages kept in memory; older ones go to the bus archive (default: {DEFAULT_CAPACITY})")
+    parser.add_argument("--dedup", type=float, metavar="THRESHOLD",
+                        help="Collapse messages and memories at least this similar (0-1) to an earlier one")
+    parser.add_argument("--judge-constitution", action="store_true",
+                        help="Judge ambiguous actions against the constitution with the LLM (cached, batched)")
+    parser.add_argument("--defer-judge", action="store_true",
+                        help="With --judge-constitution: answer ambiguous actions with the keyword heuristic and "
+                             "judge them in one batch at the end of the tick, for repeats to use")
+    parser.add_argument("--fork-at", type=int, metavar="TICK",
+                        help="After this tick, fork one branch process per variant of --branches")
+    parser.add_argument("--branches", metavar="VARIANTS_JSON",
+                        help="Branch variants: {name: {seed, temperature, concerning_keywords, positive_keywords, roster}}")
+    parser.add_argument("--branch-dir", default="data/branches",
+                        help="Directory for the branches' output directories (default: data/branches)")
+    parser.add_argument("--branch-parallel", type=int, help="Branches running at once (default: all)")
+    parser.add_argument("--model", default="llama3.2:3b", help="Ollama model to use (default: llama3.2:3b)")
+    parser.add_argument("--temperature", type=float, help="Sampling temperature for every LLM call")
+    parser.add_argument("--roster", help="Comma-separated agent names from the ten-agent roster (overrides --roster-size)")
+    parser.add_argument("--monitor", action="store_true",
+                        help="Publish per-tick and per-agent counters to shared memory for `commune_cli.py monitor`")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each tick's phases; write per-tick collapsed stacks and a phase summary")
+    parser.add_argument("--profile-hz", type=float, metavar="HZ",
+                        help="With --profile, also sample the main thread's stack this many times a second")
+    parser.add_argument("--profile-dir", help="Output directory for --profile (default: data/profile/<time>)")
+    parser.add_argument("--metrics", metavar="FILE", help="Write the end-of-run statistics to this JSON file")
+    parser.add_argument("--route", action="store_true",
+                        help="Deliver messages only to addressees, role matches or the most relevant agents")
+    parser.add_argument("--top-k", type=int, default=3,
+                        help="Agents a message goes to when it names no agent or role (default: 3)")
+    parser.add_argument("--reply-budget", type=int,
+                        help="Messages delivered per tick with --route (default: --active-per-tick)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main simulation loop."""
+    args = parse_args(argv)
     setup_logging()
+    variants = load_variants(args.branches) if args.fork_at is not None and args.branches else None
+    if args.resume and not Path(args.resume).is_file():
+        logger.error(f"❌ No checkpoint to resume from at {args.resume}")
+        return
+    if args.fork_at is not None and not variants:
+        logger.error("❌ --fork-at needs --branches with at least one variant")
+        return
+    if args.route and args.activation == "all":
+        # Routed messages only decide who acts when agents are activated by their inbox
+        args.activation = "priority"
+        logger.info("📬 --route uses the priority activation policy")
+    if args.checkpoint_every is None:
+        # Every frame still visits each slot's activation state, though few agents act per tick
+        args.checkpoint_every = 1 if args.activation == "all" else 10
 
     logger.info("=" * 70)
     logger.info("🌍 AI COMMUNE — Phase 2 Simulation: Society of Ten Minds")
     logger.info("=" * 70)
 
+    if args.seed is not None:
+        random.seed(args.seed)
+
     # Initialize LLM client
-    try:
-        llm_client = OllamaClient(model="llama3.2:3b")
+    if args.replay:
+        llm_client = ReplayClient(args.replay)
+        logger.info(f"⏯️  Replaying model: {llm_client.model}")
+    elif args.workers:
+        llm_client = WorkerPoolClient(
+            model_name=args.hf_model,
+            num_workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            request_timeout=args.llm_deadline,
+        )
         logger.info(f"✅ Using model: {llm_client.model}")
+    elif args.inference_server:
+        llm_client = InferenceServerClient(args.inference_server, timeout=args.llm_deadline * 0.9)
+        logger.info(f"✅ Using model: {llm_client.model} via {args.inference_server}")
+    else:
+        try:
+            llm_client = OllamaClient(model=args.model)
+            logger.info(f"✅ Using model: {llm_client.model}")
+
+            models = llm_client.list_models()
+            if models:
+                logger.info(f"🧠 Available models: {', '.join(models[:5])}")
+        except Exception as e:
+            logger.error(f"Failed to initialize Ollama: {e}")
+            logger.error("Make sure Ollama is running: `ollama serve`")
+            return
+
+    if not args.replay:
+        llm_client = ResilientClient(
+            llm_client,
+            deadline=args.llm_deadline,
+            retries=args.llm_retries,
+            hedge_after=args.hedge_after,
+        )
 
-        models = llm_client.list_models()
-        if models:
-            logger.info(f"🧠 Available models: {', '.join(models[:5])}")
-    except Exception as e:
-        logger.error(f"Failed to initialize Ollama: {e}")
-        logger.error("Make sure Ollama is running: `ollama serve`")
-        return
+    if args.record:
+        # Outside the resilience layer: one record per answer the simulation got, not per
+        # attempt, so hedged and retried calls replay in the order they were consumed
+        llm_client = RecordingClient(llm_client, args.record)
+
+    if args.temperature is not None:
+        override_temperature(llm_client, args.temperature)
+
+    publisher = None
+    if args.monitor:
+        ring = MetricsRing.create()
+        ring.write_pointer()
+        publisher = MetricsPublisher(ring)
+        llm_client = publisher.client(llm_client)
+        logger.info(f"📟 Publishing live metrics to shared memory {ring.name}")
+
+    profiler = None
+    if args.profile:
+        profiler = PhaseProfiler(
+            args.profile_dir or f"data/profile/{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}",
+            sample_hz=args.profile_hz,
+        )
+        profiler.instrument(llm_client, "respond", "generate")
+        logger.info(f"⏱️  Profiling phases into {profiler.output_dir}"
+                    + (f", sampling stacks at {args.profile_hz:g} Hz" if args.profile_hz else ""))
 
     # Initialize shared systems
-    message_bus = MessageBus()
+    message_bus = RingMessageBus(
+        capacity=args.bus_capacity,
+        archive_path=f"data/logs/message_archive_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.jsonl",
+        dedup_threshold=args.dedup,
+    )
+    if profiler is not None:
+        profiler.instrument(message_bus, "perceive", "get_history")
+        profiler.instrument(message_bus, "post", "post")
     constitution = Constitution()
+    if args.judge_constitution:
+        constitution = ConstitutionJudge(constitution, llm_client, defer=args.defer_judge)
 
     logger.info("\n📜 Commune Constitution:")
     logger.info(constitution.get_constitution_text())
@@ -80,54 +242,219 @@ def main():
         {"name": "Atlas", "role": "Mediator"},
     ]
 
-    agents = []
-
-    for config in agent_configs:
-        name = config["name"]
-        role = config["role"]
+    reflection_schedulers = []
+    # Created once the roster is set up; agents built later register their state with it
+    checkpointer = None
 
-        memory = SimpleMemory(agent_name=name)
+    def make_agent(slot):
+        """Build an agent when it is first activated."""
         reflector = Reflector(
-            agent_name=name,
-            role=role,
-            memory=memory,
-            client=llm_client,
+            agent_name=slot.name,
+            role=slot.role,
+            memory=slot.memory,
+            client=publisher.client(llm_client, slot.name) if publisher is not None else llm_client,
         )
-
-        agent = Agent(
-            name=name,
-            role=role,
+        if args.reflect_threshold is not None:
+            reflector = ReflectionScheduler(reflector, constitution, threshold=args.reflect_threshold)
+            reflection_schedulers.append(reflector)
+            if checkpointer is not None:
+                checkpointer.attach(f"reflection:{slot.name}", reflector)
+        if profiler is not None:
+            profiler.instrument(reflector, "reflect",
+                                "reflect_on_experience", "reflect_on_interaction", "reflect_on_constitution")
+            if args.reflect_threshold is not None:
+                profiler.instrument(reflector, "reflect", "tick")
+
+        return Agent(
+            name=slot.name,
+            role=slot.role,
             model=llm_client.model,
-            memory=memory,
+            memory=slot.memory,
             constitution=constitution,
             reflector=reflector,
         )
 
-        agents.append(agent)
+    activation = ActivationScheduler(
+        make_agent,
+        policy=args.activation,
+        active_per_tick=args.active_per_tick,
+        dormant_after=args.dormant_after,
+        seed=args.seed,
+    )
+    roster_size = args.roster_size
+    if args.roster:
+        names = {name.strip() for name in args.roster.split(",")}
+        agent_configs = [config for config in agent_configs if config["name"] in names]
+        if not agent_configs:
+            logger.error(f"❌ No agents of the roster match --roster {args.roster}")
+            if publisher is not None:
+                publisher.close()
+            return
+        roster_size = len(agent_configs)
+
+    for i in range(roster_size):
+        config = agent_configs[i % len(agent_configs)]
+        name = config["name"] if i < len(agent_configs) else f"{config['name']}-{i // len(agent_configs) + 1}"
+        memory = SimpleMemory(agent_name=name, dedup_threshold=args.dedup)
+        if profiler is not None:
+            profiler.instrument(memory, "perceive", "get_recent_memories", "get_memories_since", "get_memories_by_type")
+            profiler.instrument(memory, "persist", "add_memory")
+        activation.add(name, config["role"], memory)
+
+    # With every agent active each tick, build them all up front as before
+    agents = []
+    if args.activation == "all":
+        for slot in activation.slots.values():
+            slot.agent = make_agent(slot)
+            agents.append(slot.agent)
+
+    router = None
+    if args.route:
+        router = MessageRouter(
+            message_bus,
+            top_k=args.top_k,
+            reply_budget=args.reply_budget if args.reply_budget is not None else args.active_per_tick,
+        )
+        for slot in activation.slots.values():
+            router.add(slot.name, slot.role)
 
     # Initialize scheduler
     scheduler = Scheduler(agents=agents, message_bus=message_bus)
 
-    # Welcome message
-    message_bus.post(
-        "Welcome to Phase 2 of the AI Commune. "
-        "Ten unique minds now share this digital habitat. "
-        "Collaborate, question, and grow together.",
-        sender="Commune",
+    def attach_components(checkpointer):
+        """Register the state kept outside memories, bus and board with a checkpointer."""
+        checkpointer.attach("activation", activation)
+        if router is not None:
+            checkpointer.attach("router", router)
+        for reflection_scheduler in reflection_schedulers:
+            checkpointer.attach(f"reflection:{reflection_scheduler.agent_name}", reflection_scheduler)
+
+    # Checkpointing
+    checkpoint_path = args.resume or args.checkpoint or (
+        f"data/checkpoints/commune_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.ckpt"
+    )
+    checkpointer = SimulationCheckpointer(
+        checkpoint_path,
+        memories={slot.name: slot.memory for slot in activation.slots.values()},
+        message_bus=message_bus,
+        scheduler=scheduler,
+        every=args.checkpoint_every,
     )
+    attach_components(checkpointer)
+    if profiler is not None:
+        profiler.instrument(checkpointer, "persist", "maybe_checkpoint")
+
+    start_tick = 1
+    if args.resume:
+        try:
+            start_tick = checkpointer.restore() + 1
+        except (OSError, ValueError) as e:
+            logger.error(f"❌ Cannot resume from {args.resume}: {e}")
+            message_bus.close()
+            if publisher is not None:
+                publisher.close()
+            return
+        logger.info(f"♻️  Resuming from tick {start_tick}")
+    else:
+        if args.import_memories:
+            load_archive(args.import_memories, {slot.name: slot.memory for slot in activation.slots.values()})
+
+        # Welcome message
+        message_bus.post(
+            "Welcome to Phase 2 of the AI Commune. "
+            "Ten unique minds now share this digital habitat. "
+            "Collaborate, question, and grow together.",
+            sender="Commune",
+        )
 
-    logger.info(f"\n🚀 Starting simulation with {len(agents)} agents...\n")
+    logger.info(f"\n🚀 Starting simulation with {roster_size} agents ({args.activation} activation)...\n")
+    logger.info(f"💾 Checkpointing to {checkpoint_path} every {checkpointer.every} tick(s)")
+    if router is None:
+        message_bus.register("activation")
+    elif args.resume:
+        # Restored messages were already routed before the restart
+        message_bus.register(router.reader)
 
     # --- Main Simulation Loop ---
-    num_ticks = 100  # ⏱️ 100 ticks for Phase 2
-    tick_delay = 2   # seconds between ticks
-
+    num_ticks = args.ticks  # ⏱️ 100 ticks for Phase 2
+    tick_delay = args.tick_delay  # seconds between ticks
+    if tick_delay is None:
+        tick_delay = 0 if args.replay else 2
+
+    branch = None
+    branch_exit = 0
+    forked = False
+    run_started = time.perf_counter()
+    posts_seq = message_bus.next_seq
     try:
-        for tick in range(1, num_ticks + 1):
+        for tick in range(start_tick, num_ticks + 1):
             logger.info(f"\n--- 🕒 TICK {tick}/{num_ticks} ---")
+            tick_started = time.perf_counter()
+            if profiler is not None:
+                profiler.start_tick()
+            if args.activation != "all":
+                scheduler.agents = activation.select(tick)
             scheduler.tick()
+            if router is not None:
+                for name, count in router.deliver().items():
+                    activation.notify(name, count)
+            else:
+                activation.observe_messages(message_bus.fetch("activation"))
+            for reflection_scheduler in reflection_schedulers:
+                reflection_scheduler.tick()
+            if args.defer_judge and args.judge_constitution:
+                constitution.flush()
+            checkpointer.maybe_checkpoint(tick)
+
+            if publisher is not None:
+                posts = {}
+                for msg in message_bus.read_since(posts_seq):
+                    posts[msg['sender']] = posts.get(msg['sender'], 0) + 1
+                posts_seq = message_bus.next_seq
+                acted = {agent.name for agent in scheduler.agents}
+                publisher.publish(tick, {
+                    name: (len(activation.slots[name].memory), posts.get(name, 0), name in acted)
+                    for name in publisher.agents_to_publish(acted | posts.keys(), activation.slots)
+                }, (time.perf_counter() - tick_started) * 1000)
+            if profiler is not None:
+                profiler.end_tick(tick)
+
+            if tick == args.fork_at:
+                # Finish writing this process's checkpoints and archive before sharing the state
+                checkpointer.close()
+                message_bus.flush()
+                branch = fork_branches(variants, args.branch_dir, args.branch_parallel)
+                if branch is None:
+                    forked = True
+                    break
+
+                # In a branch: own logs, archive and checkpoints in the branch directory
+                setup_logging()
+                logger.info(f"🌿 Branch {branch.name} continues from tick {tick}: {branch.variant}")
+                after_fork(llm_client)
+                message_bus.after_fork(f"data/logs/message_archive_{branch.name}.jsonl")
+                if publisher is not None:
+                    publisher.after_fork()
+                apply_variant(branch.variant, client=llm_client, constitution=constitution,
+                              activation=activation, scheduler=scheduler)
+                checkpointer = SimulationCheckpointer(
+                    f"data/checkpoints/{branch.name}.ckpt",
+                    memories={slot.name: slot.memory for slot in activation.slots.values()},
+                    message_bus=message_bus,
+                    scheduler=scheduler,
+                    every=args.checkpoint_every,
+                )
+                attach_components(checkpointer)
+                if profiler is not None:
+                    profiler.after_fork()
+                    profiler.instrument(checkpointer, "persist", "maybe_checkpoint")
+
             time.sleep(tick_delay)
 
+        if forked:
+            logger.info(f"🌿 All branches finished; results in {args.branch_dir}/branches.json")
+            return
+
         # --- End of Simulation Summary ---
         logger.info("\n" + "=" * 70)
         logger.info("🏁 SIMULATION COMPLETE — PHASE 2 SUMMARY")
@@ -137,9 +464,22 @@ def main():
         logger.info("\n📊 Simulation Statistics:")
         for key, value in stats.items():
             logger.info(f"  {key}: {value}")
+        if args.activation != "all":
+            logger.info(f"  activation: {activation.get_stats()}")
+        logger.info(f"  message bus: {message_bus.get_stats()}")
+        if router is not None:
+            logger.info(f"  routing: {router.get_stats()}")
+        if args.judge_constitution:
+            logger.info(f"  constitution checks: {constitution.get_stats()}")
+
+        if reflection_schedulers:
+            seen = sum(s.experiences_seen for s in reflection_schedulers)
+            run_count = sum(s.reflections_run for s in reflection_schedulers)
+            logger.info(f"  reflection skip ratio: {1 - run_count / seen if seen else 0.0:.2f} "
+                        f"({run_count} reflections for {seen} experiences)")
 
         logger.info("\n🧠 Agent Summaries:")
-        for agent in agents:
+        for agent in activation.wake_all():
             logger.info(f"\n{agent.get_summary()}")
             logger.info(f"Memory Stats: {agent.memory.get_stats()}")
 
@@ -147,15 +487,53 @@ def main():
         for msg in message_bus.get_history(n=10):
             logger.info(f"  [{msg['sender']}] {msg['message'][:100]}...")
 
+        if args.metrics:
+            metrics = {
+                'first_tick': start_tick,
+                'ticks': num_ticks - start_tick + 1,
+                'elapsed_seconds': round(time.perf_counter() - run_started, 3),
+                'agents': len(activation.slots),
+                'memories': sum(len(slot.memory) for slot in activation.slots.values()),
+                'scheduler': stats,
+                'message_bus': message_bus.get_stats(),
+                'llm': dict(getattr(llm_client, 'stats', {})),
+            }
+            if args.activation != "all":
+                metrics['activation'] = activation.get_stats()
+            if router is not None:
+                metrics['routing'] = router.get_stats()
+            if args.judge_constitution:
+                metrics['constitution'] = constitution.get_stats()
+            if profiler is not None:
+                metrics['profile'] = {row['phase']: round(row['inclusive'], 4) for row in profiler.summary()}
+            with open(args.metrics, 'w') as f:
+                json.dump(metrics, f, indent=2, default=str)
+            logger.info(f"📈 Metrics written to {args.metrics}")
+
     except KeyboardInterrupt:
         logger.warning("\n⚠️  Simulation interrupted by user")
+        branch_exit = 130
     except Exception as e:
         logger.error(f"❌ Simulation error: {e}")
         import traceback
 
         traceback.print_exc()
+        branch_exit = 1
     finally:
+        checkpointer.close()
+        message_bus.close()
+        if publisher is not None:
+            publisher.close()
+        if profiler is not None:
+            profiler.close()
+            if profiler.tick_seconds:
+                logger.info(f"\n⏱️  Phase Profile:\n{profiler.format_summary()}")
+                logger.info(f"⏱️  Phase summary and per-tick collapsed stacks in {profiler.write_summary().parent}")
+        if hasattr(llm_client, "close"):
+            llm_client.close()
         logger.info("\n🏁 AI Commune shutting down gracefully...")
+        if branch is not None:
+            exit_branch(branch_exit)
 
 
 if __name__ == "__main__":
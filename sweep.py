@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Parameter Sweep Runner for AI Commune
+Runs a grid of simulation configurations in parallel, shares Hugging Face model weights between runs through inference servers, and collects every run's metrics into one table.
+Usage: python sweep.py sweep.yaml [--max-parallel N] [--dry-run]
+"""
+
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from loguru import logger
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+RUN_SCRIPT = Path(__file__).parent / "run.py"
+
+# Assumed memory per run when the spec does not say (MB)
+DEFAULT_MEMORY_PER_RUN_MB = 512
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """Read a sweep spec (YAML, or JSON if PyYAML is not installed).
+
+    Keys:
+        output: Directory for the run directories and results (default: data/sweeps/<spec name>)
+        base: run.py options shared by every run, e.g. {ticks: 20, tick_delay: 0}
+        grid: run.py options mapped to the values to sweep, e.g. {temperature: [0.3, 0.7]}
+        repeats: Runs per grid point, with seeds 0..repeats-1 unless the grid sets seed (default: 1)
+        memory_per_run_mb: Memory one run needs, used to size the pool (default: 512)
+
+    Options are run.py flags without the dashes (tick_delay for --tick-delay). `true`
+    passes a bare flag; `null` or `false` leaves the option out. Runs that set
+    hf_model share one inference server per model instead of loading it each.
+    """
+    with open(path, 'r') as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError("PyYAML is required for YAML specs; use a .json spec instead")
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    spec.setdefault('output', str(Path("data/sweeps") / Path(path).stem))
+    spec.setdefault('base', {})
+    spec.setdefault('grid', {})
+    spec.setdefault('repeats', 1)
+    return spec
+
+
+def expand_grid(spec: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """List (run id, options) for every grid point and repeat.
+
+    Run ids are derived from the options, so the same spec always maps a
+    configuration to the same run directory, which is what makes a sweep
+    resumable.
+    """
+    grid = spec['grid']
+    keys = list(grid)
+    runs = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        point = dict(zip(keys, values))
+        for repeat in range(spec['repeats']):
+            options = {**spec['base'], **point}
+            if spec['repeats'] > 1 and 'seed' not in point:
+                options['seed'] = repeat
+            digest = hashlib.sha1(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()[:10]
+            runs.append((f"run-{digest}", options))
+    return runs
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memory available for new processes, if the platform tells."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def pool_size(runs: int, memory_per_run_mb: int, max_parallel: Optional[int] = None) -> int:
+    """Runs to execute at once: bounded by cores, available memory and `max_parallel`."""
+    size = min(runs, os.cpu_count() or 1)
+    memory = available_memory_mb()
+    if memory is not None:
+        size = min(size, max(1, memory // max(1, memory_per_run_mb)))
+    if max_parallel:
+        size = min(size, max_parallel)
+    return max(1, size)
+
+
+def command_line(options: Dict[str, Any]) -> List[str]:
+    """Translate options into run.py arguments."""
+    args = []
+    for key, value in options.items():
+        if value is None or value is False:
+            continue
+        flag = "--" + key.replace("_", "-")
+        if value is True:
+            args.append(flag)
+        elif isinstance(value, (list, tuple)):
+            args += [flag, ",".join(str(item) for item in value)]
+        else:
+            args += [flag, str(value)]
+    return args
+
+
+class ModelServers:
+    """One inference server per Hugging Face model, shared by every run that uses it.
+
+    Runs ask for addresses from several threads at once; a lock per model makes
+    the first one start the server and the others wait until it is ready.
+    """
+
+    def __init__(self, directory: Path, startup_timeout: float = 300.0):
+        self.directory = directory
+        self.startup_timeout = startup_timeout
+        self.servers: Dict[str, Tuple[subprocess.Popen, str]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def address(self, model: str) -> str:
+        """Start the server for a model if needed and return its address once it is ready."""
+        with self._lock:
+            lock = self._locks.setdefault(model, threading.Lock())
+        with lock:
+            if model not in self.servers:
+                self._start(model)
+            return self.servers[model][1]
+
+    def _start(self, model: str) -> None:
+        """Start a model's server and wait for its socket (called with the model's lock held)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        slug = "".join(c if c.isalnum() else "_" for c in model)
+        socket_path = self.directory / f"{slug}.sock"
+        socket_path.unlink(missing_ok=True)
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [str(Path(__file__).parent.parent), str(Path(__file__).parent), env.get('PYTHONPATH', '')]
+        )
+        log = open(self.directory / f"{slug}.log", 'w')
+        process = subprocess.Popen(
+            [sys.executable, "-m", "agents.inference_server", "--model", model, "--socket", str(socket_path)],
+            stdout=log, stderr=subprocess.STDOUT, env=env,
+        )
+        logger.info(f"🛰️  Starting shared inference server for {model}")
+
+        deadline = time.monotonic() + self.startup_timeout
+        while not socket_path.exists():
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                process.wait()
+                raise RuntimeError(f"Inference server for {model} did not start; see {log.name}")
+            time.sleep(0.5)
+        # Published only once ready: a failed start is retried by the next run that needs the model
+        self.servers[model] = (process, f"unix://{socket_path}")
+
+    def close(self) -> None:
+        """Stop every server."""
+        for process, _ in self.servers.values():
+            process.terminate()
+        for process, _ in self.servers.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run_one(run_id: str, options: Dict[str, Any], output: Path, servers: Optional[ModelServers]) -> Dict[str, Any]:
+    """Run one configuration in its own directory, resuming its checkpoint after a failure.
+
+    A configuration that already finished (rerun) starts over from scratch. The
+    metrics of a resumed run only count the ticks it ran after the failure, so
+    they are marked partial.
+
+    Returns:
+        Status with the run id, state ('done' or 'failed'), exit code, seconds taken and
+        whether it resumed a checkpoint
+    """
+    run_dir = output / run_id
+    checkpoint = run_dir / "checkpoint.ckpt"
+    status_path = run_dir / "status.json"
+    if status_path.exists() and json.loads(status_path.read_text())['state'] == 'done':
+        # Restoring the final checkpoint would run no ticks: drop it with the run's archives, logs and board
+        checkpoint.unlink(missing_ok=True)
+        shutil.rmtree(run_dir / "data", ignore_errors=True)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "options.json").write_text(json.dumps(options, indent=2, default=str))
+
+    options = dict(options)
+    options.setdefault('tick_delay', 0)
+    if servers is not None and options.get('hf_model') and not options.get('workers'):
+        options['inference_server'] = servers.address(options.pop('hf_model'))
+
+    metrics = run_dir / "metrics.json"
+    metrics.unlink(missing_ok=True)
+    args = command_line(options) + ["--checkpoint", str(checkpoint), "--metrics", str(metrics)]
+    resumed = checkpoint.exists()
+    if resumed:
+        args += ["--resume", str(checkpoint)]
+
+    started = time.perf_counter()
+    with open(run_dir / "run.log", 'a') as log:
+        code = subprocess.call([sys.executable, str(RUN_SCRIPT.resolve())] + args,
+                               cwd=run_dir, stdout=log, stderr=subprocess.STDOUT)
+    state = 'done' if code == 0 and metrics.exists() else 'failed'
+    if state == 'done' and resumed:
+        data = json.loads(metrics.read_text())
+        data['partial'] = True
+        metrics.write_text(json.dumps(data, indent=2))
+    status = {'run': run_id, 'state': state, 'exit_code': code,
+              'seconds': round(time.perf_counter() - started, 1), 'resumed': resumed}
+    status_path.write_text(json.dumps(status, indent=2))
+    logger.info(f"{'✅' if state == 'done' else '❌'} {run_id} {state} in {status['seconds']}s")
+    return status
+
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (bool, int, float, str)) or value is None:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def collect_results(output: Path, runs: List[Tuple[str, Dict[str, Any]]], grid_keys: List[str]) -> Path:
+    """Write one CSV row per run: its grid values, its state and its flattened metrics."""
+    rows = []
+    for run_id, options in runs:
+        run_dir = output / run_id
+        status_path = run_dir / "status.json"
+        status = json.loads(status_path.read_text()) if status_path.exists() else {'state': 'pending'}
+        row = {'run': run_id, 'state': status['state'], 'seconds': status.get('seconds')}
+        row.update({key: options.get(key) for key in grid_keys})
+        if 'seed' in options and 'seed' not in row:
+            row['seed'] = options['seed']
+        metrics_path = run_dir / "metrics.json"
+        if status['state'] == 'done' and metrics_path.exists():
+            row.update(_flatten(json.loads(metrics_path.read_text())))
+        rows.append(row)
+
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    path = output / "results.csv"
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def main():
+    """Run a sweep."""
+    parser = argparse.ArgumentParser(description="Run a grid of AI Commune configurations in parallel.")
+    parser.add_argument("spec", help="Sweep spec (.yaml or .json)")
+    parser.add_argument("--max-parallel", type=int, help="Upper bound on runs at once (default: cores and memory)")
+    parser.add_argument("--rerun", action="store_true", help="Run finished configurations again")
+    parser.add_argument("--dry-run", action="store_true", help="Print the runs without starting them")
+    args = parser.parse_args()
+
+    spec = load_spec(args.spec)
+    output = Path(spec['output'])
+    runs = expand_grid(spec)
+
+    # Resuming: finished runs are skipped (or start over with --rerun), failed ones continue from their checkpoint
+    todo = []
+    for run_id, options in runs:
+        status_path = output / run_id / "status.json"
+        done = status_path.exists() and json.loads(status_path.read_text())['state'] == 'done'
+        if args.rerun or not done:
+            todo.append((run_id, options))
+
+    workers = pool_size(len(todo), spec.get('memory_per_run_mb', DEFAULT_MEMORY_PER_RUN_MB), args.max_parallel)
+    print(f"\n🧪 Sweep {args.spec}: {len(runs)} runs, {len(runs) - len(todo)} already done, "
+          f"{len(todo)} to run on {workers} worker{'s' if workers != 1 else ''}\n")
+    if args.dry_run:
+        for run_id, options in todo:
+            print(f"  {run_id}  run.py {' '.join(command_line(options))}")
+        return
+
+    output.mkdir(parents=True, exist_ok=True)
+    servers = ModelServers(output / ".servers")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = list(executor.map(lambda run: run_one(run[0], run[1], output, servers), todo))
+    finally:
+        servers.close()
+
+    failed = [status['run'] for status in statuses if status['state'] != 'done']
+    results = collect_results(output, runs, list(spec['grid']))
+    print(f"\n📊 Results table: {results}")
+    if failed:
+        print(f"❌ {len(failed)} runs failed: {', '.join(failed)} — run the sweep again to resume them")
+
+
+if __name__ == "__main__":
+    main()
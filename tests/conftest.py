@@ -0,0 +1,8 @@
+"""
+Test configuration: the modules import each other as agents.*, so the directory holding this checkout goes on the path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent.parent))
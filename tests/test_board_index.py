@@ -0,0 +1,37 @@
+"""Keeping the board index in step with the day files."""
+
+from agents import board_index
+from agents.board_index import BoardIndex
+from agents.daily_board import DailyMessageBoard
+
+
+def test_post_after_unindexed_posts_reindexes_the_day(tmp_path):
+    board = DailyMessageBoard(str(tmp_path))
+    board.post_update("Ada", "philosopher", "legacy thoughts on entropy")
+    # Drop the index, as if the earlier post predated it
+    for path in (tmp_path / ".index").iterdir():
+        path.unlink()
+
+    board = DailyMessageBoard(str(tmp_path))
+    board.post_update("Bo", "artist", "a painting about light")
+
+    index = BoardIndex(str(tmp_path))
+    assert [hit['agent_name'] for hit in index.search("entropy")] == ["Ada"]
+    assert [hit['agent_name'] for hit in index.search("painting")] == ["Bo"]
+    assert index.refresh() == 0
+
+
+def test_compaction_drops_superseded_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(board_index, "COMPACT_MIN_LINES", 4)
+    board = DailyMessageBoard(str(tmp_path))
+    for i in range(3):
+        board.post_update("Ada", "philosopher", f"note {i} on entropy")
+    # Edits behind the index's back make refresh append the whole day again
+    for _ in range(2):
+        board.daily_file.write_text(board.daily_file.read_text() + " ")
+        board.index.refresh()
+
+    assert board.index.get_stats()['postings_lines'] == 3
+    index = BoardIndex(str(tmp_path))
+    assert len(index.search("entropy")) == 3
+    assert index.get_stats()['postings_lines'] == 3
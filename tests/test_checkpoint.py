@@ -0,0 +1,42 @@
+"""Checkpoint frames capture the state of their tick."""
+
+import threading
+
+from agents.checkpoint import SimulationCheckpointer
+from agents.memory import SimpleMemory
+
+
+def test_frame_holds_metadata_as_of_its_tick(tmp_path, monkeypatch):
+    memory = SimpleMemory("Ada")
+    memory.add_memory("reflection", "the garden needs water", {'repeats': 1})
+    checkpointer = SimulationCheckpointer(str(tmp_path / "run.ckpt"), {"Ada": memory})
+
+    # Hold the writer back until the simulation has moved on
+    release = threading.Event()
+    write_loop = checkpointer._write_loop
+    monkeypatch.setattr(checkpointer, "_write_loop", lambda: (release.wait(), write_loop()))
+    checkpointer.checkpoint(1)
+    memory.memories[0].metadata['repeats'] = 5
+    release.set()
+    checkpointer.close()
+
+    restored = SimpleMemory("Ada")
+    assert SimulationCheckpointer(str(tmp_path / "run.ckpt"), {"Ada": restored}).restore() == 1
+    assert restored.memories[0].metadata == {'repeats': 1}
+
+
+def test_unchanged_memories_are_left_out_of_frames(tmp_path):
+    busy, idle = SimpleMemory("Ada"), SimpleMemory("Bo")
+    idle.add_memory("observation", "the square is quiet")
+    checkpointer = SimulationCheckpointer(str(tmp_path / "run.ckpt"), {"Ada": busy, "Bo": idle})
+    checkpointer.checkpoint(1)
+    idle.compact()
+    busy.add_memory("reflection", "the garden needs water")
+    checkpointer.checkpoint(2)
+    checkpointer.close()
+
+    assert idle.is_compact
+    memories = {"Ada": SimpleMemory("Ada"), "Bo": SimpleMemory("Bo")}
+    assert SimulationCheckpointer(str(tmp_path / "run.ckpt"), memories).restore() == 2
+    assert [m['content'] for m in memories["Ada"].memories] == ["the garden needs water"]
+    assert [m['content'] for m in memories["Bo"].memories] == ["the square is quiet"]
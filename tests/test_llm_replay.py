@@ -0,0 +1,41 @@
+"""Recording resilient calls and replaying them."""
+
+import threading
+import time
+
+from agents.llm_replay import RecordingClient, ReplayClient
+from agents.llm_resilience import ResilientClient
+
+
+class SlowFirstAttempt:
+    """Answers each call's first attempt late, so the hedged duplicate wins."""
+
+    model = "fake"
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, system_prompt=None, temperature=0.7, max_tokens=150, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call % 2:
+            time.sleep(0.3)
+        return f"{prompt} #{call}"
+
+
+def test_hedged_calls_replay_in_order(tmp_path):
+    base = SlowFirstAttempt()
+    resilient = ResilientClient(base, deadline=5, retries=0, hedge_after=0.05)
+    recorder = RecordingClient(resilient, str(tmp_path / "archive"))
+
+    answers = [recorder.generate("hello") for _ in range(3)]
+    # Let the losing attempts finish in the background
+    time.sleep(0.5)
+    recorder.close()
+
+    assert base.calls == 6
+    replay = ReplayClient(str(tmp_path / "archive"), on_miss="error")
+    assert len(replay._index['order']) == 3
+    assert [replay.generate("hello") for _ in range(3)] == answers
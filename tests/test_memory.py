@@ -0,0 +1,27 @@
+"""Near-duplicate collapsing in agent memory."""
+
+from agents.memory import SimpleMemory
+
+
+def test_duplicates_collapse_after_compact():
+    memory = SimpleMemory("Ada", dedup_threshold=0.8)
+    memory.add_memory("reflection", "I wonder whether the garden needs more water today")
+    memory.compact()
+    memory.add_memory("reflection", "I wonder whether the garden needs more water today")
+
+    assert len(memory) == 1
+    assert memory.duplicates == 1
+    assert memory.memories[0].metadata['repeats'] == 2
+    assert memory.revised == {0}
+
+
+def test_trimmed_original_is_not_collapsed():
+    memory = SimpleMemory("Ada", max_entries=2, dedup_threshold=0.8)
+    memory.add_memory("reflection", "I wonder whether the garden needs more water today")
+    memory.add_memory("reflection", "The library could use a quieter reading corner")
+    memory.add_memory("observation", "Bo painted the east wall a bright shade of orange")
+    memory.add_memory("reflection", "I wonder whether the garden needs more water today")
+
+    assert len(memory) == 2
+    assert memory.duplicates == 0
+    assert memory.memories[-1]['content'] == "I wonder whether the garden needs more water today"
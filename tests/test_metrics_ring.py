@@ -0,0 +1,37 @@
+"""Publishing per-tick metrics to the shared-memory ring."""
+
+from agents.metrics_ring import TICK, MetricsPublisher, MetricsRing
+
+
+def test_only_changed_agents_are_published_after_the_first_tick():
+    ring = MetricsRing.create(capacity=64, max_agents=8)
+    try:
+        publisher = MetricsPublisher(ring)
+        everyone = ["Ada", "Bo", "Cy"]
+        counts = {"Ada": 2, "Bo": 3, "Cy": 4}
+
+        def publish(tick, acted, posts=()):
+            names = publisher.agents_to_publish(set(acted) | set(posts), everyone)
+            publisher.publish(tick, {name: (counts[name], int(name in posts), name in acted) for name in names}, 1.0)
+
+        publish(1, ["Ada"])
+        counts["Bo"] += 1
+        publisher.record_call("Bo", 10.0, 5)
+        publish(2, [])
+        publish(3, [])
+
+        records, _ = ring.read()
+        names = ring.agent_names()
+        by_tick = {}
+        for record in records:
+            key = "tick" if record['agent'] == TICK else names[record['agent']]
+            by_tick.setdefault(record['tick'], {})[key] = record
+
+        assert set(by_tick[1]) == {"tick", "Ada", "Bo", "Cy"}
+        # Ada to clear her active flag, Bo for his LLM call
+        assert set(by_tick[2]) == {"tick", "Ada", "Bo"}
+        assert not by_tick[2]["Ada"]['active']
+        assert set(by_tick[3]) == {"tick"}
+        assert [by_tick[tick]["tick"]['memories'] for tick in (1, 2, 3)] == [9, 10, 10]
+    finally:
+        ring.close()
@@ -0,0 +1,298 @@
+"""
+Multi-Process Worker Pool for AI Commune
+Runs local Hugging Face inference in K worker processes fed from one request queue.
+"""
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+
+
+def _pin_worker(threads: int, cpus: Optional[List[int]]) -> None:
+    """Limit a worker process to its share of threads and cores."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            logger.warning(f"Could not pin worker {os.getpid()} to CPUs {cpus}: {e}")
+
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only settable before the first parallel op; inherited pools keep their size
+        pass
+
+
+def _worker_main(worker_id: int, client, client_factory: Optional[Callable[[], Any]],
+                 requests: "mp.Queue", results: "mp.Queue", threads: int, cpus: Optional[List[int]],
+                 serving=None) -> None:
+    """Serve generate() requests from the shared queue until told to stop.
+
+    While a request runs its id is in the shared `serving` value, so the pool
+    knows which request to fail if this worker dies.
+    """
+    _pin_worker(threads, cpus)
+    if client is None:
+        client = client_factory()
+
+    logger.debug(f"👷 Worker {worker_id} ready (pid {os.getpid()}, {threads} thread(s), cpus {cpus})")
+
+    while True:
+        item = requests.get()
+        if item is None:
+            break
+
+        request_id, kwargs = item
+        if serving is not None:
+            serving.value = request_id
+        try:
+            results.put((request_id, True, client.generate(**kwargs)))
+        except Exception as e:
+            results.put((request_id, False, f"{type(e).__name__}: {e}"))
+        if serving is not None:
+            serving.value = -1
+
+
+class _HuggingFaceFactory:
+    """Picklable factory used when workers have to load their own model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def __call__(self):
+        from agents.huggingface_client import HuggingFaceClient
+        return HuggingFaceClient(model_name=self.model_name)
+
+
+class WorkerPoolClient:
+    """LLM client that spreads generate() calls over K inference processes.
+
+    On platforms with `fork`, the model is loaded once in the parent before the
+    workers start, so every worker shares the read-only weights copy-on-write.
+    Elsewhere each worker loads its own copy. Each worker is limited to
+    `threads_per_worker` torch threads and pinned to its own cores, so several
+    small-model generations run side by side instead of contending for one
+    intra-op thread pool.
+
+    The client is thread-safe: agents calling generate() from different threads
+    are served concurrently, up to one request per worker.
+
+    A worker that dies (crash, OOM kill) is replaced, and the request it was
+    serving fails instead of waiting forever; generate() also gives up after
+    `request_timeout` seconds.
+    """
+
+    def __init__(self, model_name: str = "distilgpt2", num_workers: Optional[int] = None,
+                 threads_per_worker: int = 2, pin_cpus: bool = True,
+                 client_factory: Optional[Callable[[], Any]] = None, request_timeout: Optional[float] = 300.0):
+        """Initialize the worker pool.
+
+        Args:
+            model_name: Hugging Face model each worker serves (default: distilgpt2)
+            num_workers: Number of worker processes (default: available cores / threads_per_worker)
+            threads_per_worker: Torch threads per worker (default: 2)
+            pin_cpus: Pin each worker to its own set of cores (default: True)
+            client_factory: Optional callable building the client, instead of HuggingFaceClient(model_name)
+            request_timeout: Seconds generate() waits for a result, None for no limit (default: 300)
+        """
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.num_workers = num_workers or max(1, len(cpus) // self.threads_per_worker)
+        self.model_name = model_name
+        self.model = model_name
+        self.supports_stopping_criteria = client_factory is None
+        self.request_timeout = request_timeout
+        self.pin_cpus = pin_cpus
+        self._cpus = cpus
+
+        factory = client_factory or _HuggingFaceFactory(model_name)
+        use_fork = "fork" in mp.get_all_start_methods()
+        context = mp.get_context("fork" if use_fork else "spawn")
+
+        shared_client = None
+        if use_fork:
+            # Load once; forked workers share the weights copy-on-write
+            shared_client = factory()
+            self.model_name = getattr(shared_client, "model_name", model_name)
+            self.model = self.model_name
+            self.supports_stopping_criteria = getattr(shared_client, "supports_stopping_criteria", False)
+
+        self._context = context
+        self._shared_client = shared_client
+        self._factory = None if use_fork else factory
+        self._ids = itertools.count()
+        self._start_pool()
+
+        logger.info(f"🏭 Worker pool started: {self.num_workers} worker(s) × {self.threads_per_worker} thread(s) "
+                    f"serving {self.model_name} ({'shared' if use_fork else 'per-worker'} weights)")
+
+    def _start_pool(self) -> None:
+        """Create the queues, start every worker and the result collector."""
+        self._requests = self._context.Queue()
+        self._results = self._context.Queue()
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._closing = False
+
+        # Request each worker is serving (-1: none), written by the worker itself
+        self._serving = [self._context.Value('q', -1, lock=False) for _ in range(self.num_workers)]
+        self._workers = [self._start_worker(worker_id) for worker_id in range(self.num_workers)]
+
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-results", daemon=True)
+        self._collector.start()
+
+    def _start_worker(self, worker_id: int):
+        """Start the worker process for one slot of the pool."""
+        worker_cpus = None
+        if self.pin_cpus:
+            start = (worker_id * self.threads_per_worker) % len(self._cpus)
+            worker_cpus = [self._cpus[(start + i) % len(self._cpus)] for i in range(self.threads_per_worker)]
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self._shared_client, self._factory,
+                  self._requests, self._results, self.threads_per_worker, worker_cpus, self._serving[worker_id]),
+            name=f"commune-llm-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _resolve(self, request_id: int, ok: bool, value: Any) -> None:
+        with self._lock:
+            future = self._futures.pop(request_id, None)
+        if future is None:
+            # Already failed, or abandoned by a caller that timed out
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(RuntimeError(value))
+
+    def _check_workers(self) -> None:
+        """Replace dead workers and fail the requests they were serving."""
+        for worker_id, process in enumerate(self._workers):
+            if self._closing or process.is_alive():
+                continue
+            request_id = self._serving[worker_id].value
+            self._serving[worker_id].value = -1
+            logger.warning(f"💀 Worker {worker_id} (pid {process.pid}) died with exit code {process.exitcode}, "
+                           f"restarting it")
+            if request_id >= 0:
+                self._resolve(request_id, False, f"Worker {worker_id} died with exit code {process.exitcode}")
+            self._workers[worker_id] = self._start_worker(worker_id)
+
+    def _collect(self) -> None:
+        """Resolve futures as workers report results, and check for dead workers every second."""
+        next_check = time.monotonic() + 1.0
+        while True:
+            try:
+                item = self._results.get(timeout=1.0)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._resolve(*item)
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 1.0
+
+    def submit(self, prompt: str, system_prompt: Optional[str] = None,
+               temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> Future:
+        """Queue a generation request without waiting for it.
+
+        Returns:
+            Future resolving to the generated text
+        """
+        future = Future()
+        request_id = next(self._ids)
+        with self._lock:
+            self._futures[request_id] = future
+        self._requests.put((request_id, dict(prompt=prompt, system_prompt=system_prompt,
+                                              temperature=temperature, max_tokens=max_tokens, **kwargs)))
+        return future
+
+    def generate(self, prompt: str, system_prompt: Optional[str] = None,
+                 temperature: float = 0.7, max_tokens: int = 150, **kwargs) -> str:
+        """Generate a response on the next free worker.
+
+        Args:
+            prompt: The prompt to send to the model
+            system_prompt: Optional system prompt (will be combined)
+            temperature: Sampling temperature (0.0-2.0)
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Generated response text
+
+        Raises:
+            TimeoutError: If no result arrives within request_timeout
+            RuntimeError: If generation failed or the worker serving it died
+        """
+        return self._result(self.submit(prompt, system_prompt, temperature, max_tokens, **kwargs))
+
+    def _result(self, future: Future) -> str:
+        try:
+            return future.result(timeout=self.request_timeout)
+        except TimeoutError:
+            with self._lock:
+                for request_id, pending in list(self._futures.items()):
+                    if pending is future:
+                        del self._futures[request_id]
+            raise
+
+    def generate_many(self, requests: List[Dict[str, Any]]) -> List[str]:
+        """Generate responses for several requests in parallel.
+
+        Args:
+            requests: List of generate() keyword arguments
+
+        Returns:
+            Responses in the same order as the requests
+        """
+        futures = [self.submit(**request) for request in requests]
+        return [self._result(future) for future in futures]
+
+    def list_models(self) -> List[str]:
+        """List available models (for compatibility)."""
+        return [self.model_name]
+
+    def after_fork(self) -> None:
+        """Start a pool of the branch's own after a fork.
+
+        The inherited workers and queues belong to the parent, and the result
+        collector thread does not exist in the child, so the child starts new ones.
+        """
+        self._start_pool()
+        logger.info(f"🏭 Worker pool restarted in branch process {os.getpid()}: {self.num_workers} worker(s)")
+
+    def close(self) -> None:
+        """Stop the workers and the result collector."""
+        self._closing = True
+        for _ in self._workers:
+            self._requests.put(None)
+        for process in self._workers:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join()
+        logger.info("🏭 Worker pool stopped")
+
+    def __str__(self) -> str:
+        """String representation of the client."""
+        return f"WorkerPoolClient(model='{self.model_name}', workers={self.num_workers}, threads={self.threads_per_worker})"